@@ -69,7 +69,7 @@ from .ensemble import (
     ReversedTrajectoryEnsemble, SequentialEnsemble, VolumeEnsemble,
     SequentialEnsemble, IntersectionEnsemble, UnionEnsemble,
     SingleFrameEnsemble, MinusInterfaceEnsemble, TISEnsemble,
-    OptionalEnsemble, join_ensembles
+    OptionalEnsemble, EnsembleCertificate, join_ensembles
 )
 
 from .step_visualizer_2D import StepVisualizer2D
@@ -83,7 +83,7 @@ from .movechange import (
     PathSimulatorMoveChange, AcceptedSampleMoveChange,
     RejectedSampleMoveChange, SubMoveChange,
     FilterByEnsembleMoveChange, RejectedNaNSampleMoveChange,
-    RejectedMaxLengthSampleMoveChange
+    RejectedMaxLengthSampleMoveChange, RejectedEarlySampleMoveChange
 )
 
 from .pathmover import Details, MoveDetails, SampleDetails
@@ -108,9 +108,13 @@ from .pathmover import (
 
 from .pathsimulators import (
     PathSimulator, FullBootstrapping, Bootstrapping, PathSampling, MCStep,
-    CommittorSimulation, DirectSimulation, ShootFromSnapshotsSimulation
+    CommittorSimulation, DirectSimulation, ShootFromSnapshotsSimulation,
+    DecorrelationTracker
 )
 
+from .profiling import Profiler
+from .split_planner import SplitPlanner
+
 from .sample import Sample, SampleSet
 
 from .shooting import (
@@ -1,3 +1,4 @@
+import bisect
 import collections
 import pandas as pd
 import numpy as np
@@ -31,6 +32,7 @@ class ChannelAnalysis(StorableNamedObject):
 
         self._treat_multiples = 'all'
         self._results = {c: [] for c in list(self.channels.keys()) + [None]}
+        self._channel_cache = {}
         if len(steps) > 0:
             self._analyze(steps)
 
@@ -85,49 +87,58 @@ class ChannelAnalysis(StorableNamedObject):
         """
         # for now, this assumes only one ensemble per channel
         # (would like that to change in the future)
-        prev_traj = None
-        last_start = {c: None for c in self._results}
+        labels = list(self.channels.keys()) + [None]
+        step_nums = []
+        occupied = []
         for step in steps:
-            step_num = self._step_num(step)
+            step_nums.append(self._step_num(step))
             traj = step.active[self.replica].trajectory
-            if prev_traj is None:
-                prev_result = {c: len(self.channels[c].split(traj)) > 0
-                               for c in self.channels}
-                prev_result[None] = not any(prev_result.values())
-                for c in last_start:
-                    if prev_result[c] is True:
-                        last_start[c] = step_num
-            # re-use previous if the trajectory hasn't changed
-            if traj is prev_traj:
-                result = prev_result
-            else:
-                result = {c: len(self.channels[c].split(traj)) > 0
-                          for c in self.channels}
-                result[None] = not any(result.values())
-                changed = [c for c in result if result[c] != prev_result[c]]
-                for c in changed:
-                    if result[c] is True:
-                        # switched from False to True: entered this label
-                        last_start[c] = step_num
-                    else:
-                        # switched from True to False: exited this label
-                        finish = step_num
-                        self._results[c] += [(last_start[c], finish)]
-                        last_start[c] = None
-            prev_traj = traj
-            prev_result = result
-        # finish off any extras
-        next_step = step_num + 1 # again, this can be changed
-        for c in self._results:
-            if last_start[c] is not None:
-                if len(self._results[c]) > 0:
-                    # don't do double it if it's already there
-                    if self._results[c][-1][1] != step_num:
-                        self._results[c] += [(last_start[c], next_step)]
-                    # note: is the else: of the above even possible?
-                    # namely, do we need the if statement? should test that
-                else:
-                    self._results[c] += [(last_start[c], next_step)]
+            occupied.append(self._channels_for_trajectory(traj))
+
+        if not step_nums:
+            return
+
+        occupied = np.array(occupied, dtype=bool).reshape(len(step_nums),
+                                                          len(labels) - 1)
+        occupied = np.column_stack([occupied, ~occupied.any(axis=1)])
+        # a label is entered at the first step it is occupied and left at
+        # the first step it is not; open ranges end after the last step
+        step_nums = np.array(step_nums + [step_nums[-1] + 1])
+        padded = np.zeros((len(occupied) + 2, len(labels)), dtype=np.int8)
+        padded[1:-1] = occupied
+        changes = np.diff(padded, axis=0)
+        for column, label in enumerate(labels):
+            starts = step_nums[np.flatnonzero(changes[:, column] == 1)]
+            finishes = step_nums[np.flatnonzero(changes[:, column] == -1)]
+            self._results[label] += [(int(start), int(finish))
+                                     for start, finish
+                                     in zip(starts, finishes)]
+
+    def _channels_for_trajectory(self, traj):
+        """Whether each channel ensemble has a subtrajectory of traj.
+
+        Results are cached by the trajectory UUID, so each trajectory is
+        only tested once.
+
+        Parameters
+        ----------
+        traj : :class:`.Trajectory`
+            the trajectory to test
+
+        Returns
+        -------
+        list of bool :
+            for each channel (in the order of ``channels``) whether it is
+            occupied
+        """
+        uuid = traj.__uuid__
+        try:
+            return self._channel_cache[uuid]
+        except KeyError:
+            result = [len(ensemble.split(traj, n_results=1)) > 0
+                      for ensemble in self.channels.values()]
+            self._channel_cache[uuid] = result
+            return result
 
     @property
     def treat_multiples(self):
@@ -408,19 +419,18 @@ class ChannelAnalysis(StorableNamedObject):
         """
         labeled_results = self.labels_by_step()
         labels_in_order = [ll[2] for ll in labeled_results]
-        labels_set = set(labels_in_order)
-        sorted_set_labels = sorted(list(labels_set),
+        sorted_set_labels = sorted(set(labels_in_order),
                                    key=self._labels_as_sets_sort_function)
         sorted_labels = [self.label_to_string(e) for e in sorted_set_labels]
-        switches = [(self.label_to_string(labels_in_order[i]),
-                     self.label_to_string(labels_in_order[i+1]))
-                    for i in range(len(labeled_results)-1)]
-        switch_count = collections.Counter(switches)
-        df = pd.DataFrame(index=sorted_labels, columns=sorted_labels)
-        for switch in switch_count:
-            df.at[switch[0], switch[1]] = switch_count[switch]
-
-        df = df.fillna(0)
+        label_index = {label: i for (i, label) in
+                       enumerate(sorted_set_labels)}
+        codes = np.array([label_index[label] for label in labels_in_order],
+                         dtype=int)
+        n_labels = len(sorted_labels)
+        counts = np.bincount(codes[:-1] * n_labels + codes[1:],
+                             minlength=n_labels * n_labels)
+        df = pd.DataFrame(counts.reshape(n_labels, n_labels),
+                          index=sorted_labels, columns=sorted_labels)
         return df
 
     @property
@@ -474,8 +484,10 @@ class ChannelAnalysis(StorableNamedObject):
         if self.treat_multiples == 'all':
             treat_multiples = 'multiple'
         labeled_results = self.labels_by_step(treat_multiples)
-        for step in labeled_results:
-            if step[0] <= step_number < step[1]:
-                return self.label_to_string(step[2])
+        # the labeled ranges do not overlap, so they are sorted by start
+        starts = [step[0] for step in labeled_results]
+        idx = bisect.bisect_right(starts, step_number) - 1
+        if idx >= 0 and step_number < labeled_results[idx][1]:
+            return self.label_to_string(labeled_results[idx][2])
         raise RuntimeError("Step " + str(step_number) + " outside of range."
                            + " Max step: " + str(labeled_results[-1][1]))
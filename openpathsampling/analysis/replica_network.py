@@ -1,4 +1,5 @@
 import collections
+import numpy as np
 import openpathsampling as paths
 import pandas as pd
 import scipy.sparse
@@ -10,6 +11,23 @@ logger = logging.getLogger(__name__)
 class ReplicaNetwork(object):
     """
     Analysis tool for networks of replica exchanges.
+
+    The steps are read once into :attr:`ensemble_indices`, the ensemble of
+    each replica at each step, and all quantities are calculated from that
+    array.
+
+    Attributes
+    ----------
+    ensemble_indices : numpy.ndarray
+        `(n_steps, n_columns)` array with the index (in
+        :attr:`index_ensembles`) of the ensemble of the replica of each
+        column (see :attr:`replica_columns`) at each step; `-1` if the
+        replica has no sample in that step
+    index_ensembles : list of :class:`.Ensemble`
+        the ensemble of each index: all ensembles of the network followed
+        by any other ensemble found in the steps
+    replica_columns : dict
+        the column of each replica in :attr:`ensemble_indices`
     """
     def __init__(self, scheme, steps, replicas=None):
         if replicas is None:
@@ -27,9 +45,10 @@ class ReplicaNetwork(object):
         self._ensemble_to_string = {}
         self.ensemble_order = scheme.network.all_ensembles
 
-        self.traces = self._traces_from_steps(steps)
-        self.transitions = self._transitions_from_traces(self.traces)
-        self.analysis = self._analysis_from_steps(steps)
+        self._traces = None
+        self._read_steps(steps)
+        self.transitions = self._transitions_from_indices()
+        self.analysis = self._analysis_from_indices()
 
 
     def to_dict(self):
@@ -59,6 +78,147 @@ class ReplicaNetwork(object):
         obj.analysis = dct['analysis']
         return obj
 
+    def _read_steps(self, steps):
+        """
+        Read the ensemble of each replica and the move type of each step
+        """
+        index_ensembles = list(self.ensembles)
+        ensemble_index = {ens: i for (i, ens) in enumerate(index_ensembles)}
+        replica_columns = {}
+        step_columns = []
+        step_indices = []
+        ensemble_change = []
+        for step in steps:
+            canonical_mover = step.change.canonical.mover
+            ensemble_change.append(
+                bool(canonical_mover) and
+                canonical_mover.is_ensemble_change_mover
+            )
+            columns = []
+            indices = []
+            for sample in step.active:
+                try:
+                    index = ensemble_index[sample.ensemble]
+                except KeyError:
+                    index = len(index_ensembles)
+                    ensemble_index[sample.ensemble] = index
+                    index_ensembles.append(sample.ensemble)
+                column = replica_columns.setdefault(sample.replica,
+                                                    len(replica_columns))
+                columns.append(column)
+                indices.append(index)
+            step_columns.append(columns)
+            step_indices.append(indices)
+
+        n_steps = len(step_indices)
+        rows = np.repeat(np.arange(n_steps),
+                         [len(indices) for indices in step_indices])
+        matrix = np.full((n_steps, len(replica_columns)), -1, dtype=int)
+        if len(rows) > 0:
+            matrix[rows, np.concatenate(step_columns)] = \
+                np.concatenate(step_indices)
+
+        self.ensemble_indices = matrix
+        self.index_ensembles = index_ensembles
+        self.replica_columns = replica_columns
+        self._ensemble_change = np.array(ensemble_change, dtype=bool)
+
+    def _replica_indices(self, replica):
+        # the ensemble indices of a replica at the steps it has a sample
+        column = self.ensemble_indices[:, self.replica_columns[replica]]
+        return column[column >= 0]
+
+    def _hop_counts(self, before, after):
+        # dict of (ensemble, ensemble) pairs for all changes before -> after
+        hop = (before != after) & (before >= 0) & (after >= 0)
+        n_indices = len(self.index_ensembles)
+        counts = np.bincount(before[hop] * n_indices + after[hop],
+                             minlength=n_indices * n_indices)
+        ensembles = self.index_ensembles
+        return {(ensembles[k // n_indices], ensembles[k % n_indices]):
+                int(counts[k])
+                for k in np.flatnonzero(counts)}
+
+    def _analysis_from_indices(self):
+        # a replica changed its ensemble in a step that used an ensemble
+        # change mover
+        n_trials = int(self._ensemble_change.sum())
+        steps = np.flatnonzero(self._ensemble_change[1:]) + 1
+        n_accepted = self._hop_counts(
+            self.ensemble_indices[steps - 1].ravel(),
+            self.ensemble_indices[steps].ravel()
+        )
+
+        # TODO: n_trials no longer needs to be a dict, but other functions
+        # expect that in output, so we return it
+        n_try = {key: n_trials for key in n_accepted}
+        return n_try, n_accepted
+
+    def _transitions_from_indices(self):
+        """
+        Calculate the transitions based on the trace of each replica.
+
+        This gives results normalized to *all* move types.
+        """
+        befores = []
+        afters = []
+        for replica in self.replica_columns:
+            indices = self._replica_indices(replica)
+            befores.append(indices[:-1])
+            afters.append(indices[1:])
+
+        if not befores:
+            return {}
+        return self._hop_counts(np.concatenate(befores),
+                                np.concatenate(afters))
+
+    @property
+    def traces(self):
+        """
+        dict : condensed trace (see :func:`condense_repeats`) of the
+        ensembles of each replica and the replicas of each ensemble
+        """
+        if self._traces is None:
+            self._traces = self._traces_from_indices()
+        return self._traces
+
+    @traces.setter
+    def traces(self, value):
+        self._traces = value
+
+    def _traces_from_indices(self):
+        """
+        Calculates all the traces (fixed replica or fixed ensemble).
+        """
+        matrix = self.ensemble_indices
+        ensembles = self.index_ensembles
+        replicas = [None] * len(self.replica_columns)
+        for replica, column in self.replica_columns.items():
+            replicas[column] = replica
+
+        traces = {}
+        for replica, column in self.replica_columns.items():
+            values, counts = _run_lengths(self._replica_indices(replica))
+            traces[replica] = [(ensembles[value], int(count))
+                               for value, count in zip(values, counts)]
+
+        steps, columns = np.nonzero(matrix >= 0)
+        indices = matrix[steps, columns]
+        # stable sort by ensemble keeps the steps in order
+        order = np.argsort(indices, kind='mergesort')
+        indices = indices[order]
+        columns = columns[order]
+        bounds = np.flatnonzero(np.diff(indices)) + 1
+        for chunk in np.split(np.arange(len(indices)), bounds):
+            if len(chunk) == 0:
+                continue
+            values, counts = _run_lengths(columns[chunk])
+            traces[ensembles[indices[chunk[0]]]] = [
+                (replicas[value], int(count))
+                for value, count in zip(values, counts)
+            ]
+
+        return traces
 
     @property
     def number_to_ensemble(self):
@@ -107,78 +267,6 @@ class ReplicaNetwork(object):
     def ensemble_to_string(self, value):
         self._ensemble_to_string.update(value)
 
-    def _analysis_from_steps(self, steps=None):
-        if steps is None:
-            raise RuntimeError("No steps given to analyze!")
-        n_trials = 0
-        analysis = {}
-        analysis['n_trials'] = {}
-        analysis['n_accepted'] = {}
-        prev = None
-        for step in steps:
-            canonical_mover = step.change.canonical.mover
-            if canonical_mover and canonical_mover.is_ensemble_change_mover:
-                n_trials += 1
-                hops = []
-                for old in prev.active:
-                    new = step.active
-                    if old.replica != new[old.ensemble].replica:
-                        # i.e., the prev and step have diff rep in same ens
-                        hops.append((old.ensemble, new[old.replica].ensemble))
-                for hop in hops:
-                    try:
-                        analysis['n_accepted'][hop] += 1
-                    except KeyError:
-                        analysis['n_accepted'][hop] = 1
-
-            prev = step
-
-        # TODO: n_trials no longer needs to be a dict, but other functions
-        # expect that in output, so we return it
-        for key in analysis['n_accepted'].keys():
-            analysis['n_trials'][key] = n_trials
-        return analysis['n_trials'], analysis['n_accepted']
-
-
-    def _traces_from_steps(self, steps):
-        """
-        Calculates all the traces (fixed replica or fixed ensemble).
-        """
-        full_traces = collections.defaultdict(list)
-        for step in steps:
-            for sample in step.active:
-                ens = sample.ensemble
-                rep = sample.replica
-                full_traces[ens].append(rep)
-                full_traces[rep].append(ens)
-
-        traces = {k: condense_repeats(full_traces[k]) for k in full_traces}
-        return traces
-
-
-    def _transitions_from_traces(self, traces):
-        """
-        Calculate the transitions based on the trace of a given replica.
-
-        This gives results normalized to *all* move types.
-
-        Parameters
-        ----------
-        traces: dict
-        """
-        transitions = {}
-        for replica in traces:
-            trace = traces[replica]
-            hops = [(trace[i][0], trace[i+1][0]) for i in range(len(trace)-1)]
-
-            for hop in hops:
-                try:
-                    transitions[hop] += 1
-                except KeyError:
-                    transitions[hop] = 1
-        return transitions
-
-
     def reorder_matrix(self, matrix, index_order):
         """Return dataframe with matrix row/columns in index_order.
 
@@ -345,21 +433,25 @@ class ReplicaNetwork(object):
         """
         if included_ensembles is None:
             included_ensembles = self.ensembles
-        traces = self.traces
-        n_up = { ens : 0 for ens in self.ensembles }
-        n_visit = { ens : 0 for ens in self.ensembles }
+        ensemble_index = {ens: i for (i, ens) in
+                          enumerate(self.index_ensembles)}
+        n_indices = len(self.index_ensembles)
+        n_up = np.zeros(n_indices, dtype=int)
+        n_visit = np.zeros(n_indices, dtype=int)
         for replica in self.replicas:
-            trace = self.traces[replica]
-            direction = 0
-            for (loc, count) in trace:
-                if loc == top:
-                    direction = -1
-                elif loc == bottom:
-                    direction = +1
-                if direction != 0:
-                    n_visit[loc] += count
-                if direction == 1:
-                    n_up[loc] += count
+            indices = self._replica_indices(replica)
+            # the last of `top` (-1) or `bottom` (+1) visited, 0 if neither
+            direction = _last_marker(indices,
+                                     ensemble_index.get(top, -2),
+                                     ensemble_index.get(bottom, -2))
+            n_visit += np.bincount(indices[direction != 0],
+                                   minlength=n_indices)
+            n_up += np.bincount(indices[direction == 1],
+                                minlength=n_indices)
+
+        n_up = {ens: int(n_up[i]) for (ens, i) in ensemble_index.items()}
+        n_visit = {ens: int(n_visit[i])
+                   for (ens, i) in ensemble_index.items()}
         self._flow_up = n_up
         self._flow_count = n_visit
         as_dict =  {e : float(n_up[e])/n_visit[e] if n_visit[e] > 0 else 0.0
@@ -400,42 +492,38 @@ class ReplicaNetwork(object):
             keys "up", "down", "round", pointing to values which are a list
             of the lengths of each trip of that type
         """
-        traces = self.traces
+        ensemble_index = {ens: i for (i, ens) in
+                          enumerate(self.index_ensembles)}
+        top_index = ensemble_index.get(top, -2)
+        bottom_index = ensemble_index.get(bottom, -2)
         down_trips = []
         up_trips = []
         round_trips = []
         for replica in self.replicas:
-            trace = traces[replica]
-            direction = None
-            trip_counter = 0
-            first_direction = None
-            local_down = []
-            local_up = []
-            for (loc, count) in trace:
-                if loc == top and direction != +1:
-                    direction = +1
-                    if trip_counter > 0:
-                        local_up.append(trip_counter)
-                    trip_counter = 0
-                elif loc == bottom and direction != -1:
-                    direction = -1
-                    if trip_counter > 0:
-                        local_down.append(trip_counter)
-                    trip_counter = 0
-                if direction is not None:
-                    if first_direction is None:
-                        first_direction = direction
-                    trip_counter += count
+            indices = self._replica_indices(replica)
+            # a trip ends when the replica reaches the other end: at `top`
+            # (+1) after `bottom` (-1) or vice versa
+            marker = np.where(indices == top_index, 1,
+                              np.where(indices == bottom_index, -1, 0))
+            visits = np.flatnonzero(marker)
+            directions = marker[visits]
+            turn = np.ones(len(visits), dtype=bool)
+            turn[1:] = directions[1:] != directions[:-1]
+            turns = visits[turn]
+            directions = directions[turn]
+            lengths = np.diff(turns)
+            local_up = lengths[directions[1:] == 1].tolist()
+            local_down = lengths[directions[1:] == -1].tolist()
 
             rt_pairs = []
-            if first_direction == 1:
-                rt_pairs = zip(local_down, local_up)
-            elif first_direction == -1:
-                rt_pairs = zip(local_up, local_down)
-            else:
+            if len(directions) == 0:
                 warnstr = "No first direction for replica "+str(replica)+": "
                 warnstr += "Are there no 1-way trips?"
                 logger.warn(warnstr)
+            elif directions[0] == 1:
+                rt_pairs = zip(local_down, local_up)
+            else:
+                rt_pairs = zip(local_up, local_down)
             down_trips.extend(local_down)
             up_trips.extend(local_up)
             round_trips.extend([sum(pair) for pair in rt_pairs])
@@ -557,6 +645,25 @@ def trace_replicas_for_ensemble(ensemble, steps):
     return trace
 
 
+def _run_lengths(values):
+    # the values and lengths of runs of equal values in an array
+    if len(values) == 0:
+        return values, values
+    starts = np.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = np.concatenate([[0], starts])
+    counts = np.diff(np.concatenate([starts, [len(values)]]))
+    return values[starts], counts
+
+
+def _last_marker(indices, minus, plus):
+    # -1 after the last visit of index `minus`, +1 after `plus`, else 0
+    marker = np.where(indices == minus, -1,
+                      np.where(indices == plus, 1, 0))
+    last = np.where(marker != 0, np.arange(len(marker)), 0)
+    last = np.maximum.accumulate(last) if len(last) > 0 else last
+    return marker[last]
+
+
 def condense_repeats(ll, use_is=True):
     """
     Count the number of consecutive repeats in a list.
@@ -11,3 +11,4 @@ from .standard_analysis import (
 )
 
 from .misc import PathLengthHistogrammer, ConditionalTransitionProbability
+from .incremental import IncrementalTISAnalysis, IncrementalTISState
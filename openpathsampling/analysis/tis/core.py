@@ -43,6 +43,41 @@ def steps_to_weighted_trajectories(steps, ensembles):
     return results
 
 
+def trajectory_maxima(trajectories, cv):
+    """Maximum value of a collective variable along each trajectory.
+
+    All frames of all trajectories are passed to the CV in a single call, so
+    that values are taken in bulk from the CV cache or its disk store, and
+    only missing values are calculated. The maxima are then obtained with
+    one ``np.maximum.reduceat`` over the concatenated values.
+
+    Parameters
+    ----------
+    trajectories : list of :class:`.Trajectory`
+        the trajectories to evaluate; none of them may be empty
+    cv : :class:`.CollectiveVariable`
+        CV returning a scalar for each snapshot
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        maximum of the CV for each trajectory, in the order given
+    """
+    lengths = np.array([len(traj) for traj in trajectories], dtype=int)
+    if len(lengths) == 0:
+        return np.array([])
+    if not lengths.all():
+        raise ValueError("Can't calculate the maximum of an empty trajectory")
+
+    frames = [snapshot for traj in trajectories for snapshot in traj]
+    values = np.asarray(cv(frames), dtype=float)
+    if values.shape != (len(frames),):
+        raise ValueError("CV " + str(cv.name) + " does not return "
+                         + "a scalar value for each snapshot")
+    offsets = np.cumsum(lengths) - lengths
+    return np.maximum.reduceat(values, offsets)
+
+
 class TransitionDictResults(StorableNamedObject):
     """Analysis result object for properties of a transition.
 
@@ -231,15 +266,63 @@ class EnsembleHistogrammer(MultiEnsembleSamplingAnalyzer):
         dict of {:class:`.Ensemble`: :class:`.numerics.Histogram`}
             calculated histogram for each ensemble
         """
+        self.hists = {e: paths.numerics.Histogram(**self.hist_parameters)
+                      for e in self.ensembles}
+        return self.add_weighted_trajectories(input_dict)
+
+    def add_weighted_trajectories(self, input_dict):
+        """Add data from a weighted trajectories dictionary.
+
+        Unlike :meth:`.from_weighted_trajectories`, this keeps the data
+        already in the histograms, so that results can be updated as new
+        steps become available.
+
+        Parameters
+        ----------
+        input_dict : dict of {:class:`.Ensemble`: collections.Counter}
+            ensemble as key, and a counter mapping each trajectory
+            associated with that ensemble to its counter of time spent in
+            the ensemble (output of `steps_to_weighted_trajectories`)
+
+        Returns
+        -------
+        dict of {:class:`.Ensemble`: :class:`.numerics.Histogram`}
+            updated histogram for each ensemble
+        """
+        # the same trajectory usually appears in many steps (rejections)
+        # and often in several ensembles: evaluate each one only once
+        unique_trajs = collections.OrderedDict()
+        for ens in self.hists:
+            for traj in input_dict[ens]:
+                unique_trajs[traj] = None
+        values = self.evaluate(list(unique_trajs.keys()))
+
         hists = self.progress(self.hists, desc=self._label)
         for ens in hists:
             trajs = input_dict[ens].keys()
             weights = list(input_dict[ens].values())
-            data = [self.f(traj)
-                    for traj in self.progress(trajs, leave=False)]
-            self.hists[ens].histogram(data, weights)
+            data = [values[traj] for traj in trajs]
+            self.hists[ens].add_data_to_histogram(data, weights)
         return self.hists
 
+    def evaluate(self, trajectories):
+        """Evaluate the histogrammed function for each trajectory.
+
+        Subclasses can override this to evaluate all trajectories at once.
+
+        Parameters
+        ----------
+        trajectories : list of :class:`.Trajectory`
+            the (unique) trajectories to evaluate
+
+        Returns
+        -------
+        dict of {:class:`.Trajectory`: float}
+            value of the function for each trajectory
+        """
+        return {traj: self.f(traj)
+                for traj in self.progress(trajectories, leave=False)}
+
 
 class TISAnalysis(StorableNamedObject):
     """
@@ -5,7 +5,9 @@ from openpathsampling.numerics import LookupFunction
 import pandas as pd
 import numpy as np
 
-from .core import EnsembleHistogrammer, MultiEnsembleSamplingAnalyzer
+from .core import (
+    EnsembleHistogrammer, MultiEnsembleSamplingAnalyzer, trajectory_maxima
+)
 
 class FullHistogramMaxLambdas(EnsembleHistogrammer):
     """Histogramming the full max-lambda function (one way of getting TCP)
@@ -32,11 +34,16 @@ class FullHistogramMaxLambdas(EnsembleHistogrammer):
     """
     def __init__(self, transition, hist_parameters, max_lambda_func=None):
         self.transition = transition
+        # the CV underlying the default max-lambda function; if known, all
+        # trajectories are evaluated together (see :meth:`.evaluate`)
+        self.cv = None
         if max_lambda_func is None:
             try:
                 max_lambda_func = transition.interfaces.cv_max
             except AttributeError:
                 pass  # leave max_lambda_func as None
+            else:
+                self.cv = self._max_of_cv(transition.interfaces)
 
         if max_lambda_func is None:
             raise RuntimeError("Can't identify function to determine max "
@@ -51,6 +58,39 @@ class FullHistogramMaxLambdas(EnsembleHistogrammer):
             hist_parameters=hist_parameters
         )
 
+    @staticmethod
+    def _max_of_cv(interfaces):
+        # only use the CV directly if cv_max is the plain maximum of it
+        # (which is what InterfaceSet generates by default)
+        cv_max = interfaces.cv_max
+        kwargs = getattr(cv_max, 'kwargs', None) or {}
+        if interfaces.cv is not None and kwargs.get('cv_') is interfaces.cv:
+            return interfaces.cv
+        return None
+
+    def evaluate(self, trajectories):
+        """Maximum value of the order parameter for each trajectory.
+
+        If the max-lambda function is the default maximum of the interface
+        set's CV, the CV values of all frames are fetched in one call and
+        reduced per trajectory (see :func:`.trajectory_maxima`). Otherwise,
+        the max-lambda function is called for each trajectory.
+
+        Parameters
+        ----------
+        trajectories : list of :class:`.Trajectory`
+            the (unique) trajectories to evaluate
+
+        Returns
+        -------
+        dict of {:class:`.Trajectory`: float}
+            max lambda for each trajectory
+        """
+        if self.cv is None:
+            return super(FullHistogramMaxLambdas, self).evaluate(trajectories)
+        maxima = trajectory_maxima(trajectories, self.cv)
+        return dict(zip(trajectories, maxima))
+
 
 #class PerEnsembleMaxLambdas(EnsembleHistogrammer):
     # TODO: this just maps the count to the ensemble, not the full histogram
@@ -283,6 +283,36 @@ class MinusMoveFlux(MultiEnsembleSamplingAnalyzer):
         flux_dicts = intermediates[0]
         return self.from_trajectory_transition_flux_dict(flux_dicts)
 
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine two sets of intermediates from this analysis.
+
+        The minus trajectories are analyzed independently, so intermediates
+        from disjoint sets of steps can be combined by joining the
+        segments.
+
+        Parameters
+        ----------
+        intermediates_1 :
+            output of :meth:`.intermediates` for some steps
+        intermediates_2 :
+            output of :meth:`.intermediates` for other steps
+
+        Returns
+        -------
+        list (len 1) of dict of {(:class:`.Volume`, :class:`.Volume`): dict}
+            intermediates for the combined steps
+        """
+        (flux_dicts_1, flux_dicts_2) = (intermediates_1[0],
+                                        intermediates_2[0])
+        combined = {
+            pair: {direction: (flux_dicts_1[pair][direction]
+                               + flux_dicts_2[pair][direction])
+                   for direction in ['in', 'out']}
+            for pair in flux_dicts_1
+        }
+        return [combined]
+
 
 class DictFlux(MultiEnsembleSamplingAnalyzer):
     """Pre-calculated flux, provided as a dict.
@@ -360,6 +390,19 @@ class DictFlux(MultiEnsembleSamplingAnalyzer):
         """
         return self.flux_dict
 
+    @staticmethod
+    def combine_intermediates(intermediates_1, intermediates_2):
+        """Combine two sets of intermediates from this analysis.
+
+        For :class:`.DictFlux`, there are no intermediates to combine.
+
+        Returns
+        -------
+        list
+            empty list; the method is a placeholder for this class
+        """
+        return []
+
     @staticmethod
     def combine_results(result_1, result_2):
         """Combine two sets of results from this analysis.
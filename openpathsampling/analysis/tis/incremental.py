@@ -0,0 +1,240 @@
+import collections
+
+import openpathsampling as paths
+from openpathsampling.netcdfplus import StorableObject
+from openpathsampling.progress import SimpleProgress
+
+from openpathsampling.analysis.trajectory_transition_analysis import \
+    TrajectorySegmentContainer
+from .core import steps_to_weighted_trajectories
+
+
+def _simplify_segments(obj):
+    # TrajectorySegmentContainers are not storable; store their segments
+    if isinstance(obj, TrajectorySegmentContainer):
+        return {'segments': list(obj), 'dt': obj.dt}
+    elif isinstance(obj, dict):
+        return {k: _simplify_segments(v) for (k, v) in obj.items()}
+    elif isinstance(obj, list):
+        return [_simplify_segments(o) for o in obj]
+    return obj
+
+
+def _build_segments(obj):
+    if isinstance(obj, dict):
+        if set(obj.keys()) == {'segments', 'dt'}:
+            return TrajectorySegmentContainer(list(obj['segments']),
+                                              obj['dt'])
+        return {k: _build_segments(v) for (k, v) in obj.items()}
+    elif isinstance(obj, list):
+        return [_build_segments(o) for o in obj]
+    return obj
+
+
+class IncrementalTISState(StorableObject):
+    """Accumulated data of an :class:`.IncrementalTISAnalysis`.
+
+    This is everything needed to continue the analysis after more steps
+    have been run; save it (e.g., as a tag in the storage) to restart the
+    analysis later.
+
+    Attributes
+    ----------
+    n_steps : int
+        number of steps analyzed so far
+    weighted_trajectories : dict of {:class:`.Ensemble`: collections.Counter}
+        weighted trajectories (as in ``steps_to_weighted_trajectories``)
+        for all steps analyzed so far
+    flux_intermediates : list
+        intermediates of the flux method (see, e.g.,
+        :meth:`.MinusMoveFlux.intermediates`); ``None`` if no steps have
+        been analyzed
+    histograms : dict of {:class:`.Ensemble`: :class:`.Histogram`}
+        max lambda histogram for each sampling ensemble
+    final_state_weights : dict of {:class:`.Ensemble`: collections.Counter}
+        total weight of trajectories ending in each state (see
+        :meth:`.ConditionalTransitionProbability.final_state_weights`)
+    n_tries : dict of {:class:`.Ensemble`: float}
+        total weight of trajectories in each ensemble used for the
+        conditional transition probability
+    """
+    def __init__(self):
+        super(IncrementalTISState, self).__init__()
+        self.n_steps = 0
+        self.weighted_trajectories = {}
+        self.flux_intermediates = None
+        self.histograms = {}
+        self.final_state_weights = {}
+        self.n_tries = {}
+
+    def to_dict(self):
+        flux_intermediates = self.flux_intermediates
+        if flux_intermediates is not None:
+            flux_intermediates = _simplify_segments(flux_intermediates)
+        return {
+            'n_steps': self.n_steps,
+            'weighted_trajectories': {
+                ens: dict(counter)
+                for (ens, counter) in self.weighted_trajectories.items()
+            },
+            'flux_intermediates': flux_intermediates,
+            'histograms': {ens: hist.to_dict()
+                           for (ens, hist) in self.histograms.items()},
+            'final_state_weights': {
+                ens: dict(counter)
+                for (ens, counter) in self.final_state_weights.items()
+            },
+            'n_tries': self.n_tries
+        }
+
+    @classmethod
+    def from_dict(cls, dct):
+        obj = cls()
+        obj.n_steps = dct['n_steps']
+        obj.weighted_trajectories = {
+            ens: collections.Counter(counts)
+            for (ens, counts) in dct['weighted_trajectories'].items()
+        }
+        flux_intermediates = dct['flux_intermediates']
+        if flux_intermediates is not None:
+            flux_intermediates = _build_segments(flux_intermediates)
+        obj.flux_intermediates = flux_intermediates
+        obj.histograms = {ens: paths.numerics.Histogram.from_dict(hist)
+                          for (ens, hist) in dct['histograms'].items()}
+        obj.final_state_weights = {
+            ens: collections.Counter(weights)
+            for (ens, weights) in dct['final_state_weights'].items()
+        }
+        obj.n_tries = dict(dct['n_tries'])
+        return obj
+
+
+class IncrementalTISAnalysis(SimpleProgress):
+    """
+    TIS analysis that can be updated as new steps become available.
+
+    All intermediate quantities of a :class:`.StandardTISAnalysis` (the
+    weighted trajectories, the flux intermediates, the max lambda
+    histograms, and the final state weights for the conditional transition
+    probability) are additive in the steps. This keeps them in an
+    :class:`.IncrementalTISState`, so that :meth:`.update` only needs to
+    process the new steps.
+
+    Parameters
+    ----------
+    analysis : :class:`.StandardTISAnalysis`
+        the analysis to update; this defines the flux method, histogram
+        parameters, and so on, and holds the results after each update
+    state : :class:`.IncrementalTISState`
+        previously accumulated state to restart from; default `None` starts
+        with no steps
+
+    Attributes
+    ----------
+    results : dict
+        results of the most recent update (same as ``analysis.results``)
+    """
+    def __init__(self, analysis, state=None):
+        self.analysis = analysis
+        self.network = analysis.network
+        self.ensembles = self.network.sampling_ensembles
+        self.max_lambda_calcs = [tcp_m.max_lambda_calc
+                                 for tcp_m in analysis.tcp_methods.values()]
+        if state is None:
+            state = IncrementalTISState()
+        self.state = state
+
+        for ens in self.ensembles:
+            if ens not in state.weighted_trajectories:
+                state.weighted_trajectories[ens] = collections.Counter()
+
+        for calc in self.max_lambda_calcs:
+            for ens in calc.ensembles:
+                if ens not in state.histograms:
+                    state.histograms[ens] = paths.numerics.Histogram(
+                        **calc.hist_parameters
+                    )
+
+    def _link_histograms(self):
+        # the histogrammers add new data directly to the state's histograms
+        # (relinked each time, since from_weighted_trajectories replaces
+        # the histogrammer's histograms)
+        for calc in self.max_lambda_calcs:
+            calc.hists = {ens: self.state.histograms[ens]
+                          for ens in calc.ensembles}
+
+    @property
+    def results(self):
+        return self.analysis.results
+
+    def update(self, new_steps):
+        """Add new steps to the analysis and recalculate the results.
+
+        The time required is proportional to the number of new steps, not
+        to the total number of steps analyzed so far.
+
+        Parameters
+        ----------
+        new_steps : iterable of :class:`.MCStep`
+            steps that have not been included in the analysis yet
+
+        Returns
+        -------
+        :class:`.TransitionDictResults`
+            the updated rate matrix
+        """
+        state = self.state
+        new_steps = list(new_steps)
+        steps = self.progress(new_steps, desc="Weighted trajectories")
+        weighted_trajs = steps_to_weighted_trajectories(steps,
+                                                        self.ensembles)
+        for ens in self.ensembles:
+            state.weighted_trajectories[ens] += weighted_trajs[ens]
+        state.n_steps += len(new_steps)
+
+        flux_method = self.analysis.flux_method
+        intermediates = flux_method.intermediates(new_steps)
+        if state.flux_intermediates is not None:
+            intermediates = flux_method.combine_intermediates(
+                state.flux_intermediates, intermediates
+            )
+        state.flux_intermediates = intermediates
+
+        self._link_histograms()
+        for calc in self.max_lambda_calcs:
+            calc.add_weighted_trajectories(weighted_trajs)
+
+        ctp_method = self.analysis.ctp_method
+        weights, n_tries = ctp_method.final_state_weights(weighted_trajs)
+        for ens in weights:
+            counter = state.final_state_weights.setdefault(
+                ens, collections.Counter()
+            )
+            counter += weights[ens]
+            state.n_tries[ens] = state.n_tries.get(ens, 0) + n_tries[ens]
+
+        return self.recalculate()
+
+    def recalculate(self):
+        """Calculate the results from the current state.
+
+        Returns
+        -------
+        :class:`.TransitionDictResults`
+            the rate matrix
+        """
+        state = self.state
+        if state.flux_intermediates is None:
+            raise RuntimeError("No steps have been analyzed yet")
+        analysis = self.analysis
+        analysis.results = {}
+        analysis.results['flux'] = \
+                analysis.flux_method.calculate_from_intermediates(
+                    *state.flux_intermediates
+                )
+        ctps = analysis.ctp_method.from_final_state_weights(
+            state.final_state_weights, state.n_tries
+        )
+        max_lambda_hists = dict(state.histograms)
+        analysis.from_intermediate_results(max_lambda_hists, ctps)
+        return analysis.rate_matrix()
@@ -68,18 +68,67 @@ class ConditionalTransitionProbability(MultiEnsembleSamplingAnalyzer):
             a given state. Value is the conditional transition probability
             for that state from that ensemble.
         """
-        ctp = {}
+        weights, n_tries = self.final_state_weights(input_dict)
+        return self.from_final_state_weights(weights, n_tries)
+
+    def final_state_weights(self, input_dict):
+        """Weight of the trajectories ending in each state.
+
+        These are the sufficient statistics for the conditional transition
+        probability: results for different sets of steps can be combined by
+        adding them.
+
+        Parameters
+        ----------
+        input_dict : dict of {:class:`.Ensemble`: collections.Counter}
+            ensemble as key, and a counter mapping each trajectory
+            associated with that ensemble to its counter of time spent in
+            the ensemble (output of `steps_to_weighted_trajectories`)
+
+        Returns
+        -------
+        weights : dict of {:class:`.Ensemble`: collections.Counter}
+            for each ensemble, the total weight of trajectories ending in
+            each state
+        n_tries : dict of {:class:`.Ensemble`: float}
+            the total weight of all trajectories in each ensemble
+        """
+        weights = {}
+        n_tries = {}
         for ens in self.ensembles:
             acc = collections.Counter()
             n_try = sum(input_dict[ens].values())
             final_frames = [traj.get_as_proxy(-1) for
                             traj in input_dict[ens].keys()]
-            weights = input_dict[ens].values()
-            for (f, w) in zip(final_frames, weights):
+            weights_ens = input_dict[ens].values()
+            for (f, w) in zip(final_frames, weights_ens):
                 local = collections.Counter({s: w for s in self.states
                                              if s(f)})
                 acc += local
 
-            ctp[ens] = {s : float(acc[s]) / n_try for s in acc.keys()}
+            weights[ens] = acc
+            n_tries[ens] = n_try
+        return weights, n_tries
+
+    def from_final_state_weights(self, weights, n_tries):
+        """Calculate results from the weights of final states.
+
+        Parameters
+        ----------
+        weights : dict of {:class:`.Ensemble`: collections.Counter}
+            first output of :meth:`.final_state_weights`
+        n_tries : dict of {:class:`.Ensemble`: float}
+            second output of :meth:`.final_state_weights`
+
+        Returns
+        -------
+        dict of {:class:`.Ensemble`: {:class:`.Volume`: float}}
+            conditional transition probability for each state from each
+            ensemble (see :meth:`.from_weighted_trajectories`)
+        """
+        ctp = {}
+        for ens in self.ensembles:
+            acc = weights[ens]
+            ctp[ens] = {s : float(acc[s]) / n_tries[ens] for s in acc.keys()}
             # TODO: add logging to report here
         return ctp
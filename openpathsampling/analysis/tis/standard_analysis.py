@@ -288,6 +288,28 @@ class StandardTISAnalysis(TISAnalysis):
             calc_results = calc.from_weighted_trajectories(input_dict)
             # TODO: change this to a 2D mapping, CV and ensemble
             max_lambda_hists.update(calc_results)
+
+        ctps = self.ctp_method.from_weighted_trajectories(input_dict)
+        return self.from_intermediate_results(max_lambda_hists, ctps)
+
+    def from_intermediate_results(self, max_lambda_hists, ctps):
+        """Calculate results from max lambda histograms and CTPs.
+
+        The flux must already be in ``self.results``.
+
+        Parameters
+        ----------
+        max_lambda_hists : dict of {:class:`.Ensemble`: :class:`.Histogram`}
+            max lambda histogram for each sampling ensemble
+        ctps : dict of {:class:`.Ensemble`: {:class:`.Volume`: float}}
+            conditional transition probabilities, as calculated by
+            ``self.ctp_method``
+
+        Returns
+        -------
+        dict
+            dictionary with all the results
+        """
         self.results['max_lambda'] = max_lambda_hists
 
         # calculate the TCPs
@@ -308,8 +330,6 @@ class StandardTISAnalysis(TISAnalysis):
         )
         self.results['total_crossing_probability'] = tcps
 
-        # calculate the CTPs
-        ctps = self.ctp_method.from_weighted_trajectories(input_dict)
         self.results['conditional_transition_probability'] = ctps
 
         # calculate the transition probability from existing TCP, CTP
@@ -2,7 +2,7 @@ import openpathsampling as paths
 import openpathsampling.netcdfplus.chaindict as cd
 from openpathsampling.integration_tools import md, error_if_no_mdtraj
 from openpathsampling.engines.openmm.tools import trajectory_to_mdtraj
-from openpathsampling.netcdfplus import WeakKeyCache, \
+from openpathsampling.netcdfplus import SharedValueCache, \
     ObjectJSON, create_to_dict, ObjectStore, PseudoAttribute
 
 from openpathsampling.deprecations import (has_deprecations, deprecate,
@@ -41,9 +41,17 @@ class CollectiveVariable(PseudoAttribute):
 
     _cache_dict : :class:`openpathsampling.chaindict.ChainDict`
         The ChainDict that will cache calculated values for fast access
+    shared_cache : :class:`openpathsampling.netcdfplus.SharedValueCache`
+        The memory limited cache used by all CVs. Values are keyed by the
+        snapshot UUID and the least recently used values are removed once
+        ``shared_cache.max_bytes`` is exceeded. Values that a store with
+        ``allow_incomplete`` has not saved yet are kept until it is synced.
+        Use ``shared_cache.stats`` to inspect hits and misses.
 
     """
 
+    shared_cache = SharedValueCache()
+
     # do not store the settings for the disk cache. These are independent
     # and stored in the cache itself
     _excluded_attr = [
@@ -64,7 +72,7 @@ class CollectiveVariable(PseudoAttribute):
 
         self.diskcache_chunksize = ObjectStore.default_store_chunk_size
         self._cache_dict = cd.ReversibleCacheChainDict(
-            WeakKeyCache(),
+            self.shared_cache.view(self),
             reversible=cv_time_reversible
         )
 
@@ -72,6 +80,40 @@ class CollectiveVariable(PseudoAttribute):
 
         # self._post = self._single_dict > self._cache_dict
 
+    def pin_cache(self):
+        """
+        Keep all cached values of this CV regardless of the memory budget
+
+        Useful for CVs that are evaluated very often, like order parameters
+        used by ensembles.
+
+        Returns
+        -------
+        :class:`CollectiveVariable`
+            the CV itself
+        """
+        self._cache_dict.cache.pin()
+        return self
+
+    def unpin_cache(self):
+        """
+        Allow cached values of this CV to be removed if memory is needed
+
+        Returns
+        -------
+        :class:`CollectiveVariable`
+            the CV itself
+        """
+        self._cache_dict.cache.unpin()
+        return self
+
+    def set_cache_store(self, value_store):
+        super(CollectiveVariable, self).set_cache_store(value_store)
+        if getattr(value_store, 'allow_incomplete', False):
+            # the store only saves values that are in the cache when it is
+            # synced, so they must not be evicted before
+            self._cache_dict.cache.hold(value_store)
+
     to_dict = create_to_dict(['name', 'cv_time_reversible'])
 
 
@@ -1,5 +1,5 @@
 from .snapshot import BaseSnapshot, SnapshotFactory, SnapshotDescriptor
-from .trajectory import Trajectory
+from .trajectory import Trajectory, FrameFeatureTable
 
 from .topology import Topology
 
@@ -9,6 +9,10 @@ from .dynamics_engine import (
     DynamicsEngine, NoEngine, EngineError,
     EngineNaNError, EngineMaxLengthError)
 
+from .metrics import (
+    EngineHook, EngineMetrics, MetricsSink, MemorySink, CSVSink,
+    PrometheusTextSink)
+
 from .external_engine import ExternalEngine
 
 from . import external_snapshots
@@ -10,6 +10,7 @@ import sys
 
 from openpathsampling.netcdfplus import StorableNamedObject
 from openpathsampling.integration_tools import is_simtk_unit_type
+from openpathsampling.profiling import profile
 
 from .snapshot import BaseSnapshot
 from .trajectory import Trajectory
@@ -101,6 +102,14 @@ class DynamicsEngine(StorableNamedObject):
             old trajectories, e.g. `lambda t: t[:10]` would restart with the
             first 10 frames
 
+    metrics : :class:`.EngineMetrics` or None
+        if set, counts the frames, time and retries of this engine; default
+        `None`
+
+    hooks : list of :class:`.EngineHook`
+        callbacks at the frame and trajectory boundaries, see
+        :meth:`add_hook`
+
     Notes
     -----
     Should be considered an abstract class: only its subclasses can be
@@ -134,6 +143,10 @@ class DynamicsEngine(StorableNamedObject):
 
     base_snapshot_type = BaseSnapshot
 
+    # counters of frames, time and retries, see `EngineMetrics`
+    metrics = None
+    hooks = ()
+
     def __init__(self, options=None, descriptor=None):
         """
         Create an empty DynamicsEngine object
@@ -345,6 +358,33 @@ class DynamicsEngine(StorableNamedObject):
         # """
         # return item
 
+    def add_hook(self, hook):
+        """
+        Add callbacks at the frame and trajectory boundaries
+
+        Parameters
+        ----------
+        hook : :class:`.EngineHook`
+        """
+        self.hooks = list(self.hooks) + [hook]
+
+    def remove_hook(self, hook):
+        """
+        Remove callbacks added by :meth:`add_hook`
+
+        Parameters
+        ----------
+        hook : :class:`.EngineHook`
+        """
+        self.hooks = [h for h in self.hooks if h is not hook]
+
+    def _timed(self, phase):
+        # time a phase for the metrics (if any) and the active profiler
+        metrics = self.metrics
+        if metrics is None:
+            return profile('engine.' + phase)
+        return metrics.timing(phase)
+
     def start(self, snapshot=None):
         if snapshot is not None:
             self.current_snapshot = snapshot
@@ -493,6 +533,13 @@ class DynamicsEngine(StorableNamedObject):
         final_error = None
         errors = []
 
+        hooks = list(self.hooks)
+        if self.metrics is not None:
+            hooks.append(self.metrics)
+
+        for hook in hooks:
+            hook.before_trajectory(self, initial)
+
         while not valid and final_error is None:
             if attempt_nan + attempt_error > 1:
                 # let's get a new initial trajectory the way the user wants to
@@ -524,9 +571,10 @@ class DynamicsEngine(StorableNamedObject):
 
             frame = 0
             # maybe we should stop before we even begin?
-            stop = self.stop_conditions(trajectory=trajectory,
-                                        continue_conditions=running,
-                                        trusted=False)
+            with self._timed('stop_check'):
+                stop = self.stop_conditions(trajectory=trajectory,
+                                            continue_conditions=running,
+                                            trusted=False)
 
             log_rate = 10
             has_nan = False
@@ -547,10 +595,13 @@ class DynamicsEngine(StorableNamedObject):
 
                 try:
                     with self.interrupter():
-                        snapshot = self.generate_next_frame()
+                        with self._timed('integrate'):
+                            snapshot = self.generate_next_frame()
 
                         # if self.on_nan != 'ignore' and \
-                        if not self.is_valid_snapshot(snapshot):
+                        with self._timed('nan_check'):
+                            valid = self.is_valid_snapshot(snapshot)
+                        if not valid:
                             has_nan = True
                             break
 
@@ -583,6 +634,9 @@ class DynamicsEngine(StorableNamedObject):
                 elif direction < 0:
                     trajectory.insert(0, snapshot.reversed)
 
+                for hook in hooks:
+                    hook.after_frame(self, trajectory, snapshot)
+
                 if 0 < max_length < len(trajectory):
                     # hit the max length criterion
                     on = self.on_max_length
@@ -609,11 +663,16 @@ class DynamicsEngine(StorableNamedObject):
                                     attempt_max_length,
                                     trajectory)
                                 break
+                        else:
+                            for hook in hooks:
+                                hook.on_retry(self, trajectory, 'max_length')
 
                 if stop is False:
                     # Check if we should stop. If not, continue simulation
-                    stop = self.stop_conditions(trajectory=trajectory,
-                                            continue_conditions=running)
+                    with self._timed('stop_check'):
+                        stop = self.stop_conditions(
+                            trajectory=trajectory,
+                            continue_conditions=running)
 
             if has_nan:
                 on = self.on_nan
@@ -627,6 +686,9 @@ class DynamicsEngine(StorableNamedObject):
                             'Failed to generate trajectory without `nan` '
                             'after %d attempts' % attempt_error,
                             trajectory)
+                    else:
+                        for hook in hooks:
+                            hook.on_retry(self, trajectory, 'nan')
 
             elif has_error:
                 on = self.on_nan
@@ -640,6 +702,9 @@ class DynamicsEngine(StorableNamedObject):
                             'Failed to generate trajectory without `nan` '
                             'after %d attempts' % attempt_error,
                             trajectory)
+                    else:
+                        for hook in hooks:
+                            hook.on_retry(self, trajectory, 'error')
 
             elif stop:
                 valid = True
@@ -651,6 +716,9 @@ class DynamicsEngine(StorableNamedObject):
             for no, e in enumerate(errors):
                 logger.info('[#%d] %s' % (no, repr(e[1])))
 
+        for hook in hooks:
+            hook.after_trajectory(self, trajectory, final_error)
+
         if final_error is not None:
             yield trajectory
             logger.info("Through frame: %d", len(trajectory))
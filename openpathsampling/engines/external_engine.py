@@ -94,8 +94,9 @@ class ExternalEngine(DynamicsEngine):
         logger.debug("Looking for frame %d", self.n_frames_since_start+1)
         while not next_frame_found:
             try:
-                next_frame = self.read_frame_from_file(self.output_file,
-                                                       self.frame_num)
+                with self._timed('snapshot'):
+                    next_frame = self.read_frame_from_file(self.output_file,
+                                                           self.frame_num)
             except IOError:
                 # maybe the file doesn't exist
                 if self.proc.is_running():
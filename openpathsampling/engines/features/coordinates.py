@@ -14,12 +14,15 @@ dimensions = ['n_atoms', 'n_spatial']
 
 
 def netcdfplus_init(store):
+    precision = store.storage.snapshots.quantization.get('coordinates')
     store.create_variable(
-        'coordinates', 'numpy.float32',
+        'coordinates', 'quantized' if precision else 'numpy.float32',
         dimensions=('n_atoms', 'n_spatial'),
         description="coordinate of atom '{ix[1]}' in dimension " +
                    "'{ix[2]}' of configuration '{ix[0]}'.",
-        chunksizes=('n_atoms', 'n_spatial'))
+        chunksizes=('n_atoms', 'n_spatial'),
+        precision=precision,
+        key_interval=store.storage.snapshots.quantization_key_interval)
 
 
 @property
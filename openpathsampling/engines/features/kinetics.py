@@ -9,7 +9,8 @@ dimensions = ['n_atoms', 'n_spatial']
 
 
 def netcdfplus_init(store):
-    kinetic_store = KineticContainerStore()
+    kinetic_store = KineticContainerStore(
+        deduplicate=store.storage.snapshots.deduplicate_containers)
     kinetic_store.set_caching(WeakLRUCache(10000))
 
     name = store.prefix + 'kinetics'
@@ -1,7 +1,10 @@
 import copy
+import hashlib
 
 import numpy as np
-from openpathsampling.netcdfplus import StorableObject, ObjectStore, WeakLRUCache
+from openpathsampling.netcdfplus import StorableObject, ObjectStore, \
+    WeakLRUCache, LoaderProxy
+from openpathsampling.netcdfplus.stores.object import HashedList
 from openpathsampling.integration_tools import error_if_no_simtk_unit, unit
 
 def unmask_quantity(quantity):
@@ -27,6 +30,211 @@ def unmask_quantity(quantity):
         return quantity
     return np.array(quantity.value_in_unit(q_unit)) * q_unit
 
+# =============================================================================
+# CONTENT DEDUPLICATION
+# =============================================================================
+
+class AliasHashedList(HashedList):
+    """
+    A HashedList that can map additional keys to existing positions
+    """
+    def __len__(self):
+        # the number of positions, not of keys
+        return len(self._list)
+
+    def alias(self, key, value):
+        """
+        Let `key` refer to the position `value`, which keeps its own key
+        """
+        dict.__setitem__(self, key, value)
+
+
+class ContainerStore(ObjectStore):
+    """
+    An ObjectStore for containers that can store equal content only once
+
+    If `deduplicate` is set, containers whose stored arrays are byte
+    identical to those of an already stored container (e.g., copies made
+    when importing the same frames again or snapshots that share
+    coordinates) are not written again. Their UUID is stored as an alias of
+    the stored container instead; loading an alias returns the stored
+    container.
+
+    Parameters
+    ----------
+    content_class : class
+        the class of the stored containers
+    deduplicate : bool
+        if `True` equal content is stored only once. This can only be set
+        when the store is created.
+
+    Attributes
+    ----------
+    payload : list of str
+        names of the variables holding the content; subclasses set this
+    """
+    payload = []
+
+    def __init__(self, content_class, deduplicate=False):
+        super(ContainerStore, self).__init__(content_class, json=False)
+        self.deduplicate = deduplicate
+        self._content_index = {}
+
+    def to_dict(self):
+        return {'deduplicate': self.deduplicate}
+
+    @property
+    def alias_dimension(self):
+        return self.prefix + 'alias'
+
+    @property
+    def n_aliases(self):
+        """int : number of containers stored as an alias"""
+        if not self.deduplicate:
+            return 0
+
+        return len(self.storage.dimensions[self.alias_dimension])
+
+    def content_arrays(self, obj):
+        """
+        Return the arrays of a container as they are stored
+
+        Parameters
+        ----------
+        obj : :class:`openpathsampling.netcdfplus.StorableObject`
+            the container
+
+        Returns
+        -------
+        list of numpy.ndarray or None
+        """
+        raise NotImplementedError
+
+    def content_digest(self, obj):
+        """
+        Return a hash of the stored content of a container
+
+        Parameters
+        ----------
+        obj : :class:`openpathsampling.netcdfplus.StorableObject`
+            the container
+
+        Returns
+        -------
+        str
+        """
+        digest = hashlib.sha1()
+        for array in self.content_arrays(obj):
+            if array is None:
+                digest.update(b'-')
+            else:
+                digest.update(str(array.shape).encode('ascii'))
+                digest.update(array.tobytes())
+
+        return digest.hexdigest()
+
+    def save(self, obj, idx=None):
+        if not self.deduplicate or isinstance(obj, LoaderProxy) or \
+                obj.__uuid__ in self.index:
+            return super(ContainerStore, self).save(obj, idx)
+
+        digest = self.content_digest(obj)
+        pos = self._content_index.get(digest)
+        if pos is None:
+            reference = super(ContainerStore, self).save(obj, idx)
+            pos = self.index.get(obj.__uuid__)
+            if pos is not None and pos >= 0:
+                self.vars['digest'][pos] = digest
+                self._content_index[digest] = pos
+
+            return reference
+
+        alias_idx = self.n_aliases
+        self.vars['alias_uuid'][alias_idx] = obj.__uuid__
+        self.vars['alias_position'][alias_idx] = pos
+        self.index.alias(obj.__uuid__, pos)
+
+        return self.reference(obj)
+
+    def create_uuid_index(self):
+        return AliasHashedList()
+
+    def load_indices(self):
+        super(ContainerStore, self).load_indices()
+        if self.deduplicate:
+            for uuid, pos in zip(self.vars['alias_uuid'][:],
+                                 self.vars['alias_position'][:]):
+                self.index.alias(uuid, pos)
+
+            self._content_index = {
+                digest: pos
+                for pos, digest in enumerate(self.vars['digest'][:])
+                if digest
+            }
+
+    def row_nbytes(self):
+        """
+        Return the number of bytes of content in a row
+
+        Returns
+        -------
+        int
+        """
+        return sum(
+            int(np.prod(variable.shape[1:])) * variable.dtype.itemsize
+            for variable in [self.variables[name] for name in self.payload]
+        )
+
+    def deduplication_summary(self):
+        """
+        Return how much storage the deduplication saved
+
+        Returns
+        -------
+        dict
+            the number of stored rows (`n_stored`), of containers stored as
+            an alias (`n_aliases`) and the approximate number of content
+            bytes not written because of that (`bytes_saved`)
+        """
+        n_aliases = self.n_aliases
+        return {
+            'n_stored': len(self),
+            'n_aliases': n_aliases,
+            'bytes_saved': n_aliases * self.row_nbytes()
+        }
+
+    def initialize(self):
+        super(ContainerStore, self).initialize()
+
+        if self.deduplicate:
+            self.create_variable(
+                'digest', 'str',
+                description="the hash of the content of object '{idx}'.")
+
+            self.storage.create_dimension(self.alias_dimension, 0)
+            self.storage.create_variable(
+                self.prefix + '_alias_uuid', 'uuid',
+                dimensions=(self.alias_dimension,),
+                description="the uuid of alias '{idx}'.",
+                chunksizes=(ObjectStore.default_store_chunk_size,))
+            self.storage.create_variable(
+                self.prefix + '_alias_position', 'index',
+                dimensions=(self.alias_dimension,),
+                description="the stored object alias '{idx}' refers to.",
+                chunksizes=(ObjectStore.default_store_chunk_size,))
+
+
+def _stored_array(value, value_unit):
+    # the array as written into a `numpy.float32` variable
+    if value is None:
+        return None
+
+    if hasattr(value, 'value_in_unit'):
+        value = value.value_in_unit(value_unit)
+
+    return np.ascontiguousarray(value, dtype=np.float32)
+
+
 # =============================================================================
 # SIMULATION CONFIGURATION
 # =============================================================================
@@ -80,6 +288,29 @@ class StaticContainer(StorableObject):
 
         return
 
+    @classmethod
+    def wrap(cls, coordinates, box_vectors):
+        """
+        Create a container that keeps the given arrays without copying them
+
+        Only use this for arrays that are not used anywhere else, like
+        arrays just returned by the engine.
+
+        Parameters
+        ----------
+        coordinates
+        box_vectors
+
+        Returns
+        -------
+        :class:`StaticContainer`
+        """
+        obj = cls.__new__(cls)
+        super(StaticContainer, obj).__init__()
+        obj.coordinates = coordinates
+        obj.box_vectors = box_vectors
+        return obj
+
     # =========================================================================
     # Comparison functions
     # =========================================================================
@@ -118,15 +349,25 @@ class StaticContainer(StorableObject):
         }
 
 
-class StaticContainerStore(ObjectStore):
+class StaticContainerStore(ContainerStore):
     """
     An ObjectStore for Configuration. Allows to store Configuration() instances in a netcdf file.
     """
-    def __init__(self):
-        super(StaticContainerStore, self).__init__(StaticContainer, json=False)
+    payload = ['coordinates', 'box_vectors']
 
-    def to_dict(self):
-        return {}
+    def __init__(self, deduplicate=False):
+        super(StaticContainerStore, self).__init__(StaticContainer,
+                                                   deduplicate=deduplicate)
+
+    def content_arrays(self, configuration):
+        box_vectors = configuration.box_vectors
+        if box_vectors is None:
+            # stored as zeros, see `_save`
+            n_spatial = configuration.coordinates.shape[1]
+            box_vectors = np.zeros((n_spatial, n_spatial))
+
+        return [_stored_array(configuration.coordinates, unit.nanometers),
+                _stored_array(box_vectors, unit.nanometers)]
 
     def _save(self, configuration, idx):
         # Store configuration.
@@ -153,6 +394,17 @@ class StaticContainerStore(ObjectStore):
 
         return configuration
 
+    def _load_range(self, start, stop):
+        coordinates = self._load_rows('coordinates', start, stop)
+        box_vectors = self._load_rows('box_vectors', start, stop)
+        return [
+            StaticContainer(
+                coordinates=coords,
+                box_vectors=box if np.count_nonzero(box) else None
+            )
+            for coords, box in zip(coordinates, box_vectors)
+        ]
+
     def coordinates_as_numpy(self, frame_indices=None, atom_indices=None):
         """
         Return the atom coordinates in the storage for given frame indices
@@ -179,6 +431,12 @@ class StaticContainerStore(ObjectStore):
 
         variable = self.storage.variables[self.prefix + '_coordinates']
 
+        if variable.var_type == 'quantized':
+            # the stored integers need decoding
+            values = self.vars['coordinates'][frame_indices, atom_indices]
+            return np.array(values.value_in_unit(unit.nanometers),
+                            dtype=np.float32)
+
         return variable[frame_indices, atom_indices, :].astype(
             np.float32).copy()
 
@@ -186,13 +444,16 @@ class StaticContainerStore(ObjectStore):
         super(StaticContainerStore, self).initialize()
         error_if_no_simtk_unit("StaticContainerStore")
 
+        precision = self.storage.snapshots.quantization.get('coordinates')
         self.create_variable(
-            'coordinates', 'numpy.float32',
+            'coordinates', 'quantized' if precision else 'numpy.float32',
             dimensions=('n_atoms', 'n_spatial'),
             description="coordinate of atom '{ix[1]}' in dimension " +
                         "'{ix[2]}' of configuration '{ix[0]}'.",
             chunksizes=('n_atoms', 'n_spatial'),
-            simtk_unit=unit.nanometers)
+            simtk_unit=unit.nanometers,
+            precision=precision,
+            key_interval=self.storage.snapshots.quantization_key_interval)
 
         self.create_variable(
             'box_vectors', 'numpy.float32',
@@ -231,6 +492,27 @@ class KineticContainer(StorableObject):
 
         self.velocities = copy.deepcopy(velocities)
 
+    @classmethod
+    def wrap(cls, velocities):
+        """
+        Create a container that keeps the given array without copying it
+
+        Only use this for arrays that are not used anywhere else, like
+        arrays just returned by the engine.
+
+        Parameters
+        ----------
+        velocities
+
+        Returns
+        -------
+        :class:`KineticContainer`
+        """
+        obj = cls.__new__(cls)
+        super(KineticContainer, obj).__init__()
+        obj.velocities = velocities
+        return obj
+
     # =========================================================================
     # Utility functions
     # =========================================================================
@@ -256,16 +538,20 @@ class KineticContainer(StorableObject):
         }
 
 
-class KineticContainerStore(ObjectStore):
+class KineticContainerStore(ContainerStore):
     """
     An ObjectStore for Momenta. Allows to store Momentum() instances in a netcdf file.
     """
 
-    def __init__(self):
-        super(KineticContainerStore, self).__init__(KineticContainer, json=False)
+    payload = ['velocities']
 
-    def to_dict(self):
-        return {}
+    def __init__(self, deduplicate=False):
+        super(KineticContainerStore, self).__init__(KineticContainer,
+                                                    deduplicate=deduplicate)
+
+    def content_arrays(self, momentum):
+        return [_stored_array(momentum.velocities,
+                              unit.nanometers / unit.picoseconds)]
 
     def _save(self, momentum, idx):
         self.vars['velocities'][idx, :, :] = momentum.velocities
@@ -276,6 +562,10 @@ class KineticContainerStore(ObjectStore):
         momentum = KineticContainer(velocities=velocities)
         return momentum
 
+    def _load_range(self, start, stop):
+        return [KineticContainer(velocities=velocities)
+                for velocities in self._load_rows('velocities', start, stop)]
+
     def velocities_as_numpy(self, frame_indices=None, atom_indices=None):
         """
         Return a block of stored velocities in the database as a numpy array.
@@ -298,6 +588,13 @@ class KineticContainerStore(ObjectStore):
 
         v = self.variables['velocities']
 
+        if v.var_type == 'quantized':
+            # the stored integers need decoding
+            values = self.vars['velocities'][frame_indices, atom_indices]
+            return np.array(
+                values.value_in_unit(unit.nanometers / unit.picoseconds),
+                dtype=np.float32)
+
         return v[frame_indices, atom_indices, :].astype(np.float32).copy()
 
     def velocities_as_array(self, frame_indices=None, atom_indices=None):
@@ -330,10 +627,13 @@ class KineticContainerStore(ObjectStore):
 
         super(KineticContainerStore, self).initialize()
 
+        precision = self.storage.snapshots.quantization.get('velocities')
         self.create_variable(
-            'velocities', 'numpy.float32',
+            'velocities', 'quantized' if precision else 'numpy.float32',
             dimensions=('n_atoms', 'n_spatial'),
             description="the velocity of atom 'atom' in dimension " +
                         "'coordinate' of momentum 'momentum'.",
             chunksizes=('n_atoms', 'n_spatial'),
-            simtk_unit=unit.nanometers / unit.picoseconds)
+            simtk_unit=unit.nanometers / unit.picoseconds,
+            precision=precision,
+            key_interval=self.storage.snapshots.quantization_key_interval)
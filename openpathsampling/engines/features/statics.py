@@ -11,7 +11,8 @@ storables = ['statics']
 dimensions = ['n_atoms', 'n_spatial']
 
 def netcdfplus_init(store):
-    static_store = StaticContainerStore()
+    static_store = StaticContainerStore(
+        deduplicate=store.storage.snapshots.deduplicate_containers)
     static_store.set_caching(WeakLRUCache(10000))
 
     name = store.prefix + 'statics'
@@ -13,10 +13,12 @@ dimensions = ['n_atoms', 'n_spatial']
 
 
 def netcdfplus_init(store):
-
+    precision = store.storage.snapshots.quantization.get('velocities')
     store.create_variable(
-        'velocities', 'numpy.float32',
+        'velocities', 'quantized' if precision else 'numpy.float32',
         dimensions=('n_atoms', 'n_spatial'),
         description="the velocity of atom 'atom' in dimension " +
                     "'coordinate' of momentum 'momentum'.",
-        chunksizes=('n_atoms', 'n_spatial'))
+        chunksizes=('n_atoms', 'n_spatial'),
+        precision=precision,
+        key_interval=store.storage.snapshots.quantization_key_interval)
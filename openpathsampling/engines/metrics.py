@@ -0,0 +1,383 @@
+"""
+Counters of the work done by dynamics engines and hooks into their loop
+
+An :class:`EngineMetrics` attached to an engine counts the frames and
+trajectories it generates, the time spent integrating, building snapshots
+and checking the stopping conditions, and the retries by cause. The
+counters are published to sinks, e.g. a CSV file or a text file in the
+Prometheus exposition format.
+
+>>> metrics = EngineMetrics(sinks=[PrometheusTextSink('engine.prom')])
+>>> engine.metrics = metrics
+
+More generally, an :class:`EngineHook` added to an engine (see
+:meth:`.DynamicsEngine.add_hook`) is called at the start and end of each
+trajectory, after each frame and on each retry.
+"""
+
+import csv
+import os
+import time
+
+from openpathsampling.profiling import profile, timer
+from openpathsampling.tools import replace_file
+
+
+class EngineHook(object):
+    """
+    Callbacks at the frame and trajectory boundaries of an engine
+
+    Subclasses override the callbacks they need; the default ones do
+    nothing. All callbacks get the engine as first argument.
+    """
+
+    def before_trajectory(self, engine, initial):
+        """
+        Called before the first frame of a trajectory is generated
+
+        Parameters
+        ----------
+        engine : :class:`.DynamicsEngine`
+        initial : :class:`.Trajectory`
+            the frames the trajectory starts from
+        """
+        pass
+
+    def after_frame(self, engine, trajectory, snapshot):
+        """
+        Called after a frame has been added to the trajectory
+
+        Parameters
+        ----------
+        engine : :class:`.DynamicsEngine`
+        trajectory : :class:`.Trajectory`
+            the trajectory so far, including the new frame
+        snapshot : :class:`.BaseSnapshot`
+            the new frame, as generated by the engine
+        """
+        pass
+
+    def on_retry(self, engine, trajectory, cause):
+        """
+        Called when the engine retries to generate a trajectory
+
+        Parameters
+        ----------
+        engine : :class:`.DynamicsEngine`
+        trajectory : :class:`.Trajectory`
+            the trajectory that is discarded
+        cause : str
+            one of `'nan'`, `'error'` or `'max_length'`
+        """
+        pass
+
+    def after_trajectory(self, engine, trajectory, error=None):
+        """
+        Called when the engine has finished a trajectory
+
+        Parameters
+        ----------
+        engine : :class:`.DynamicsEngine`
+        trajectory : :class:`.Trajectory`
+            the final trajectory
+        error : Exception or None
+            the error raised after the trajectory, if the engine failed
+        """
+        pass
+
+
+class _Timing(object):
+    # time of a phase, not counting the phases inside it
+    __slots__ = ['metrics', 'phase', 'profiled', 'start', 'nested']
+
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+        self.profiled = profile('engine.' + phase)
+
+    def __enter__(self):
+        self.profiled.__enter__()
+        self.metrics._timings.append(self)
+        self.nested = 0.0
+        self.start = timer()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = timer() - self.start
+        metrics = self.metrics
+        timings = metrics._timings
+        timings.pop()
+        if timings:
+            timings[-1].nested += elapsed
+
+        metrics.seconds[self.phase] += elapsed - self.nested
+        return self.profiled.__exit__(exc_type, exc_val, exc_tb)
+
+
+class EngineMetrics(EngineHook):
+    """
+    Counters of the frames, time and retries of an engine
+
+    Parameters
+    ----------
+    sinks : list of :class:`MetricsSink` or None
+        the sinks the counters are published to
+    publish_frequency : int
+        the counters are published every `publish_frequency` trajectories;
+        `0` only publishes when :meth:`publish` is called
+    name : str or None
+        the name used to label the published counters; defaults to the
+        name of the engine that finished the last trajectory
+
+    Attributes
+    ----------
+    frames : int
+        the number of frames generated
+    trajectories : int
+        the number of trajectories finished
+    seconds : dict of str: float
+        the time spent in `'integrate'`, `'snapshot'` (building
+        snapshots), `'nan_check'` (the check for `nan`) and `'stop_check'`
+        (stopping conditions). The time of building snapshots inside the
+        integration only counts as `'snapshot'`.
+    retries : dict of str: int
+        the number of retries for each cause, `'nan'`, `'error'` and
+        `'max_length'`
+    failures : dict of str: int
+        the number of trajectories that failed with each cause
+    """
+
+    phases = ['integrate', 'snapshot', 'nan_check', 'stop_check']
+    causes = ['nan', 'error', 'max_length']
+
+    def __init__(self, sinks=None, publish_frequency=1, name=None):
+        self.sinks = list(sinks) if sinks is not None else []
+        self.publish_frequency = publish_frequency
+        self.name = name
+        self._timings = []
+        self._last_engine = None
+        self.reset()
+
+    def reset(self):
+        """
+        Set all counters to zero
+        """
+        self.frames = 0
+        self.trajectories = 0
+        self.seconds = {phase: 0.0 for phase in self.phases}
+        self.retries = {cause: 0 for cause in self.causes}
+        self.failures = {cause: 0 for cause in self.causes}
+
+    def timing(self, phase):
+        """
+        Return a context manager adding its time to a phase
+
+        Parameters
+        ----------
+        phase : str
+            one of :attr:`phases`
+
+        Returns
+        -------
+        context manager
+        """
+        return _Timing(self, phase)
+
+    @property
+    def frames_per_second(self):
+        """float : frames generated per second of integration"""
+        busy = self.seconds['integrate'] + self.seconds['snapshot']
+        return self.frames / busy if busy > 0.0 else 0.0
+
+    def after_frame(self, engine, trajectory, snapshot):
+        self.frames += 1
+
+    def on_retry(self, engine, trajectory, cause):
+        self.retries[cause] += 1
+
+    def after_trajectory(self, engine, trajectory, error=None):
+        self.trajectories += 1
+        if error is not None:
+            self.failures[_cause(error)] += 1
+
+        self._last_engine = engine
+        if self.publish_frequency and \
+                self.trajectories % self.publish_frequency == 0:
+            self.publish()
+
+    def to_dict(self):
+        """
+        Return all counters in a flat dict
+
+        Returns
+        -------
+        dict of str: float or int
+        """
+        dct = {
+            'frames': self.frames,
+            'trajectories': self.trajectories
+        }
+        for phase in self.phases:
+            dct[phase + '_seconds'] = self.seconds[phase]
+        for cause in self.causes:
+            dct['retries_' + cause] = self.retries[cause]
+        for cause in self.causes:
+            dct['failures_' + cause] = self.failures[cause]
+
+        return dct
+
+    @property
+    def label(self):
+        """str : the name used to label the published counters"""
+        if self.name is not None:
+            return self.name
+        if self._last_engine is not None:
+            return self._last_engine.name
+        return ''
+
+    def publish(self):
+        """
+        Write the current counters to all sinks
+        """
+        for sink in self.sinks:
+            sink.write(self)
+
+
+def _cause(error):
+    # avoid circular import with dynamics_engine
+    from .dynamics_engine import EngineNaNError, EngineMaxLengthError
+    if isinstance(error, EngineNaNError):
+        return 'nan'
+    elif isinstance(error, EngineMaxLengthError):
+        return 'max_length'
+    else:
+        return 'error'
+
+
+class MetricsSink(object):
+    """
+    Abstract destination of published :class:`EngineMetrics`
+    """
+
+    def write(self, metrics):
+        """
+        Publish the current counters
+
+        Parameters
+        ----------
+        metrics : :class:`EngineMetrics`
+        """
+        raise NotImplementedError
+
+
+class MemorySink(MetricsSink):
+    """
+    Keeps all published counters in memory
+
+    Attributes
+    ----------
+    records : list of dict
+        the counters (see :meth:`EngineMetrics.to_dict`) of each
+        publication, with the `time` and `engine` label added
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, metrics):
+        record = metrics.to_dict()
+        record['time'] = time.time()
+        record['engine'] = metrics.label
+        self.records.append(record)
+
+
+class CSVSink(MetricsSink):
+    """
+    Appends the published counters as rows to a CSV file
+
+    The header is written if the file is new.
+
+    Parameters
+    ----------
+    filename : str
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def write(self, metrics):
+        counters = metrics.to_dict()
+        fields = ['time', 'engine'] + sorted(counters)
+        row = dict(counters, time=time.time(), engine=metrics.label)
+        new_file = not os.path.exists(self.filename) or \
+            os.path.getsize(self.filename) == 0
+        with open(self.filename, 'a') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            if new_file:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+class PrometheusTextSink(MetricsSink):
+    """
+    Writes the counters in the Prometheus text exposition format
+
+    The file only holds the latest counters and is replaced at once, so it
+    can be read at any time, e.g. by the textfile collector of the node
+    exporter or any other local scraper.
+
+    Parameters
+    ----------
+    filename : str
+    prefix : str
+        the prefix of all metric names
+    """
+
+    def __init__(self, filename, prefix='ops_engine'):
+        self.filename = filename
+        self.prefix = prefix
+
+    def lines(self, metrics):
+        """
+        Return the lines of the exposition format for the counters
+
+        Parameters
+        ----------
+        metrics : :class:`EngineMetrics`
+
+        Returns
+        -------
+        list of str
+        """
+        label = 'engine="%s"' % _escape(metrics.label)
+        values = [
+            ('frames_total', 'Frames generated', [('', metrics.frames)]),
+            ('trajectories_total', 'Trajectories finished',
+             [('', metrics.trajectories)]),
+            ('seconds_total', 'Time spent per phase',
+             [('phase="%s"' % phase, metrics.seconds[phase])
+              for phase in metrics.phases]),
+            ('retries_total', 'Retries per cause',
+             [('cause="%s"' % cause, metrics.retries[cause])
+              for cause in metrics.causes]),
+            ('failures_total', 'Failed trajectories per cause',
+             [('cause="%s"' % cause, metrics.failures[cause])
+              for cause in metrics.causes]),
+        ]
+        lines = []
+        for name, description, samples in values:
+            name = self.prefix + '_' + name
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s counter' % name)
+            for extra, value in samples:
+                labels = label + ',' + extra if extra else label
+                lines.append('%s{%s} %s' % (name, labels, repr(value)))
+
+        return lines
+
+    def write(self, metrics):
+        replace_file(self.filename, '\n'.join(self.lines(metrics)) + '\n')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
@@ -15,8 +15,11 @@ except ImportError:
     trajectory_to_mdtraj = missing_openmm
     Snapshot = missing_openmm
     MDSnapshot = missing_openmm
+    ContextPool = missing_openmm
+    context_pool = None
 else:
     from .engine import OpenMMEngine as Engine
+    from .context_pool import ContextPool, context_pool
     from .tools import (
         empty_snapshot_from_openmm_topology,
         snapshot_from_pdb,
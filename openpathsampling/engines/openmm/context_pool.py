@@ -0,0 +1,255 @@
+"""
+A process-wide pool of OpenMM simulations shared between engines
+"""
+
+import hashlib
+import json
+import logging
+import weakref
+from collections import OrderedDict
+
+# OpenMM is only imported where simulations are created or serialized, so
+# the bookkeeping of the pool does not depend on it
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSimulation(object):
+    """
+    A simulation in the pool and the engines using it
+
+    Attributes
+    ----------
+    key : tuple
+        the pool key of the simulation
+    simulation : `simtk.openmm.app.Simulation`
+        the simulation (and its context)
+    """
+    def __init__(self, key, simulation):
+        self.key = key
+        self.simulation = simulation
+        self._engines = {}
+        self._owner = None
+
+    @property
+    def n_engines(self):
+        """int : number of engines currently holding the simulation"""
+        return len(self._engines)
+
+    @property
+    def owner(self):
+        """:class:`.OpenMMEngine` or None : the engine that last used the
+        context"""
+        return self._owner() if self._owner is not None else None
+
+    def activate(self, engine):
+        """
+        Mark the engine as the one that uses the context
+
+        Each engine keeps its own state on a shared context: before another
+        engine uses the context, the state of the previous user is kept as
+        its current snapshot (see :meth:`.OpenMMEngine.save_context_state`)
+        and the state of the new user is put back into the context (see
+        :meth:`.OpenMMEngine.restore_context_state`).
+
+        Parameters
+        ----------
+        engine : :class:`.OpenMMEngine`
+        """
+        owner = self.owner
+        if owner is not engine:
+            if owner is not None:
+                owner.save_context_state()
+            self._owner = weakref.ref(engine)
+            engine.restore_context_state()
+
+
+class ContextPool(object):
+    """
+    Shares OpenMM simulations between engines with the same system
+
+    Engines with the same system, integrator (compared by their XML
+    serialization), platform and platform properties only differ in their
+    OPS options, e.g. `n_frames_max`, and can run on the same context.
+    Creating a context is expensive and some platforms (e.g. CUDA) can only
+    hold a few of them, so engines request their simulation from this pool.
+
+    Engines with the same system but a different topology (e.g. other
+    atom names) get their own simulation.
+
+    :meth:`.OpenMMEngine.unload_context` frees the context once no other
+    engine uses it. Simulations of engines that are reset or garbage
+    collected are kept for reuse; only the `max_idle` most recently used
+    idle simulations are kept.
+
+    Parameters
+    ----------
+    max_idle : int
+        the maximal number of idle simulations kept for reuse
+
+    Notes
+    -----
+    The context of a shared simulation is created with the integrator of
+    the first engine, so changing the integrator object of another engine
+    does not change the context. Switching between engines on a shared
+    context reads the state of one and sets the state of the other.
+    """
+    def __init__(self, max_idle=1):
+        self.max_idle = max_idle
+        self._active = {}
+        self._idle = OrderedDict()
+
+    def __len__(self):
+        return len(self._active) + len(self._idle)
+
+    @staticmethod
+    def _xml(obj):
+        import simtk.openmm
+        return simtk.openmm.XmlSerializer.serialize(obj)
+
+    def key(self, engine, platform=None):
+        """
+        Return the pool key of an engine and platform
+
+        Parameters
+        ----------
+        engine : :class:`.OpenMMEngine`
+        platform : str or `simtk.openmm.Platform` or None
+            the platform as passed to :meth:`.OpenMMEngine.initialize`
+
+        Returns
+        -------
+        tuple
+        """
+        if platform is not None and type(platform) is not str:
+            platform = platform.getName()
+
+        serialized = [
+            self._xml(engine.system),
+            self._xml(engine.integrator),
+            json.dumps(engine.topology.to_dict(), sort_keys=True)
+        ]
+        digests = tuple(
+            hashlib.sha1(text.encode('utf-8')).hexdigest()
+            for text in serialized
+        )
+        properties = tuple(sorted(
+            (str(name), str(value))
+            for name, value in engine.openmm_properties.items()
+        ))
+        return digests + (platform, properties)
+
+    def acquire(self, engine, platform=None):
+        """
+        Return a simulation for the engine, creating it if necessary
+
+        Parameters
+        ----------
+        engine : :class:`.OpenMMEngine`
+        platform : str or `simtk.openmm.Platform` or None
+            either a string with a name of the platform or a platform object
+            if None it will default to the fastest currently available
+            platform
+
+        Returns
+        -------
+        :class:`PooledSimulation`
+        """
+        key = self.key(engine, platform)
+        pooled = self._active.get(key)
+        if pooled is None:
+            pooled = self._idle.pop(key, None)
+            if pooled is None:
+                pooled = PooledSimulation(
+                    key, self._create(engine, platform))
+            else:
+                logger.info('Reusing idle OpenMM context')
+
+            self._active[key] = pooled
+
+        self.attach(pooled, engine)
+        return pooled
+
+    def attach(self, pooled, engine):
+        """
+        Let another engine use a simulation in use
+
+        Parameters
+        ----------
+        pooled : :class:`PooledSimulation`
+            the simulation, which needs to be in use
+        engine : :class:`.OpenMMEngine`
+        """
+        engine_id = id(engine)
+        # engines that are removed without unloading release the simulation
+        pooled._engines[engine_id] = weakref.ref(
+            engine, lambda _: self._release(pooled, engine_id))
+
+    def release(self, pooled, engine, free=False):
+        """
+        Mark that an engine does not use the simulation anymore
+
+        Parameters
+        ----------
+        pooled : :class:`PooledSimulation`
+        engine : :class:`.OpenMMEngine`
+        free : bool
+            if `True` the context is freed if no other engine uses it,
+            otherwise it is kept for reuse
+        """
+        self._release(pooled, id(engine), free)
+
+    def _release(self, pooled, engine_id, free=False):
+        if pooled._engines.pop(engine_id, None) is None:
+            return
+
+        if id(pooled.owner) == engine_id:
+            pooled._owner = None
+
+        if not pooled._engines and \
+                self._active.get(pooled.key) is pooled:
+            del self._active[pooled.key]
+            if free:
+                self._free(pooled)
+                return
+
+            self._idle[pooled.key] = pooled
+            while len(self._idle) > self.max_idle:
+                _, evicted = self._idle.popitem(last=False)
+                self._free(evicted)
+
+    def clear(self):
+        """
+        Remove all idle simulations to free their contexts
+        """
+        for pooled in self._idle.values():
+            self._free(pooled)
+
+        self._idle.clear()
+
+    @staticmethod
+    def _free(pooled):
+        # free the context right away, so its integrator can be used again
+        del pooled.simulation.context
+
+    @staticmethod
+    def _create(engine, platform):
+        import simtk.openmm
+        import simtk.openmm.app
+        kwargs = {}
+        if type(platform) is str:
+            kwargs['platform'] = \
+                simtk.openmm.Platform.getPlatformByName(platform)
+        elif platform is not None:
+            kwargs['platform'] = platform
+
+        return simtk.openmm.app.Simulation(
+            topology=engine.topology.mdtraj.to_openmm(),
+            system=engine.system,
+            integrator=engine.integrator,
+            platformProperties=engine.openmm_properties,
+            **kwargs
+        )
+
+
+context_pool = ContextPool()
@@ -6,6 +6,7 @@ import simtk.openmm.app
 import simtk.unit as u
 
 from openpathsampling.engines import DynamicsEngine, SnapshotDescriptor
+from .context_pool import context_pool
 from .snapshot import Snapshot
 import numpy as np
 
@@ -55,7 +56,9 @@ class OpenMMEngine(DynamicsEngine):
     """OpenMM dynamics engine based on 'simtk.openmm` system and integrator.
 
     The engine will create a :class:`simtk.openmm.app.Simulation` instance
-    and uses this to generate new frames.
+    and uses this to generate new frames. Simulations are taken from the
+    process-wide :class:`.ContextPool`, so engines that only differ in their
+    options share one context.
 
     """
 
@@ -68,6 +71,7 @@ class OpenMMEngine(DynamicsEngine):
     _default_options = {
         'n_steps_per_frame': 10,
         'n_frames_max': 5000,
+        'get_energy': False,
     }
 
     base_snapshot_type = Snapshot
@@ -105,6 +109,9 @@ class OpenMMEngine(DynamicsEngine):
                 'n_frames_max' : int or None, default: 5000,
                     the maximal number of frames allowed for a returned
                     trajectory object
+                'get_energy' : bool, default: False
+                    also read the potential and kinetic energy whenever a
+                    snapshot is created, see :attr:`current_energies`
 
         Notes
         -----
@@ -143,8 +150,10 @@ class OpenMMEngine(DynamicsEngine):
         self._current_momentum = None
         self._current_configuration = None
         self._current_box_vectors = None
+        self._current_energies = None
 
         self._simulation = None
+        self._pooled = None
 
     def from_new_options(
             self,
@@ -174,6 +183,9 @@ class OpenMMEngine(DynamicsEngine):
                 'n_frames_max' : int or None, default: 5000,
                     the maximal number of frames allowed for a returned
                     trajectory object
+                'get_energy' : bool, default: False
+                    also read the potential and kinetic energy whenever a
+                    snapshot is created, see :attr:`current_energies`
 
         Notes
         -----
@@ -211,6 +223,8 @@ class OpenMMEngine(DynamicsEngine):
             # change the integrator it means if it exists we copy the
             # simulation object
 
+            context_pool.attach(self._pooled, new_engine)
+            new_engine._pooled = self._pooled
             new_engine._simulation = self._simulation
 
         return new_engine
@@ -231,6 +245,9 @@ class OpenMMEngine(DynamicsEngine):
         if self._simulation is None:
             self.initialize()
 
+        if self._pooled is not None:
+            self._pooled.activate(self)
+
         return self._simulation
 
     def reset(self):
@@ -242,19 +259,29 @@ class OpenMMEngine(DynamicsEngine):
         """
 
         logger.info('Removed existing OpenMM engine.')
-        self._simulation = None
+        self._release_simulation()
 
     def unload_context(self):
         """
         Unload the OpenMM context
 
-        Certain platforms can only exist once, e.g. CUDA. To use multiple
-        engines you need to manually initialize and unload contexts.
+        Certain platforms can only hold a few contexts, e.g. CUDA, so
+        switching between engines with different systems requires to unload
+        the context of the first one. The context is freed unless another
+        engine still shares it (see :class:`.ContextPool`); then it is freed
+        when the last of them unloads it.
 
         """
-        if self._simulation is not None:
-            del self._simulation.context
-            self._simulation = None
+        self._release_simulation(free=True)
+
+    def _release_simulation(self, free=False):
+        if self._pooled is not None:
+            context_pool.release(self._pooled, self, free)
+            self._pooled = None
+
+        self._simulation = None
+        self._current_snapshot = None
+        self._current_energies = None
 
     def initialize(self, platform=None):
         """
@@ -276,29 +303,8 @@ class OpenMMEngine(DynamicsEngine):
         """
 
         if self._simulation is None:
-            if type(platform) is str:
-                self._simulation = simtk.openmm.app.Simulation(
-                    topology=self.topology.mdtraj.to_openmm(),
-                    system=self.system,
-                    integrator=self.integrator,
-                    platform=simtk.openmm.Platform.getPlatformByName(platform),
-                    platformProperties=self.openmm_properties
-                )
-            elif platform is None:
-                self._simulation = simtk.openmm.app.Simulation(
-                    topology=self.topology.mdtraj.to_openmm(),
-                    system=self.system,
-                    integrator=self.integrator,
-                    platformProperties=self.openmm_properties
-                )
-            else:
-                self._simulation = simtk.openmm.app.Simulation(
-                    topology=self.topology.mdtraj.to_openmm(),
-                    system=self.system,
-                    integrator=self.integrator,
-                    platform=platform,
-                    platformProperties=self.openmm_properties
-                )
+            self._pooled = context_pool.acquire(self, platform)
+            self._simulation = self._pooled.simulation
 
             logger.info(
                 'Initialized OpenMM engine using platform `%s`' %
@@ -382,23 +388,60 @@ class OpenMMEngine(DynamicsEngine):
 
 
     def _build_current_snapshot(self):
-        # TODO: Add caching for this and mark if changed
+        """
+        Create a snapshot from the current state of the context
+
+        The arrays returned by OpenMM are used by the snapshot without
+        copying them, and are tested for NaN right away; the result is
+        kept for :meth:`is_valid_snapshot`. The energies are only read if
+        the `get_energy` option is set.
 
+        Returns
+        -------
+        :class:`.Snapshot`
+        """
         state = self.simulation.context.getState(getPositions=True,
                                                  getVelocities=True,
-                                                 getEnergy=True)
-
-        snapshot = Snapshot.construct(
-            coordinates=state.getPositions(asNumpy=True),
-            box_vectors=state.getPeriodicBoxVectors(asNumpy=True),
-            velocities=state.getVelocities(asNumpy=True),
-            engine=self
+                                                 getEnergy=self.get_energy)
+        coordinates = state.getPositions(asNumpy=True)
+        velocities = state.getVelocities(asNumpy=True)
+
+        snapshot = Snapshot(
+            engine=self,
+            statics=Snapshot.StaticContainer.wrap(
+                coordinates=coordinates,
+                box_vectors=state.getPeriodicBoxVectors(asNumpy=True)
+            ),
+            kinetics=Snapshot.KineticContainer.wrap(
+                velocities=velocities
+            )
         )
+        snapshot._is_valid = not (np.isnan(np.min(coordinates._value)) or
+                                  np.isnan(np.min(velocities._value)))
+
+        if self.get_energy:
+            self._current_energies = (state.getPotentialEnergy(),
+                                      state.getKineticEnergy())
 
         return snapshot
 
+    @property
+    def current_energies(self):
+        """
+        tuple of simtk.unit.Quantity or None : the potential and kinetic
+        energy of the last snapshot created by the engine; only read if the
+        `get_energy` option is set, e.g. to record them for each frame in
+        an :class:`.EngineHook`
+        """
+        return self._current_energies
+
     @staticmethod
     def is_valid_snapshot(snapshot):
+        # snapshots built by the engine were tested on creation
+        valid = getattr(snapshot, '_is_valid', None)
+        if valid is not None:
+            return valid
+
         if np.isnan(np.min(snapshot.coordinates._value)):
             return False
 
@@ -417,23 +460,48 @@ class OpenMMEngine(DynamicsEngine):
     def _changed(self):
         self._current_snapshot = None
 
+    def _set_context_state(self, snapshot):
+        context = self.simulation.context
+        # if snapshot.coordinates is not None:
+        context.setPositions(snapshot.coordinates)
+
+        if snapshot.box_vectors is not None:
+            context.setPeriodicBoxVectors(
+                snapshot.box_vectors[0],
+                snapshot.box_vectors[1],
+                snapshot.box_vectors[2]
+            )
+
+        # if snapshot.velocities is not None:
+        context.setVelocities(snapshot.velocities)
+
+    def save_context_state(self):
+        """
+        Keep the current state before another engine uses a shared context
+
+        The state is kept as the current snapshot of this engine.
+        """
+        _ = self.current_snapshot
+
+    def restore_context_state(self):
+        """
+        Set the state of this engine after another engine used the context
+
+        Engines sharing a context (see :class:`.ContextPool`) keep their own
+        state; this puts the current snapshot of this engine back into the
+        context.
+        """
+        if self._current_snapshot is not None:
+            self._set_context_state(self._current_snapshot)
+
     @current_snapshot.setter
     def current_snapshot(self, snapshot):
         self.check_snapshot_type(snapshot)
 
         if snapshot is not self._current_snapshot:
-            # if snapshot.coordinates is not None:
-            self.simulation.context.setPositions(snapshot.coordinates)
-
-            if snapshot.box_vectors is not None:
-                self.simulation.context.setPeriodicBoxVectors(
-                    snapshot.box_vectors[0],
-                    snapshot.box_vectors[1],
-                    snapshot.box_vectors[2]
-                )
-
-            # if snapshot.velocities is not None:
-            self.simulation.context.setVelocities(snapshot.velocities)
+            # no need to restore the old state on a shared context first
+            self._current_snapshot = None
+            self._set_context_state(snapshot)
 
             # After the updates cache the new snapshot
             if snapshot.engine is self:
@@ -444,8 +512,9 @@ class OpenMMEngine(DynamicsEngine):
 
     def generate_next_frame(self):
         self.simulation.step(self.n_steps_per_frame)
-        self._current_snapshot = None
-        return self.current_snapshot
+        with self._timed('snapshot'):
+            self._current_snapshot = self._build_current_snapshot()
+        return self._current_snapshot
 
     def minimize(self):
         self.simulation.minimizeEnergy()
@@ -133,4 +133,5 @@ class ToyEngine(DynamicsEngine):
     def generate_next_frame(self):
         for i in range(self.n_steps_per_frame):
             self.integ.step(sys=self)
-        return self.current_snapshot
+        with self._timed('snapshot'):
+            return self.current_snapshot
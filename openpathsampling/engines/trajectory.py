@@ -3,15 +3,175 @@
 @author: JH Prinz
 """
 
+import weakref
+
 import numpy as np
 
 from openpathsampling.integration_tools import (
     error_if_no_mdtraj, is_simtk_quantity_type, md
 )
-from openpathsampling.netcdfplus import StorableObject, LoaderProxy
+from openpathsampling.netcdfplus import StorableObject, LoaderProxy, \
+    prefetch_proxies
 import openpathsampling as paths
 
 
+# ==============================================================================
+# FRAME FEATURES
+# ==============================================================================
+
+class FrameFeatureTable(object):
+    """
+    Per-frame values of features (e.g. volumes) shared by related trajectories
+
+    A table is attached to a trajectory and passed on to trajectories
+    created from it by slicing, concatenation, reversal or copying. Values
+    are stored per frame, so each frame is evaluated only once for a
+    feature, no matter in how many of these trajectories it appears. Frames
+    are referenced weakly, so values disappear with the frames.
+
+    Examples
+    --------
+    >>> in_a = traj.features.values(volume_a, traj.as_proxies(),
+    ...                             volume_a.compiled)
+    """
+
+    def __init__(self):
+        self._tables = {}
+
+    def __len__(self):
+        return len(self._tables)
+
+    def table(self, feature):
+        """
+        Return the per-frame table of a feature
+
+        Parameters
+        ----------
+        feature : object
+            the (hashable) feature, e.g. a volume
+
+        Returns
+        -------
+        :class:`weakref.WeakKeyDictionary`
+            the values of this feature keyed by frame
+        """
+        try:
+            return self._tables[feature]
+        except KeyError:
+            table = weakref.WeakKeyDictionary()
+            self._tables[feature] = table
+            return table
+
+    def values(self, feature, frames, evaluate):
+        """
+        Return the values of a feature for frames, evaluating unknown frames
+
+        Parameters
+        ----------
+        feature : object
+            the (hashable) feature, e.g. a volume
+        frames : list of :class:`openpathsampling.engines.BaseSnapshot`
+            the frames to get values for
+        evaluate : callable
+            function that returns the values for a list of frames. It is
+            only called with the frames that are not in the table.
+
+        Returns
+        -------
+        list
+            the values for each frame
+        """
+        table = self.table(feature)
+        results = []
+        missing = []
+        for pos, frame in enumerate(frames):
+            try:
+                results.append(table[frame])
+            except (KeyError, TypeError):
+                results.append(None)
+                missing.append(pos)
+
+        if missing:
+            new_values = evaluate([frames[pos] for pos in missing])
+            for pos, value in zip(missing, new_values):
+                results[pos] = value
+                try:
+                    table[frames[pos]] = value
+                except TypeError:
+                    # frames that do not support weak references
+                    pass
+
+        return results
+
+    def value(self, feature, frame, evaluate):
+        """
+        Return the value of a feature for a single frame
+
+        Parameters
+        ----------
+        feature : object
+            the (hashable) feature, e.g. a volume
+        frame : :class:`openpathsampling.engines.BaseSnapshot`
+            the frame to get the value for
+        evaluate : callable
+            function that returns the value of a single frame
+
+        Returns
+        -------
+        object
+            the value for the frame
+        """
+        table = self.table(feature)
+        try:
+            return table[frame]
+        except (KeyError, TypeError):
+            value = evaluate(frame)
+            try:
+                table[frame] = value
+            except TypeError:
+                pass
+
+            return value
+
+    def update(self, other):
+        """
+        Add all values of another table to this one
+        """
+        for feature, table in other._tables.items():
+            self.table(feature).update(table)
+
+    @staticmethod
+    def join(first, second):
+        """
+        Return the table for a trajectory made from two trajectories
+
+        If only one of the trajectories has a table, or both have the same,
+        that table is shared. If both have different tables, a new table
+        with the values of both is returned; the tables of the trajectories
+        are not changed.
+
+        Parameters
+        ----------
+        first : :class:`Trajectory` or list
+        second : :class:`Trajectory` or list
+
+        Returns
+        -------
+        :class:`FrameFeatureTable` or None
+        """
+        table = getattr(first, '_features', None)
+        other = getattr(second, '_features', None)
+        if table is None:
+            return other
+        elif other is None or other is table:
+            return table
+
+        joined = FrameFeatureTable()
+        joined.update(table)
+        joined.update(other)
+        return joined
+
+
 # ==============================================================================
 # TRAJECTORY
 # ==============================================================================
@@ -24,6 +184,17 @@ class Trajectory(list, StorableObject):
 
     engine = None
 
+    # the FrameFeatureTable shared with related trajectories; class level
+    # default so that `__getattr__` is not used
+    _features = None
+
+    # map of snapshot UUIDs to their first position, built when needed and
+    # dropped when the trajectory changes
+    _uuid_index = None
+
+    # the frames of the reversed trajectory, see `reversed`
+    _reversed_frames = None
+
     def __init__(self, trajectory=None):
         """
         Create a simulation trajectory object
@@ -42,15 +213,71 @@ class Trajectory(list, StorableObject):
         if trajectory is not None:
             if type(trajectory) is Trajectory:
                 self.extend(trajectory.iter_proxies())
+                self._features = trajectory._features
             else:
                 self.extend(trajectory)
 
     def extend(self, iterable):
+        self._changed()
         if type(iterable) is Trajectory:
             list.extend(self, iterable.iter_proxies())
         else:
             list.extend(self, iterable)
 
+    def __getstate__(self):
+        # the UUID index and the reversed frames belong to this object and
+        # are not copied
+        state = dict(self.__dict__)
+        state.pop('_uuid_index', None)
+        state.pop('_reversed_frames', None)
+        return state
+
+    def _changed(self):
+        # called before the list is changed; drops everything derived from
+        # the current frames
+        self._uuid_index = None
+        self._reversed_frames = None
+
+    def append(self, item):
+        self._changed()
+        list.append(self, item)
+
+    def insert(self, index, item):
+        self._changed()
+        list.insert(self, index, item)
+
+    def remove(self, item):
+        self._changed()
+        list.remove(self, item)
+
+    def pop(self, index=-1):
+        self._changed()
+        return list.pop(self, index)
+
+    def reverse(self):
+        self._changed()
+        list.reverse(self)
+
+    def sort(self, *args, **kwargs):
+        self._changed()
+        list.sort(self, *args, **kwargs)
+
+    def __setitem__(self, index, value):
+        self._changed()
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self._changed()
+        list.__delitem__(self, index)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, n):
+        self._changed()
+        return list.__imul__(self, n)
+
     def to_dict(self):
         return {
             'snapshots': self.as_proxies()
@@ -93,13 +320,42 @@ class Trajectory(list, StorableObject):
         creates a new Trajectory object and then fills it with shallow reversed
         copies of the contained snapshots.
 
+        Each call returns a new trajectory, so it takes time linear in the
+        number of frames; the trajectory is a list and cannot be a lazy
+        view. Only the reversed snapshots are remembered as long as the
+        trajectory is not changed, so asking again (or for the reversed of
+        the reversed) does not reverse the snapshots again.
+
         Returns
         -------
         :class:`openpathsampling.trajectory.Trajectory`
             the reversed trajectory
         """
+        frames = self._reversed_frames
+        if frames is None:
+            # proxies reverse without loading their snapshot
+            frames = tuple(snap.reversed
+                           for snap in list.__reversed__(self))
+            self._reversed_frames = frames
+
+        traj = Trajectory()
+        list.extend(traj, frames)
+        traj._features = self._features
+        traj._reversed_frames = tuple(list.__iter__(self))
+        return traj
 
-        return Trajectory([snap for snap in reversed(self)])
+    @property
+    def features(self):
+        """
+        :class:`FrameFeatureTable` : per-frame values of volumes and CVs
+
+        The table is shared with trajectories created from this one by
+        slicing, concatenation and reversal.
+        """
+        if self._features is None:
+            self._features = FrameFeatureTable()
+
+        return self._features
 
     @property
     def n_snapshots(self):
@@ -147,9 +403,9 @@ class Trajectory(list, StorableObject):
             out = [getattr(snap, item) for snap in self]
 
             # if the first result is a numpy object, return the whole as a
-            # numpy array
+            # numpy array (copied at once if the snapshots share a block)
             if isinstance(out[0], np.ndarray):
-                out = np.array(out)
+                out = stack_arrays(out)
 
             return out
 
@@ -174,6 +430,7 @@ class Trajectory(list, StorableObject):
         ret = list.__getslice__(self, *args, **kwargs)
         if type(ret) is list:
             ret = Trajectory(ret)
+            ret._features = self._features
 
         return ret
 
@@ -201,12 +458,13 @@ class Trajectory(list, StorableObject):
     def __getitem__(self, index):
         # Allow for numpy style selection using lists
         if hasattr(index, '__iter__'):
-            ret = [list.__getitem__(self, i) for i in index]
+            ret = list(map(list.__getitem__.__get__(self), index))
         else:
             ret = list.__getitem__(self, index)
 
         if type(ret) is list:
             ret = Trajectory(ret)
+            ret._features = self._features
         elif type(ret) is LoaderProxy:
             ret = ret.__subject__
 
@@ -216,22 +474,44 @@ class Trajectory(list, StorableObject):
         for snap_idx in range(len(self) - 1, -1, -1):
             yield self[snap_idx].reversed
 
+    def _positions(self):
+        # the map of snapshot UUIDs to their first position
+        if self._uuid_index is None:
+            uuids = [snap.__uuid__ for snap in list.__iter__(self)]
+            # later entries win, so insert from the end
+            self._uuid_index = dict(
+                zip(reversed(uuids), range(len(uuids) - 1, -1, -1)))
+
+        return self._uuid_index
+
+    def __contains__(self, item):
+        uuid = getattr(item, '__uuid__', None)
+        if uuid is None:
+            return list.__contains__(self, item)
+
+        return uuid in self._positions()
+
+    def index(self, value, *args):
+        uuid = getattr(value, '__uuid__', None)
+        if uuid is None or args:
+            return list.index(self, value, *args)
+
+        try:
+            return self._positions()[uuid]
+        except KeyError:
+            raise ValueError('%r is not in trajectory' % value)
+
     def index_symmetric(self, value):
         """
         Return index of a snapshot or its reversed inside a trajectory
 
-        """
-        try:
-            fw = self.index(value)
-        except ValueError:
-            fw = None
-            pass
+        A reversed snapshot has the UUID of the snapshot with the lowest bit
+        flipped, so both are found using the UUID index of the trajectory.
 
-        try:
-            bw = self.index(value.reversed)
-        except ValueError:
-            bw = None
-            pass
+        """
+        positions = self._positions()
+        fw = positions.get(value.__uuid__)
+        bw = positions.get(StorableObject.ruuid(value.__uuid__))
 
         if fw is None:
             if bw is None:
@@ -254,11 +534,9 @@ class Trajectory(list, StorableObject):
         bool
 
         """
-        fw = item in self
-        if not fw:
-            return item.reversed in self
-        else:
-            return True
+        positions = self._positions()
+        return item.__uuid__ in positions or \
+            StorableObject.ruuid(item.__uuid__) in positions
 
     def get_as_proxy(self, item):
         """
@@ -291,6 +569,42 @@ class Trajectory(list, StorableObject):
         """
         return list(self.iter_proxies())
 
+    def prefetch(self, lazy=True):
+        """
+        Load all snapshots of a stored trajectory in bulk
+
+        Frames that are still proxies are read from their store in
+        contiguous blocks (see :meth:`.ObjectStore.load_many`), so that
+        iterating over the trajectory afterwards does not read each snapshot
+        separately.
+
+        Parameters
+        ----------
+        lazy : bool
+            if `True` (default) the lazy loaded parts of the snapshots (e.g.,
+            the statics and kinetics of OpenMM snapshots) are loaded in bulk
+            as well
+
+        Returns
+        -------
+        :obj:`Trajectory`
+            the trajectory itself
+        """
+        prefetch_proxies(
+            [snap for snap in self.iter_proxies() if type(snap) is LoaderProxy]
+        )
+
+        if lazy:
+            lazy_proxies = []
+            for snap in self:
+                for value in getattr(snap, '_lazy', {}).values():
+                    if type(value) is LoaderProxy:
+                        lazy_proxies.append(value)
+
+            prefetch_proxies(lazy_proxies)
+
+        return self
+
     def iter_proxies(self):
         """
         Returns an iterator over all actual elements
@@ -327,8 +641,14 @@ class Trajectory(list, StorableObject):
             yield self[snap_idx]
 
     def __add__(self, other):
-        t = Trajectory(self)
-        t.extend(other)
+        t = Trajectory()
+        if isinstance(other, list):
+            # other trajectories are joined with their proxies
+            list.extend(t, list.__add__(self, other))
+        else:
+            list.extend(t, self.iter_proxies())
+            list.extend(t, other)
+        t._features = FrameFeatureTable.join(self, other)
         return t
 
     # ==========================================================================
@@ -356,12 +676,21 @@ class Trajectory(list, StorableObject):
         count = 0
         segment_labels = []
         # list.__iter__ for speed
-        for frame in list.__iter__(self):
-            in_state = []
-            for key in label_dict.keys():
-                vol = label_dict[key]
-                if vol(frame):
-                    in_state.append(key)
+        frames = list(list.__iter__(self))
+        keys = list(label_dict.keys())
+        in_volumes = []
+        for key in keys:
+            vol = label_dict[key]
+            compiled = getattr(vol, 'compiled', None)
+            if compiled is not None:
+                # evaluate all frames at once
+                in_volumes.append(compiled(frames))
+            else:
+                in_volumes.append([vol(frame) for frame in frames])
+
+        for frame_idx in range(len(frames)):
+            in_state = [key for key, is_in in zip(keys, in_volumes)
+                        if is_in[frame_idx]]
             if len(in_state) > 1:
                 raise RuntimeError(
                     "Volumes given to summarize_by_volumes not disjoint")
@@ -410,6 +739,10 @@ class Trajectory(list, StorableObject):
         """
         Checks if two trajectories share a common snapshot
 
+        This uses the UUID index of this trajectory, which is kept until the
+        trajectory changes, and stops at the first common snapshot. Checking
+        the same trajectory against many others is therefore cheap.
+
         Parameters
         ----------
         other : :class:`openpathsampling.trajectory.Trajectory`
@@ -420,9 +753,14 @@ class Trajectory(list, StorableObject):
         bool
             returns True if at least one snapshot appears in both trajectories
         """
-        return bool(self.shared_configurations(
-            other,
-            time_reversal=time_reversal))
+        positions = self._positions()
+        for snap in _iter_proxies(other):
+            uuid = snap.__uuid__
+            if uuid in positions or \
+                    (time_reversal and StorableObject.ruuid(uuid) in positions):
+                return True
+
+        return False
 
     def shared_configurations(self, other, time_reversal=False):
         """
@@ -438,12 +776,12 @@ class Trajectory(list, StorableObject):
         set of :class:`openpathsampling.snapshot.Snapshot`
             the set of common snapshots
         """
-        if not time_reversal:
-            return set(self.as_proxies()) & set(other.as_proxies())
-        else:
-            return set(self.as_proxies()) & \
-                (set(other.as_proxies()) |
-                 set([snap.reversed for snap in other.as_proxies()]))
+        uuids = set(snap.__uuid__ for snap in _iter_proxies(other))
+        if time_reversal:
+            uuids.update([StorableObject.ruuid(uuid) for uuid in uuids])
+
+        return set(
+            snap for snap in self.iter_proxies() if snap.__uuid__ in uuids)
 
     def shared_subtrajectory(self, other, time_reversal=False):
         """
@@ -594,3 +932,51 @@ class Trajectory(list, StorableObject):
             return paths.Trajectory([trajectories])
 
         return trajectories
+
+
+def _iter_proxies(frames):
+    # iterate a trajectory (or list of snapshots) without loading proxies
+    if isinstance(frames, list):
+        return list.__iter__(frames)
+    else:
+        return iter(frames)
+
+
+def stack_arrays(arrays):
+    """
+    Stack per-frame arrays into one `(n_frames, ...)` array
+
+    If the arrays are consecutive rows of the same block (as for snapshots
+    loaded together from storage) the rows are copied from the block at
+    once, otherwise the arrays are stacked one by one.
+
+    Parameters
+    ----------
+    arrays : list of numpy.ndarray
+        the arrays of all frames, all of the same shape
+
+    Returns
+    -------
+    numpy.ndarray
+        a new array with the frames along the first axis
+    """
+    first = arrays[0]
+    block = first.base
+    if type(block) is np.ndarray and block.ndim == first.ndim + 1 \
+            and block.shape[1:] == first.shape \
+            and block.strides[1:] == first.strides:
+        stride = block.strides[0]
+        offset = first.__array_interface__['data'][0] - \
+            block.__array_interface__['data'][0]
+        if stride > 0 and offset % stride == 0:
+            start = offset // stride
+            stop = start + len(arrays)
+            address = first.__array_interface__['data'][0]
+            if stop <= len(block) and all(
+                    arr.base is block and
+                    arr.__array_interface__['data'][0] ==
+                    address + frame * stride
+                    for frame, arr in enumerate(arrays)):
+                return block[start:stop].copy()
+
+    return np.array(arrays)
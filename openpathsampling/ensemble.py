@@ -8,6 +8,8 @@ import abc
 import logging
 import itertools
 
+import numpy as np
+
 from openpathsampling.netcdfplus import StorableNamedObject
 import openpathsampling as paths
 
@@ -192,6 +194,53 @@ class EnsembleCache(object):
         return reset
 
 
+class EnsembleCertificate(object):
+    """Membership of a trajectory in an ensemble, decided while it was built
+
+    Movers that create a trial with the engine can ask the target ensemble
+    for a tracker (see :meth:`Ensemble.candidate_tracker`) that follows the
+    frames while they are generated. At the end, the tracker issues a
+    certificate with the verdict for the trial, so the acceptance does not
+    have to test all frames again.
+
+    Attributes
+    ----------
+    ensemble : :class:`.Ensemble`
+        the ensemble the verdict is about
+    trajectory : :class:`.Trajectory`
+        the trajectory the verdict is about
+    valid : bool
+        `True` if the trajectory is in the ensemble
+    """
+
+    __slots__ = ['ensemble', 'trajectory', 'valid', 'length']
+
+    def __init__(self, ensemble, trajectory, valid):
+        self.ensemble = ensemble
+        self.trajectory = trajectory
+        self.valid = bool(valid)
+        self.length = len(trajectory)
+
+    def applies_to(self, ensemble, trajectory):
+        """Whether this certificate is about an ensemble and trajectory
+
+        Parameters
+        ----------
+        ensemble : :class:`.Ensemble`
+        trajectory : :class:`.Trajectory`
+
+        Returns
+        -------
+        bool
+            `True` for the same ensemble and trajectory objects, if the
+            trajectory has not changed its length since; equal trajectories
+            are not enough
+        """
+        return (ensemble is self.ensemble
+                and trajectory is self.trajectory
+                and len(trajectory) == self.length)
+
+
 class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
     """
     Path ensemble object.
@@ -371,6 +420,62 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         # default behavior is to be the same as can_prepend
         return self.can_prepend(trajectory, trusted)
 
+    def candidate_tracker(self, fixed, direction=+1):
+        """
+        Return a running condition that decides membership of a candidate
+
+        A candidate is a trajectory generated by running the engine while
+        `can_append` (or `can_prepend`) of this ensemble holds, starting
+        next to a fixed part of frames. As for `candidate=True` in
+        :meth:`__call__`, only the first and final frames of a candidate
+        are assumed to be able to be in a state.
+
+        The tracker is given to the engine as an additional running
+        condition. It never stops the dynamics, but follows the generated
+        frames, so that its method `certificate(trial, generated)` can
+        decide the membership of the trial afterwards without testing all
+        frames again.
+
+        Parameters
+        ----------
+        fixed : :class:`.Trajectory`
+            the frames of the trial that are not generated
+        direction : +1 or -1
+            +1 if the trial is `fixed + generated`, -1 if the trial is
+            `generated.reversed + fixed`
+
+        Returns
+        -------
+        callable or None
+            the tracker; `None` (default) if the ensemble cannot decide
+            faster than by :meth:`__call__`
+        """
+        return None
+
+    def candidate_slices(self, trajectory):
+        """
+        Return slices that contain all subtrajectories found by `split`
+
+        Ensembles that can find their subtrajectories from per-frame labels
+        (e.g., which frames are in which volume) override this, so that
+        :class:`.SplitPlanner` only needs to test these candidates. The
+        candidates include all slices returned by :meth:`iter_valid_slices`
+        with default arguments, in the same order. They do not all have to
+        be in the ensemble.
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory`
+            the trajectory to be split
+
+        Returns
+        -------
+        list of `slice` or None
+            the candidates; `None` (default) if the ensemble cannot tell
+            them faster than by :meth:`iter_valid_slices`
+        """
+        return None
+
     def iter_valid_slices(
             self,
             trajectory,
@@ -812,7 +917,8 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
             replica=0,
             used_trajectories=None,
             reuse_strategy='avoid-symmetric',
-            unique='shortest'):
+            unique='shortest',
+            planner=None):
         """
         Generate a sample in the ensemble by searching for sub-parts
 
@@ -831,6 +937,8 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         unique : str
             If `first` the first found subtrajectory is selected. If
             `shortest` then from all subparts the shortest one is used.
+        planner : :class:`.SplitPlanner` or None
+            if given, the subtrajectories are taken from the planner
         """
 
         trajectories = paths.Trajectory._to_list_of_trajectories(trajectories)
@@ -838,7 +946,8 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         used_and_possible = []
 
         for idx, traj in enumerate(trajectories):
-            parts = self._get_trajectory_parts_in_order(traj, unique)
+            parts = self._get_trajectory_parts_in_order(traj, unique,
+                                                        planner)
 
             for part in parts:
                 if part not in used_trajectories and (
@@ -999,18 +1108,27 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
         logger.info("Returning None because nothing worked")
         return None
 
-    def _get_trajectory_parts_in_order(self, traj, unique='first'):
+    def _get_trajectory_parts_in_order(self, traj, unique='first',
+                                       planner=None):
+        if planner is not None:
+            split = lambda t: planner.split(self, t)
+        else:
+            split = self.split
+
         if unique == 'first':
-            # this returns an iterator and can thus be faster
-            parts = self.iter_split(traj)
+            if planner is not None:
+                parts = split(traj)
+            else:
+                # this returns an iterator and can thus be faster
+                parts = self.iter_split(traj)
         elif unique == 'shortest':
-            parts = sorted(self.split(traj), key=len)
+            parts = sorted(split(traj), key=len)
         elif unique == 'median':
             # resort the found trajectories so that the middle one is
             # first, then the one right to it, then the one before, etc
             # e.g. [0,1,2,3,4,5,6,7,8,9] is rearranges into
             # [5,4,6,3,7,2,8,1,9,0]
-            ordered = sorted(self.split(traj), key=len)
+            ordered = sorted(split(traj), key=len)
             parts = list([p for p2 in zip(
                 ordered[len(ordered) // 2:],
                 reversed(ordered[:len(ordered) // 2])
@@ -1019,7 +1137,7 @@ class Ensemble(with_metaclass(abc.ABCMeta, StorableNamedObject)):
             if len(ordered) & 1:
                 parts.append(ordered[-1])
         elif unique == 'longest':
-            parts = sorted(self.split(traj), key=len, reverse=True)
+            parts = sorted(split(traj), key=len, reverse=True)
         else:
             parts = []
 
@@ -1395,6 +1513,13 @@ class UnionEnsemble(EnsembleCombination):
                                             fnc=lambda a, b: a or b,
                                             str_fnc='{0}\nor\n{1}')
 
+    def candidate_tracker(self, fixed, direction=+1):
+        trackers = [ens.candidate_tracker(fixed, direction)
+                    for ens in (self.ensemble1, self.ensemble2)]
+        if any(tracker is None for tracker in trackers):
+            return None
+        return _UnionCandidateTracker(self, trackers)
+
 
 class IntersectionEnsemble(EnsembleCombination):
     def __init__(self, ensemble1, ensemble2):
@@ -2031,6 +2156,28 @@ class SequentialEnsemble(Ensemble):
     def strict_can_prepend(self, trajectory, trusted=False):
         return self._generic_can_prepend(trajectory, trusted, strict=True)
 
+    def candidate_tracker(self, fixed, direction=+1):
+        volumes = self._tps_volumes()
+        if volumes is None:
+            return None
+        return _TPSCandidateTracker(self, fixed, *volumes)
+
+    def _tps_volumes(self):
+        # (initial, outside, final) volumes if this is a TPS ensemble, i.e.
+        # one frame in the initial volume, frames outside of the `outside`
+        # volume, and one frame in the final volume; otherwise None
+        if len(self.ensembles) != 3 or \
+                any(self.min_overlap) or any(self.max_overlap):
+            return None
+
+        first, middle, last = self.ensembles
+        initial = _single_frame_volume(first)
+        final = _single_frame_volume(last)
+        if initial is None or final is None or \
+                type(middle) is not AllOutXEnsemble:
+            return None
+        return initial, middle.volume, final
+
     def _str(self):
         head = "[\n"
         tail = "\n]"
@@ -2038,6 +2185,19 @@ class SequentialEnsemble(Ensemble):
         return head + sequence_str + tail
 
 
+def _single_frame_volume(ensemble):
+    # the volume of `AllInXEnsemble(volume) & LengthEnsemble(1)`, or None
+    if type(ensemble) is not IntersectionEnsemble:
+        return None
+    parts = sorted([ensemble.ensemble1, ensemble.ensemble2],
+                   key=lambda ens: type(ens) is LengthEnsemble)
+    in_volume, length = parts
+    if type(in_volume) is not AllInXEnsemble or \
+            type(length) is not LengthEnsemble or length.length != 1:
+        return None
+    return in_volume.volume
+
+
 class LengthEnsemble(Ensemble):
     """
     The ensemble of trajectories of a given length
@@ -2100,6 +2260,12 @@ class VolumeEnsemble(Ensemble):
     Path ensembles based on the Volume object
     """
 
+    # largest number of frames tested at once by `_first_frame`
+    _max_block_size = 256
+
+    # `True` if `_volume` is the complement of `volume`
+    _volume_is_negated = False
+
     def __init__(self, volume, trusted=True):
         # TODO: does `trusted` actually mean anything or do anything as a
         # property? it is about the condition of trusting the trajectory
@@ -2122,6 +2288,70 @@ class VolumeEnsemble(Ensemble):
         """
         return self.volume
 
+    def _frame_in_volume(self, trajectory, frame):
+        """
+        Test if a frame of a trajectory is in `_volume`.
+
+        The result for `volume` is stored in the frame feature table of the
+        trajectory, which is shared with related trajectories.
+        """
+        features = getattr(trajectory, 'features', None)
+        if features is None:
+            return self._volume(frame)
+
+        in_volume = features.value(self.volume, frame, self.volume)
+        return bool(in_volume) != self._volume_is_negated
+
+    def _first_frame(self, trajectory, in_volume):
+        """
+        Index of the first frame that is (or is not) in the volume.
+
+        Frames are tested using the compiled volume in blocks of doubling
+        size, so long trajectories are evaluated vectorized while an early
+        decision only costs as many frames as needed (up to a factor 2).
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory`
+            the trajectory to search
+        in_volume : bool
+            if `True` search the first frame in the volume, otherwise the
+            first frame not in the volume
+
+        Returns
+        -------
+        int or None
+            index of the first matching frame, `None` if there is none
+        """
+        compiled = self.volume.compiled
+        features = getattr(trajectory, 'features', None)
+        if self._volume_is_negated:
+            in_volume = not in_volume
+
+        frames = trajectory.as_proxies()
+        start = 0
+        block_size = 1
+        while start < len(frames):
+            block = frames[start:start + block_size]
+            if features is None:
+                result = compiled(block)
+            else:
+                # only frames not seen before are evaluated
+                result = np.array(
+                    features.values(self.volume, block, compiled), bool)
+
+            if not in_volume:
+                result = np.logical_not(result)
+
+            found = np.flatnonzero(result)
+            if len(found) > 0:
+                return start + int(found[0])
+
+            start += block_size
+            block_size = min(2 * block_size, self._max_block_size)
+
+        return None
+
 
 class AllInXEnsemble(VolumeEnsemble):
     """
@@ -2177,7 +2407,8 @@ class AllInXEnsemble(VolumeEnsemble):
         if cached_val or cached_val is None:
             # need to check this frame (no prev traj, or prev traj is True)
             frame = trajectory.get_as_proxy(frame_num)
-            cache.contents['previous'] = self._volume(frame)
+            cache.contents['previous'] = self._frame_in_volume(trajectory,
+                                                               frame)
             return cache.contents['previous']
         else:
             # cached_val is false, result must be false
@@ -2212,10 +2443,7 @@ class AllInXEnsemble(VolumeEnsemble):
         else:
             logger.debug("Untrusted VolumeEnsemble " + repr(self))
             # logger.debug("Trajectory " + repr(trajectory))
-            for frame in trajectory.as_proxies():
-                if not self._volume(frame):
-                    return False
-            return True
+            return self._first_frame(trajectory, False) is None
 
     def check_reverse(self, trajectory, trusted=False):
         # order in this one only matters if it is trusted
@@ -2240,6 +2468,8 @@ class AllOutXEnsemble(AllInXEnsemble):
     Ensemble of trajectories with all frames outside the given volume
     """
 
+    _volume_is_negated = True
+
     @property
     def _volume(self):
         return ~self.volume
@@ -2268,10 +2498,7 @@ class PartInXEnsemble(VolumeEnsemble):
         trajectory : :class:`openpathsampling.trajectory.Trajectory`
             The trajectory to be checked
         """
-        for frame in trajectory.as_proxies():
-            if self._volume(frame):
-                return True
-        return False
+        return self._first_frame(trajectory, True) is not None
 
     def __invert__(self):
         return AllOutXEnsemble(self.volume, self.trusted)
@@ -2282,6 +2509,8 @@ class PartOutXEnsemble(PartInXEnsemble):
     Ensemble of trajectories with at least one frame outside the volume
     """
 
+    _volume_is_negated = True
+
     def _str(self):
         return 'exists t such that x[t] in {0}'.format(self._volume)
 
@@ -2294,10 +2523,7 @@ class PartOutXEnsemble(PartInXEnsemble):
         return AllInXEnsemble(self.volume, self.trusted)
 
     def __call__(self, trajectory, trusted=None, candidate=False):
-        for frame in trajectory.as_proxies():
-            if self._volume(frame):
-                return True
-        return False
+        return self._first_frame(trajectory, True) is not None
 
 
 
@@ -2390,6 +2616,9 @@ class SuffixTrajectoryEnsemble(WrappedEnsemble):
         super(SuffixTrajectoryEnsemble, self).__init__(ensemble)
         self.add_trajectory = add_trajectory
         self._cached_trajectory = paths.Trajectory(add_trajectory.as_proxies())
+        # share evaluated volumes with the trajectory we extend
+        self._cached_trajectory._features = getattr(add_trajectory,
+                                                    'features', None)
 
     def _alter(self, trajectory):
         logger.debug("Starting Suffix._alter")
@@ -2436,6 +2665,9 @@ class PrefixTrajectoryEnsemble(WrappedEnsemble):
         super(PrefixTrajectoryEnsemble, self).__init__(ensemble)
         self.add_trajectory = add_trajectory
         self._cached_trajectory = paths.Trajectory(add_trajectory.as_proxies())
+        # share evaluated volumes with the trajectory we extend
+        self._cached_trajectory._features = getattr(add_trajectory,
+                                                    'features', None)
 
     def _alter(self, trajectory):
         logger.debug("Starting _alter")
@@ -2820,11 +3052,12 @@ class TISEnsemble(WrappedEnsemble):
         volume_a = paths.volume.join_volumes(initial_states)
         volume_b = paths.volume.join_volumes(final_states)
 
+        crossing = PartOutXEnsemble(interface)
         ensemble = SequentialEnsemble([
             AllInXEnsemble(volume_a) & LengthEnsemble(1),
             OptionalEnsemble(AllOutXEnsemble(volume_a | volume_b)),
             AllInXEnsemble(volume_a | volume_b) & LengthEnsemble(1)
-        ]) & PartOutXEnsemble(interface)
+        ]) & crossing
         super(TISEnsemble, self).__init__(ensemble)
 
         self.initial_states = initial_states
@@ -2836,6 +3069,29 @@ class TISEnsemble(WrappedEnsemble):
         self.lambda_i = lambda_i
         self._initial_volumes = volume_a
         self._final_volumes = volume_b | volume_a
+        self._crossing = crossing
+
+    def candidate_tracker(self, fixed, direction=+1):
+        return _TISCandidateTracker(self, fixed)
+
+    def candidate_slices(self, trajectory):
+        # A subtrajectory in the ensemble has only its first and final frame
+        # in a state, so it goes from one state frame to the next one. Of
+        # these, we keep the ones that start in an initial state and cross
+        # the interface.
+        in_initial = _volume_labels(trajectory, self._initial_volumes)
+        in_state = _volume_labels(trajectory, self._final_volumes)
+        outside = np.logical_not(_volume_labels(trajectory, self.interface))
+
+        state_frames = np.flatnonzero(in_state)
+        starts = state_frames[:-1]
+        finals = state_frames[1:]
+        n_outside = np.concatenate([[0], np.cumsum(outside)])
+        crossed = n_outside[finals + 1] - n_outside[starts] > 0
+        keep = np.logical_and(in_initial[starts], crossed)
+
+        return [slice(int(start), int(final) + 1)
+                for start, final in zip(starts[keep], finals[keep])]
 
     def __call__(self, trajectory, trusted=None, candidate=False):
         logger.debug("TIS ENSEMBLE: candidate={0}".format(str(candidate)))
@@ -2868,32 +3124,58 @@ class TISEnsemble(WrappedEnsemble):
             return super(TISEnsemble, self).__call__(trajectory, trusted)
 
     def trajectory_summary(self, trajectory):
-        initial_state_i = None
-        final_state_i = None
-        for state_i in range(len(self.initial_states)):
-            if self.initial_states[state_i](trajectory.get_as_proxy(0)):
-                initial_state_i = state_i
-                break
-        all_states = self.initial_states + self.final_states
-        for state_i in range(len(all_states)):
-            if all_states[state_i](trajectory.get_as_proxy(-1)):
-                final_state_i = state_i
-                break
-
-        if self.orderparameter is not None:
-            lambda_traj = self.orderparameter(trajectory)
-            min_lambda = min(lambda_traj)
-            max_lambda = max(lambda_traj)
-        else:
-            min_lambda = None
-            max_lambda = None
+        return self.trajectory_summaries([trajectory])[0]
 
-        return {
-            'initial_state': initial_state_i,
-            'final_state': final_state_i,
-            'max_lambda': max_lambda,
-            'min_lambda': min_lambda
-        }
+    def trajectory_summaries(self, trajectories):
+        """
+        Summaries (see :meth:`.trajectory_summary`) of several trajectories.
+
+        The order parameter is evaluated once for all frames of all
+        trajectories, and the extrema for each trajectory are obtained by
+        a reduction over the concatenated values.
+
+        Parameters
+        ----------
+        trajectories : list of :class:`openpathsampling.Trajectory`
+
+        Returns
+        -------
+        list of dict
+            the summary of each trajectory, in the order given
+        """
+        all_states = self.initial_states + self.final_states
+        summaries = []
+        for trajectory in trajectories:
+            initial_state_i = None
+            final_state_i = None
+            for state_i in range(len(self.initial_states)):
+                if self.initial_states[state_i](trajectory.get_as_proxy(0)):
+                    initial_state_i = state_i
+                    break
+            for state_i in range(len(all_states)):
+                if all_states[state_i](trajectory.get_as_proxy(-1)):
+                    final_state_i = state_i
+                    break
+            summaries.append({
+                'initial_state': initial_state_i,
+                'final_state': final_state_i,
+                'max_lambda': None,
+                'min_lambda': None
+            })
+
+        if self.orderparameter is not None and len(trajectories) > 0:
+            lengths = np.array([len(traj) for traj in trajectories])
+            frames = [snap for traj in trajectories for snap in traj]
+            lambdas = np.asarray(self.orderparameter(frames))
+            offsets = np.cumsum(lengths) - lengths
+            min_lambdas = np.minimum.reduceat(lambdas, offsets).tolist()
+            max_lambdas = np.maximum.reduceat(lambdas, offsets).tolist()
+            for summary, min_l, max_l in zip(summaries, min_lambdas,
+                                             max_lambdas):
+                summary['min_lambda'] = min_l
+                summary['max_lambda'] = max_l
+
+        return summaries
 
     def trajectory_summary_str(self, trajectory):
         summ = self.trajectory_summary(trajectory)
@@ -2929,6 +3211,119 @@ class TISEnsemble(WrappedEnsemble):
         return str(self.ensemble)
 
 
+def _volume_labels(trajectory, volume):
+    # whether each frame is in the volume; shared by all trajectories with
+    # the same features table, so each frame is only evaluated once
+    frames = trajectory.as_proxies()
+    if len(frames) == 0:
+        return np.zeros(0, bool)
+    return np.array(
+        trajectory.features.values(volume, frames, volume.compiled), bool)
+
+
+class _CandidateTracker(object):
+    # Base of the trackers returned by `Ensemble.candidate_tracker`. Follows
+    # the generated frames (`_update`) and certifies the trial made from
+    # them (`_valid`), as long as they are the frames seen last.
+    def __init__(self, ensemble, fixed):
+        self.ensemble = ensemble
+        self.fixed = fixed
+        self._cache = EnsembleCache(+1)
+
+    def __call__(self, trajectory, trusted=False):
+        # a reset means these are not an extension of the frames seen
+        # before, e.g. a retry
+        self._update(trajectory, self._cache.check(trajectory))
+        return True
+
+    def certificate(self, trial, generated):
+        # only if `generated` are the frames we have seen last
+        cache = self._cache
+        if len(generated) == 0 or cache.last_length != len(generated) or \
+                generated.get_as_proxy(0) != cache.start_frame or \
+                generated.get_as_proxy(-1) != cache.prev_last_frame:
+            return None
+
+        return EnsembleCertificate(self.ensemble, trial, self._valid(trial))
+
+
+class _TISCandidateTracker(_CandidateTracker):
+    # Remembers whether the generated frames crossed the interface. With
+    # only the first and final frame in a state, the candidate is in the
+    # ensemble if it starts in an initial state, ends in any state and
+    # crosses the interface.
+    def __init__(self, ensemble, fixed):
+        super(_TISCandidateTracker, self).__init__(ensemble, fixed)
+        self.crossed = False
+
+    def _update(self, trajectory, reset):
+        crossing = self.ensemble._crossing
+        if reset:
+            self.crossed = crossing(trajectory)
+        elif not self.crossed:
+            self.crossed = crossing(trajectory[-1:])
+
+    def _valid(self, trial):
+        ensemble = self.ensemble
+        return (
+            len(trial) > 1
+            and ensemble._initial_volumes(trial[0])
+            and ensemble._final_volumes(trial[-1])
+            and (self.crossed or ensemble._crossing(self.fixed))
+        )
+
+
+class _TPSCandidateTracker(_CandidateTracker):
+    # Remembers whether a generated frame in the interior of the trial
+    # entered the states. These are all but the newest frame, and without
+    # fixed frames also not the first one, which is then the other end of
+    # the trial. As for TIS, the fixed frames in the interior are assumed
+    # to be outside of the states.
+    def __init__(self, ensemble, fixed, initial, outside, final):
+        super(_TPSCandidateTracker, self).__init__(ensemble, fixed)
+        self.initial = initial
+        self.outside = outside
+        self.final = final
+        self.entered = False
+
+    def _update(self, trajectory, reset):
+        first = 0 if len(self.fixed) > 0 else 1
+        if reset:
+            self.entered = any(
+                self.outside(snapshot) for snapshot in trajectory[first:-1])
+        elif not self.entered and len(trajectory) - 2 >= first:
+            self.entered = bool(self.outside(trajectory[-2]))
+
+    def _valid(self, trial):
+        return (
+            len(trial) > 2
+            and not self.entered
+            and self.initial(trial[0])
+            and self.final(trial[-1])
+        )
+
+
+class _UnionCandidateTracker(object):
+    # A candidate is in the union if it is in either ensemble
+    def __init__(self, ensemble, trackers):
+        self.ensemble = ensemble
+        self.trackers = trackers
+
+    def __call__(self, trajectory, trusted=False):
+        for tracker in self.trackers:
+            tracker(trajectory, trusted)
+        return True
+
+    def certificate(self, trial, generated):
+        certificates = [tracker.certificate(trial, generated)
+                        for tracker in self.trackers]
+        if any(certificate is None for certificate in certificates):
+            return None
+
+        valid = any(certificate.valid for certificate in certificates)
+        return EnsembleCertificate(self.ensemble, trial, valid)
+
+
 # class EnsembleFactory(object):
     # """
     # Convenience class to construct Ensembles
@@ -2,6 +2,8 @@ import sys
 import collections
 import warnings
 
+import numpy as np
+
 import openpathsampling as paths
 from openpathsampling.tools import refresh_output
 from openpathsampling.progress import SimpleProgress
@@ -22,6 +24,25 @@ MoveAcceptanceAnalysisLine = collections.namedtuple(
     'move_name n_accepted n_trials expected_frequency'
 )
 
+def _move_path_keys(change):
+    # the (key, node) pairs of TreeMixin.keylist, but with the keys as
+    # (hashable) nested tuples instead of lists
+    path = (change.identifier,)
+    result = [(path, change)]
+    previous = ()
+    for sub in change.subchanges:
+        subtree = _move_path_keys(sub)
+        result.extend([(path + previous + (key,), node)
+                       for key, node in subtree])
+        previous += (subtree[-1][0],)
+
+    return result
+
+
+def _key_as_list(key):
+    return [_key_as_list(k) if type(k) is tuple else k for k in key]
+
+
 class MoveAcceptanceAnalysis(SimpleProgress):
     """Class to manage analysis of move acceptance.
 
@@ -34,6 +55,10 @@ class MoveAcceptanceAnalysis(SimpleProgress):
     be queried to determine the overall acceptance, or the acceptance of a
     specific set of movers, or of submovers within a given mover.
 
+    Each step is encoded as the move path ids (see
+    :meth:`.MoveScheme.encode_move_change`) of its nodes, so the counts are
+    kept in arrays indexed by the path id.
+
     Parameters
     ----------
     scheme: :class:`.MoveScheme`
@@ -41,21 +66,26 @@ class MoveAcceptanceAnalysis(SimpleProgress):
     """
     def __init__(self, scheme):
         self.scheme = scheme
-        self._trials = collections.defaultdict(int)
-        self._accepted = collections.defaultdict(int)
+        self._n_trials = np.zeros(0, dtype=int)
+        self._n_accepted = np.zeros(0, dtype=int)
         self._n_steps = 0
         self._last_step_count = None
 
+    def _add_encoded(self, encoded):
+        n_paths = len(self.scheme.move_paths)
+        path_ids = encoded[:, 0]
+        accepted = encoded[:, 1].astype(bool)
+
+        def add(counts, new):
+            grown = np.zeros(n_paths, dtype=int)
+            grown[:len(counts)] = counts
+            return grown + np.bincount(new, minlength=n_paths)
+
+        self._n_trials = add(self._n_trials, path_ids)
+        self._n_accepted = add(self._n_accepted, path_ids[accepted])
+
     def _calculate_step_acceptance(self, step):
-        delta = step.change
-        for m in delta:
-            # the key here is the mover and the string rep of the path to
-            # get to that mover in the move decision tree graph. This is
-            # because, in principle, one mover can appear in more than one
-            # place on the graph. That should change in 2.0
-            key = (m.mover, str(delta.key(m)))
-            self._accepted[key] += 1 if m.accepted else 0
-            self._trials[key] += 1
+        self._add_encoded(self.scheme.encode_move_change(step.change))
 
     def add_steps(self, steps):
         """Add steps to the internal counters.
@@ -70,11 +100,43 @@ class MoveAcceptanceAnalysis(SimpleProgress):
         self : :class:`.MoveAcceptanceAnalysis`
             returns self for possible chaining
         """
-        for step in self.progress(steps):
-            self._calculate_step_acceptance(step)
-        self._n_steps += len(steps)
+        encoded = [self.scheme.encode_move_change(step.change)
+                   for step in self.progress(steps)]
+        if encoded:
+            self._add_encoded(np.concatenate(encoded))
+        self._n_steps += len(encoded)
         return self
 
+    def _counts(self, counts):
+        # the key here is the mover and the string rep of the path to
+        # get to that mover in the move decision tree graph. This is
+        # because, in principle, one mover can appear in more than one
+        # place on the graph. That should change in 2.0
+        movers = self.scheme.move_path_movers
+        keys = self.scheme.move_paths
+        return collections.OrderedDict(
+            ((movers[path_id], str(_key_as_list(keys[path_id]))),
+             int(counts[path_id]))
+            for path_id in np.flatnonzero(self._n_trials)
+        )
+
+    @property
+    def _trials(self):
+        """dict : number of trials for each (mover, key) that was tried"""
+        return self._counts(self._n_trials)
+
+    @property
+    def _accepted(self):
+        """dict : number of accepted trials for each (mover, key)"""
+        return self._counts(self._n_accepted)
+
+    def _path_ids(self, movers):
+        # the ids of all paths ending in one of the movers
+        path_movers = self.scheme.move_path_movers[:len(self._n_trials)]
+        return np.array([path_id
+                         for path_id, mover in enumerate(path_movers)
+                         if mover in movers], dtype=int)
+
     @property
     def no_move_keys(self):
         """list: internal keys with no move associated"""
@@ -90,10 +152,8 @@ class MoveAcceptanceAnalysis(SimpleProgress):
     def n_total_trials(self):
         """int : total number of trials (excluding dummy moves)"""
         if self._n_steps != self._last_step_count:
-            n_no_move_trials = sum([n_try
-                                    for k, n_try in self._trials.items()
-                                    if k[0] is None])
-            self._n_total_trials = self._n_steps - n_no_move_trials
+            n_no_move_trials = self._n_trials[self._path_ids([None])].sum()
+            self._n_total_trials = self._n_steps - int(n_no_move_trials)
             self._last_step_count = self._n_steps
         return self._n_total_trials
 
@@ -142,11 +202,9 @@ class MoveAcceptanceAnalysis(SimpleProgress):
         selected_movers = self._select_movers(movers)
         lines = []
         for (group_name, group_movers) in selected_movers.items():
-            key_iter = [k for k in self._trials if k[0] in group_movers]
-            # print key_iter
-            # print {k[0]: count for (k, count) in self._trials.items()}
-            accepted = sum([self._accepted[k] for k in key_iter])
-            trials = sum([self._trials[k] for k in key_iter])
+            path_ids = self._path_ids(group_movers)
+            accepted = int(self._n_accepted[path_ids].sum())
+            trials = int(self._n_trials[path_ids].sum())
 
             try:
                 expected = sum([self.scheme.choice_probability[m]
@@ -230,6 +288,11 @@ class MoveScheme(StorableNamedObject):
         Dictionary mapping level (number) to list of strategies
     root_mover : PathMover
         Root of the move decision tree (`None` until tree is built)
+    move_paths : list of tuple
+        the key of each path in the move decision tree that has been
+        encoded, indexed by its id (see :meth:`move_path_id`)
+    move_path_movers : list of :class:`.PathMover`
+        the mover at the end of each path in :attr:`move_paths`
     """
     def __init__(self, network):
         super(MoveScheme, self).__init__()
@@ -242,6 +305,9 @@ class MoveScheme(StorableNamedObject):
         self.root_mover = None
 
         self._mover_acceptance = None  # used in analysis
+        self._move_path_ids = {}
+        self.move_paths = []
+        self.move_path_movers = []
 
     def to_dict(self):
         ret_dict = {
@@ -540,7 +606,8 @@ class MoveScheme(StorableNamedObject):
                                              strategies=None,
                                              preconditions=None,
                                              reuse_strategy='avoid-symmetric',
-                                             engine=None):
+                                             engine=None,
+                                             processes=1):
         """
         Create a SampleSet with as many initial samples as possible.
 
@@ -578,6 +645,9 @@ class MoveScheme(StorableNamedObject):
             will also not use reversed copies.
         engine : :class:`openpathsampling.engines.DyanmicsEngine`
             the engine used for extending moves
+        processes : int
+            the number of processes used to split the trajectories (see
+            :class:`.SplitPlanner`)
 
         Returns
         -------
@@ -603,7 +673,8 @@ class MoveScheme(StorableNamedObject):
             preconditions,
             strategies,
             reuse_strategy,
-            engine
+            engine,
+            processes
         )
         refresh_output(self.initial_conditions_report(sample_set),
                        ipynb_display_only=True, print_anyway=False)
@@ -863,6 +934,60 @@ class MoveScheme(StorableNamedObject):
         # calc
         return True  # if we get here, then we must have passed tests
 
+    def move_path_id(self, key):
+        """
+        Return the integer id of a path in the move decision tree
+
+        Ids are assigned in the order the paths are first seen and stay the
+        same for the lifetime of the scheme.
+
+        Parameters
+        ----------
+        key : tuple
+            the key of a node in a :class:`.MoveChange` tree, as in
+            :meth:`.TreeMixin.keylist` but with tuples instead of lists
+
+        Returns
+        -------
+        int
+        """
+        try:
+            return self._move_path_ids[key]
+        except KeyError:
+            path_id = len(self.move_paths)
+            self._move_path_ids[key] = path_id
+            self.move_paths.append(key)
+            # the mover of a node is the innermost identifier of its key
+            while type(key[-1]) is tuple:
+                key = key[-1]
+            self.move_path_movers.append(key[0])
+            return path_id
+
+    def encode_move_change(self, change):
+        """
+        Encode all nodes of a move change as (path id, accepted) pairs
+
+        Parameters
+        ----------
+        change : :class:`.MoveChange`
+            the change, e.g. the `change` of an :class:`.MCStep`
+
+        Returns
+        -------
+        numpy.ndarray
+            integer array of shape `(n_nodes, 2)` with the id of the path
+            of each node (see :meth:`move_path_id`) and whether it was
+            accepted
+        """
+        nodes = _move_path_keys(change)
+        encoded = np.empty((len(nodes), 2), dtype=int)
+        move_path_id = self.move_path_id
+        for row, (key, node) in zip(encoded, nodes):
+            row[0] = move_path_id(key)
+            row[1] = node.accepted
+
+        return encoded
+
     def move_summary(self, steps=None, movers=None, output=sys.stdout):
         """
         Provides a summary of the movers in `steps`.
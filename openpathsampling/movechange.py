@@ -31,6 +31,13 @@ class MoveChange(TreeMixin, StorableObject):
 
     details = DelayedLoader()
 
+    # the variables of the MoveChangeStore; the defaults are what __init__
+    # sets besides them (`_lazy` holds `details`)
+    _dict_fields = ['mover', 'subchanges', 'samples', 'input_samples',
+                    'details']
+    _dict_defaults = {'_lazy': {}, '_len': None, '_collapsed': None,
+                      '_results': None, '_trials': None, '_accepted': None}
+
     def __init__(self, subchanges=None, samples=None, mover=None,
                  details=None, input_samples=None):
         StorableObject.__init__(self)
@@ -392,6 +399,17 @@ class RejectedMaxLengthSampleMoveChange(RejectedSampleMoveChange):
     pass
 
 
+class RejectedEarlySampleMoveChange(RejectedSampleMoveChange):
+    """
+    Represents an rejected SamplePMC because the trial could not be accepted
+
+    The dynamics were stopped early since the trial already was too long to
+    pass the Metropolis acceptance (see :attr:`.EngineMover.early_rejection`).
+    This will return no samples as its result, hence it is rejected.
+    """
+    pass
+
+
 class SequentialMoveChange(MoveChange):
     """
     SequentialMoveChange has no own samples, only inferred Sampled from the
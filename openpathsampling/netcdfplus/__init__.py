@@ -1,7 +1,10 @@
-from .base import StorableNamedObject, StorableObject, create_to_dict
+from .base import (StorableNamedObject, StorableObject, create_to_dict,
+                   compile_row_serializers)
 from .cache import WeakKeyCache, WeakLRUCache, WeakValueCache, MaxCache, \
-    NoCache, Cache, LRUCache, LRUChunkLoadingCache
+    NoCache, Cache, LRUCache, LRUChunkLoadingCache, SharedValueCache, \
+    SharedCacheView
 from .dictify import ObjectJSON, StorableObjectJSON, UUIDObjectJSON
+from .codec import ObjectCodec, JSONCodec, BinaryCodec
 from .netcdfplus import NetCDFPlus
 
 from .stores import ObjectStore
@@ -12,7 +15,8 @@ from .stores import NamedObjectStore, UniqueNamedObjectStore
 from .stores import ValueStore
 from .stores import PseudoAttributeStore
 
-from .proxy import DelayedLoader, lazy_loading_attributes, LoaderProxy
+from .proxy import DelayedLoader, lazy_loading_attributes, LoaderProxy, \
+    prefetch_proxies
 from .util import with_timing_logging
 from .attribute import PseudoAttribute, CallablePseudoAttribute, FunctionPseudoAttribute, \
     GeneratorPseudoAttribute
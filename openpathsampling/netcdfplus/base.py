@@ -1,5 +1,7 @@
+import ast
 import inspect
 import logging
+import re
 import weakref
 import uuid
 from types import MethodType
@@ -257,11 +259,16 @@ class StorableObject(object):
             included.
 
         """
-        try:
-            args = getfullargspec(cls.__init__)
-        except TypeError:
-            return []
-        return args[0]
+        # the signature does not change, so cache it on the class itself
+        # (not inherited, subclasses may have a different signature)
+        args = cls.__dict__.get('_args')
+        if args is None:
+            try:
+                args = getfullargspec(cls.__init__)[0]
+            except TypeError:
+                args = []
+            cls._args = args
+        return args
 
     _excluded_attr = []
     _included_attr = []
@@ -269,6 +276,37 @@ class StorableObject(object):
     _restore_non_initial_attr = True
     _restore_name = True
 
+    # declared schema: the attributes a store keeps in its own variables;
+    # `_dict_defaults` are the other attributes an instance needs (given as
+    # literals). See `row_serializers`.
+    _dict_fields = None
+    _dict_defaults = {}
+
+    @classmethod
+    def row_serializers(cls):
+        """
+        Return the functions to store and restore the `_dict_fields`
+
+        The functions are compiled once per class from `_dict_fields` and
+        `_dict_defaults` and cached on the class. Stores that keep each
+        field in its own variable (e.g., :class:`.VariableStore`) use them
+        instead of calling `__init__` and accessing the attributes by name.
+
+        Returns
+        -------
+        tuple of function
+            `to_values(obj)`, which returns the tuple of field values, and
+            `from_values(*values)`, which returns a new instance with these
+            values (also accepted as keywords). The instance is created
+            without calling `__init__`, so its UUID is set by the store.
+        """
+        serializers = cls.__dict__.get('_compiled_row_serializers')
+        if serializers is None:
+            serializers = compile_row_serializers(
+                cls, cls._dict_fields, cls._dict_defaults)
+            cls._compiled_row_serializers = serializers
+        return serializers
+
     def to_dict(self):
         """
         Convert object into a dictionary representation
@@ -455,3 +493,88 @@ def create_to_dict(keys_to_store):
         return {key: getattr(self, key) for key in keys_to_store}
 
     return to_dict
+
+
+_valid_field = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# names used inside the compiled functions
+_reserved_fields = ['_obj', '_cls', '_new']
+
+_to_values_template = """
+def to_values(_obj):
+    return ({values})
+"""
+
+_from_values_template = """
+def from_values({fields}):
+    _obj = _new(_cls)
+{set_defaults}
+{set_fields}
+    return _obj
+"""
+
+
+def _compile_function(name, source, namespace):
+    exec(compile(source, '<compiled %s>' % name, 'exec'), namespace)
+    return namespace[name]
+
+
+def compile_row_serializers(cls, fields, defaults=None):
+    """
+    Create functions to store and restore a fixed set of attributes
+
+    The functions are generated from a template for exactly the given
+    fields, so they neither inspect the object nor call `__init__`.
+
+    Parameters
+    ----------
+    cls : type
+        the (subclass of) :class:`StorableObject` to compile for
+    fields : list of str
+        the names of the stored attributes
+    defaults : dict of str: object or None
+        other attributes to set on restored objects; the values must be
+        literals (a new list or dict is created for each object)
+
+    Returns
+    -------
+    tuple of function
+        `to_values(obj)` and `from_values(*values)`
+    """
+    if fields is None:
+        raise ValueError('%s does not declare `_dict_fields`' % cls.__name__)
+
+    fields = list(fields)
+    defaults = dict(defaults or {})
+    for name in fields + list(defaults):
+        if not _valid_field.match(name) or name in _reserved_fields:
+            raise ValueError(
+                '`%s` is not a valid attribute name to store' % name)
+
+    for name, value in defaults.items():
+        try:
+            literal = ast.literal_eval(repr(value)) == value
+        except (ValueError, SyntaxError):
+            literal = False
+        if not literal:
+            raise ValueError('The default of `%s` is not a literal' % name)
+
+    to_values = _compile_function('to_values', _to_values_template.format(
+        values=''.join('_obj.%s, ' % f for f in fields)
+    ), {})
+
+    from_values = _compile_function(
+        'from_values',
+        _from_values_template.format(
+            fields=', '.join(fields),
+            # defaults first, they may be needed to set a field
+            set_defaults='\n'.join(
+                '    _obj.%s = %r' % (name, value)
+                for name, value in sorted(defaults.items())
+            ),
+            set_fields='\n'.join('    _obj.%s = %s' % (f, f) for f in fields)
+        ),
+        {'_cls': cls, '_new': cls.__new__}
+    )
+
+    return to_values, from_values
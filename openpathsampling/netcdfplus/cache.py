@@ -1,4 +1,6 @@
 from collections import OrderedDict
+import itertools
+import sys
 import weakref
 
 __author__ = 'Jan-Hendrik Prinz'
@@ -544,3 +546,610 @@ class LRUChunkLoadingCache(Cache):
         for chunk in reversed(self._chunkdict.values()):
             for key in reversed(chunk.keys()):
                 yield key
+
+
+def value_nbytes(value):
+    """
+    Estimate the memory used by a cached value in bytes
+
+    Numpy arrays (and everything else with an ``nbytes`` attribute) report
+    their buffer size, lists and tuples are summed up recursively and all
+    other objects use ``sys.getsizeof``.
+
+    Parameters
+    ----------
+    value : object
+        the value to be measured
+
+    Returns
+    -------
+    int
+        the estimated number of bytes
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    if nbytes is not None:
+        return int(nbytes)
+    elif isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(map(value_nbytes, value))
+    else:
+        return sys.getsizeof(value)
+
+
+class SharedValueCache(object):
+    """
+    A memory limited cache for values that is shared by several owners
+
+    Values are keyed by the owner of the value (e.g. a collective variable)
+    and the UUID of the object the value belongs to (e.g. a snapshot). All
+    owners share a common budget of `max_bytes`. If the budget is exceeded
+    the least recently used values are removed first, where the size of each
+    value is taken into account. Values of pinned owners are never evicted
+    and do not count towards the budget.
+
+    Values that still have to be written to storage are not evicted either.
+    A store that saves the cached values of an owner when it is synced
+    calls :meth:`hold` for the owner. The values of objects that are alive
+    are then kept until the store reports them as saved with
+    :meth:`synced`, or until the object is garbage collected.
+
+    Individual owners access the shared cache through a
+    :class:`SharedCacheView` which behaves like a regular
+    :class:`Cache`.
+
+    Attributes
+    ----------
+    max_bytes : int
+        the maximal number of bytes used by not pinned values
+    nbytes : int
+        the number of bytes currently used by not pinned values
+    pinned_nbytes : int
+        the number of bytes currently used by pinned values and by values
+        that are not saved yet
+    hits : int
+        number of successful lookups
+    misses : int
+        number of failed lookups
+    evictions : int
+        number of values removed to stay within the budget
+    """
+
+    #: estimated bytes of bookkeeping added to each value
+    entry_overhead = 128
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        """
+        Parameters
+        ----------
+        max_bytes : int
+            the budget in bytes for all values that are not pinned. Default
+            is 512 MB.
+        """
+        self._max_bytes = max_bytes
+        self._lru = OrderedDict()
+        self._pinned = {}
+        self._pinned_owners = set()
+        self._holders = {}
+        self._unsynced = {}
+        self._owner_uids = {}
+        self._owner_refs = {}
+        self._owner_count = itertools.count()
+        self.nbytes = 0
+        self.pinned_nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        self._max_bytes = value
+        self._check_size_limit()
+
+    def __str__(self):
+        return '%s(%s/%s, %d values, %d pinned)' % (
+            self.__class__.__name__,
+            self.nbytes,
+            'Inf' if self.max_bytes is None else str(self.max_bytes),
+            len(self._lru),
+            len(self._pinned)
+        )
+
+    def __len__(self):
+        return len(self._lru) + len(self._pinned)
+
+    def register(self, owner=None):
+        """
+        Return a new key to be used by an owner of values
+
+        Parameters
+        ----------
+        owner : object or None
+            if given, all values of the owner will be removed once the owner
+            is garbage collected
+
+        Returns
+        -------
+        int
+            the owner key used in all other methods
+        """
+        key = next(self._owner_count)
+        if owner is not None:
+            try:
+                self._owner_refs[key] = weakref.ref(
+                    owner, lambda _, k=key: self._release(k))
+            except TypeError:
+                pass
+
+        return key
+
+    def _release(self, owner):
+        self._owner_refs.pop(owner, None)
+        self._holders.pop(owner, None)
+        self.clear(owner)
+        self._pinned_owners.discard(owner)
+        self._unsynced.pop(owner, None)
+        self._owner_uids.pop(owner, None)
+
+    def view(self, owner=None):
+        """
+        Return a :class:`SharedCacheView` for a (new) owner
+
+        Parameters
+        ----------
+        owner : object or None
+            the owner of all values stored using the view
+
+        Returns
+        -------
+        :class:`SharedCacheView`
+        """
+        return SharedCacheView(self, owner)
+
+    def _entries(self, owner, uid):
+        if owner in self._pinned_owners or \
+                uid in self._unsynced.get(owner, ()):
+            return self._pinned
+        else:
+            return self._lru
+
+    def get(self, owner, uid):
+        """
+        Return the cached value for an owner and a UUID
+
+        Parameters
+        ----------
+        owner : int
+            the owner key
+        uid : int
+            the UUID of the object the value belongs to
+
+        Returns
+        -------
+        object
+            the cached value
+
+        Raises
+        ------
+        KeyError
+            if no value is cached
+        """
+        entries = self._entries(owner, uid)
+        try:
+            entry = entries[(owner, uid)]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        if entries is self._lru:
+            # move to the most recently used position
+            del entries[(owner, uid)]
+            entries[(owner, uid)] = entry
+
+        return entry[0]
+
+    def peek(self, owner, uid):
+        """
+        Return the cached value without updating order and statistics
+        """
+        return self._entries(owner, uid)[(owner, uid)][0]
+
+    def contains(self, owner, uid):
+        return (owner, uid) in self._entries(owner, uid)
+
+    def set(self, owner, uid, value, obj=None):
+        """
+        Cache a value for an owner and a UUID
+
+        Parameters
+        ----------
+        owner : int
+            the owner key
+        uid : int
+            the UUID of the object the value belongs to
+        value : object
+            the value to be cached
+        obj : object or None
+            the object the value belongs to. Only a weak reference is kept
+            so that the cached objects can be listed while they are alive;
+            values of objects without weak references are not listed.
+        """
+        self.discard(owner, uid)
+
+        nbytes = value_nbytes(value) + self.entry_overhead
+        ref = None
+        if obj is not None:
+            try:
+                ref = weakref.ref(
+                    obj, lambda r, o=owner, u=uid: self._collected(o, u, r))
+            except TypeError:
+                pass
+
+        holders = self._holders.get(owner)
+        if holders and ref is not None:
+            self._unsynced.setdefault(owner, {})[uid] = set(holders)
+
+        entries = self._entries(owner, uid)
+        entries[(owner, uid)] = (value, nbytes, ref)
+        self._owner_uids.setdefault(owner, set()).add(uid)
+        if entries is self._lru:
+            self.nbytes += nbytes
+            self._check_size_limit()
+        else:
+            self.pinned_nbytes += nbytes
+
+    def discard(self, owner, uid):
+        """
+        Remove a cached value if it exists
+        """
+        entries = self._entries(owner, uid)
+        entry = entries.pop((owner, uid), None)
+        if entry is not None:
+            self._unsynced.get(owner, {}).pop(uid, None)
+            self._owner_uids[owner].discard(uid)
+            if entries is self._lru:
+                self.nbytes -= entry[1]
+            else:
+                self.pinned_nbytes -= entry[1]
+
+    def _check_size_limit(self):
+        if self.max_bytes is None:
+            return
+
+        while self.nbytes > self.max_bytes and self._lru:
+            (owner, uid), entry = self._lru.popitem(last=False)
+            self._owner_uids[owner].discard(uid)
+            self.nbytes -= entry[1]
+            self.evictions += 1
+
+    def owner_items(self, owner):
+        """
+        Return all cached ``(uuid, (value, nbytes, ref))`` of an owner
+        """
+        return [
+            (uid, self._entries(owner, uid)[(owner, uid)])
+            for uid in list(self._owner_uids.get(owner, ()))
+        ]
+
+    def owner_count(self, owner):
+        """
+        Return the number of cached values of an owner
+        """
+        return len(self._owner_uids.get(owner, ()))
+
+    def pin(self, owner):
+        """
+        Protect all values of an owner from eviction
+
+        Parameters
+        ----------
+        owner : int
+            the owner key
+        """
+        if owner in self._pinned_owners:
+            return
+
+        for uid in list(self._owner_uids.get(owner, ())):
+            self._move_to_pinned(owner, uid)
+
+        self._pinned_owners.add(owner)
+
+    def unpin(self, owner):
+        """
+        Allow values of an owner to be evicted again
+
+        Parameters
+        ----------
+        owner : int
+            the owner key
+        """
+        if owner not in self._pinned_owners:
+            return
+
+        uids = list(self._owner_uids.get(owner, ()))
+        self._pinned_owners.discard(owner)
+        unsynced = self._unsynced.get(owner, ())
+        for uid in uids:
+            if uid not in unsynced:
+                self._move_to_lru(owner, uid)
+
+        self._check_size_limit()
+
+    def _move_to_pinned(self, owner, uid):
+        entry = self._lru.pop((owner, uid), None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+            self._pinned[(owner, uid)] = entry
+            self.pinned_nbytes += entry[1]
+
+    def _move_to_lru(self, owner, uid):
+        entry = self._pinned.pop((owner, uid), None)
+        if entry is not None:
+            self.pinned_nbytes -= entry[1]
+            self._lru[(owner, uid)] = entry
+            self.nbytes += entry[1]
+
+    def is_pinned(self, owner):
+        return owner in self._pinned_owners
+
+    def hold(self, owner, holder):
+        """
+        Keep values of an owner until a holder has saved them
+
+        All cached values of objects that are alive and all values cached
+        later are not evicted until :meth:`synced` is called for them (or
+        the object is garbage collected).
+
+        Parameters
+        ----------
+        owner : int
+            the owner key
+        holder : object
+            the object saving the values, e.g. a store. Only a weak
+            reference is kept; if it is garbage collected, its values are
+            not held anymore.
+        """
+        key = id(holder)
+        holders = self._holders.setdefault(owner, {})
+        if key in holders:
+            return
+
+        holders[key] = weakref.ref(
+            holder, lambda _, o=owner, k=key: self._unhold(o, k))
+        unsynced = self._unsynced.setdefault(owner, {})
+        for uid, entry in self.owner_items(owner):
+            ref = entry[2]
+            if ref is not None and ref() is not None:
+                self._move_to_pinned(owner, uid)
+                unsynced.setdefault(uid, set()).add(key)
+
+    def synced(self, owner, holder, uids):
+        """
+        Mark values as saved by a holder
+
+        Values saved by all holders of the owner can be evicted again.
+
+        Parameters
+        ----------
+        owner : int
+            the owner key
+        holder : object
+            the object that saved the values, see :meth:`hold`
+        uids : iterable of int
+            the UUIDs of the objects the saved values belong to
+        """
+        unsynced = self._unsynced.get(owner)
+        if not unsynced:
+            return
+
+        key = id(holder)
+        for uid in uids:
+            keys = unsynced.get(uid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._release_unsynced(owner, uid)
+
+        self._check_size_limit()
+
+    def _unhold(self, owner, key):
+        holders = self._holders.get(owner)
+        if holders is None or holders.pop(key, None) is None:
+            return
+
+        unsynced = self._unsynced.get(owner, {})
+        for uid, keys in list(unsynced.items()):
+            keys.discard(key)
+            if not keys:
+                self._release_unsynced(owner, uid)
+
+        self._check_size_limit()
+
+    def _collected(self, owner, uid, ref):
+        # the object of a value was garbage collected, so no store can list
+        # it to save the value anymore
+        entry = self._pinned.get((owner, uid))
+        if entry is not None and entry[2] is ref:
+            self._release_unsynced(owner, uid)
+            self._check_size_limit()
+
+    def _release_unsynced(self, owner, uid):
+        unsynced = self._unsynced.get(owner)
+        if unsynced is not None and unsynced.pop(uid, None) is not None:
+            if owner not in self._pinned_owners:
+                self._move_to_lru(owner, uid)
+
+    def clear(self, owner=None):
+        """
+        Remove cached values
+
+        Parameters
+        ----------
+        owner : int or None
+            if given only the values of this owner are removed, otherwise
+            all values
+        """
+        if owner is None:
+            self._lru.clear()
+            self._pinned.clear()
+            self._unsynced.clear()
+            self._owner_uids.clear()
+            self.nbytes = 0
+            self.pinned_nbytes = 0
+        else:
+            for uid, _ in self.owner_items(owner):
+                self.discard(owner, uid)
+
+    def reset_stats(self):
+        """
+        Reset the hit, miss and eviction counters
+        """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        """
+        dict : a summary of memory usage, hits, misses and evictions
+        """
+        lookups = self.hits + self.misses
+        return {
+            'values': len(self),
+            'nbytes': self.nbytes,
+            'pinned_nbytes': self.pinned_nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0
+        }
+
+
+class SharedCacheView(Cache):
+    """
+    A cache of a single owner that stores its values in a SharedValueCache
+
+    Keys are objects with a ``__uuid__`` (e.g. snapshots or LoaderProxy
+    objects) and values are stored by UUID. Hence proxies and the objects
+    they reference share cached values and values remain cached after the
+    keyed object has been garbage collected, as long as the memory budget of
+    the shared cache allows.
+    """
+
+    def __init__(self, shared, owner=None):
+        """
+        Parameters
+        ----------
+        shared : :class:`SharedValueCache`
+            the underlying shared cache
+        owner : object or None
+            the owner of the values. If the owner is garbage collected all
+            its values are removed from the shared cache.
+        """
+        super(SharedCacheView, self).__init__()
+        self.shared = shared
+        self.owner = shared.register(owner)
+
+    @staticmethod
+    def _uuid(item):
+        return getattr(item, '__uuid__', item)
+
+    @property
+    def count(self):
+        n = len(self)
+        if self.pinned:
+            return n, 0
+        else:
+            return 0, n
+
+    @property
+    def size(self):
+        return -1, -1
+
+    @property
+    def pinned(self):
+        return self.shared.is_pinned(self.owner)
+
+    def pin(self):
+        """
+        Protect the values of this cache from eviction
+        """
+        self.shared.pin(self.owner)
+
+    def unpin(self):
+        """
+        Allow the values of this cache to be evicted
+        """
+        self.shared.unpin(self.owner)
+
+    def hold(self, holder):
+        """
+        Keep the values of alive objects until the holder has saved them
+
+        See :meth:`SharedValueCache.hold`.
+
+        Parameters
+        ----------
+        holder : object
+            the object saving the values, e.g. a store
+        """
+        self.shared.hold(self.owner, holder)
+
+    def synced(self, holder, items):
+        """
+        Mark the values of objects as saved by the holder
+
+        Parameters
+        ----------
+        holder : object
+            the object that saved the values, see :meth:`hold`
+        items : iterable of object
+            the objects whose values were saved
+        """
+        self.shared.synced(self.owner, holder, map(self._uuid, items))
+
+    def __getitem__(self, item):
+        return self.shared.get(self.owner, self._uuid(item))
+
+    def get_silent(self, item, default=None):
+        try:
+            return self.shared.peek(self.owner, self._uuid(item))
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self.shared.set(self.owner, self._uuid(key), value, key)
+
+    def __delitem__(self, key):
+        self.shared.discard(self.owner, self._uuid(key))
+
+    def __contains__(self, item):
+        return self.shared.contains(self.owner, self._uuid(item))
+
+    def __len__(self):
+        return self.shared.owner_count(self.owner)
+
+    def items(self):
+        """
+        Return ``(object, value)`` pairs for all cached and alive objects
+        """
+        result = []
+        for _, (value, _, ref) in self.shared.owner_items(self.owner):
+            obj = ref() if ref is not None else None
+            if obj is not None:
+                result.append((obj, value))
+
+        return result
+
+    def __iter__(self):
+        return iter([obj for obj, _ in self.items()])
+
+    def __reversed__(self):
+        return reversed([obj for obj, _ in self.items()])
+
+    def clear(self):
+        self.shared.clear(self.owner)
@@ -0,0 +1,398 @@
+"""
+Codecs to serialize objects into the string variables of a storage.
+
+A codec turns an object into a string (``encode``) and back (``decode``).
+The default is the JSON representation created by the storage's simplifier
+(:class:`.UUIDObjectJSON`). The :class:`BinaryCodec` writes a compact
+binary representation instead, which avoids the intermediate simplified
+tree, the string representation of UUIDs and the base64 encoding of each
+individual numpy array.
+
+Codecs are selected per store by the variable type of its ``json``
+variable, see :class:`.ObjectStore`.
+"""
+
+import base64
+import struct
+
+import numpy as np
+import ujson
+
+from .dictify import builtin_module, ujson_kwargs
+
+
+class ObjectCodec(object):
+    """
+    Abstract codec to convert objects to strings and back
+
+    Parameters
+    ----------
+    simplifier : :class:`.ObjectJSON`
+        the simplifier of the storage, used to encode what the codec does
+        not know about and to read JSON strings
+    """
+    def __init__(self, simplifier):
+        self.simplifier = simplifier
+
+    def encode(self, obj, as_object=False):
+        """
+        Serialize an object
+
+        Parameters
+        ----------
+        obj : object
+            the object to be serialized
+        as_object : bool
+            if `True` the object itself is serialized (as in a `jsonobj`
+            variable); otherwise storable objects are only referenced
+
+        Returns
+        -------
+        str
+        """
+        raise NotImplementedError
+
+    def decode(self, string):
+        """
+        Recreate an object from its serialization
+
+        Parameters
+        ----------
+        string : str
+
+        Returns
+        -------
+        object
+        """
+        raise NotImplementedError
+
+
+class JSONCodec(ObjectCodec):
+    """
+    The JSON representation of the simplifier
+    """
+    def encode(self, obj, as_object=False):
+        if as_object:
+            return self.simplifier.to_json_object(obj)
+        else:
+            return self.simplifier.to_json(obj)
+
+    def decode(self, string):
+        return self.simplifier.from_json(string)
+
+
+_int64 = struct.Struct('<q')
+_float64 = struct.Struct('<d')
+_length = struct.Struct('<I')
+_uuid = struct.Struct('<QQ')
+
+_uuid_mask = (1 << 64) - 1
+_int64_min = -(1 << 63)
+_int64_max = (1 << 63) - 1
+
+_numpy_floats = (np.float16, np.float32, np.float64)
+_numpy_ints = (np.int8, np.int16, np.int32, np.int64,
+               np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+class BinaryCodec(ObjectCodec):
+    """
+    Compact binary serialization with a JSON fallback
+
+    Each value is written as a one byte tag followed by its payload. Lists,
+    tuples and dicts (with arbitrary keys) are written recursively, numpy
+    arrays as their raw buffer, and references to stored objects as the
+    store prefix and the UUID as a 16 byte integer. Everything else (units,
+    functions, ...) is written as the JSON of the simplifier.
+
+    Since the variables hold strings, the result is base64 encoded and
+    prefixed with :attr:`marker`. Strings without the marker are read as
+    JSON, so stores can switch to this codec and still read existing rows.
+
+    Parameters
+    ----------
+    simplifier : :class:`.ObjectJSON`
+        the simplifier of the storage; if it has a ``storage`` attribute,
+        objects saved in that storage are written as references
+    """
+    marker = '#'
+
+    def __init__(self, simplifier):
+        super(BinaryCodec, self).__init__(simplifier)
+        self.storage = getattr(simplifier, 'storage', None)
+        self._encoders = {
+            type(None): self._encode_none,
+            bool: self._encode_bool,
+            int: self._encode_int,
+            float: self._encode_float,
+            str: self._encode_str,
+            bytes: self._encode_bytes,
+            list: self._encode_list,
+            tuple: self._encode_tuple,
+            dict: self._encode_dict,
+            np.ndarray: self._encode_array,
+        }
+        for np_type in _numpy_floats:
+            self._encoders[np_type] = self._encode_numpy_float
+        for np_type in _numpy_ints:
+            self._encoders[np_type] = self._encode_numpy_int
+        # keyed by the tag as an int, which is what indexing bytes gives
+        self._decoders = {
+            ord(tag): decoder for tag, decoder in [
+                ('N', self._decode_none),
+                ('T', self._decode_true),
+                ('F', self._decode_false),
+                ('i', self._decode_int),
+                ('d', self._decode_float),
+                ('s', self._decode_str),
+                ('b', self._decode_bytes),
+                ('l', self._decode_list),
+                ('t', self._decode_tuple),
+                ('D', self._decode_dict),
+                ('a', self._decode_array),
+                ('R', self._decode_reference),
+                ('O', self._decode_object),
+                ('S', self._decode_storage),
+                ('J', self._decode_json),
+            ]
+        }
+
+    # ENCODING
+
+    def encode(self, obj, as_object=False):
+        out = []
+        if as_object and hasattr(obj, 'base_cls') \
+                and not isinstance(obj, type):
+            self._encode_object(obj, out)
+        else:
+            self._encode(obj, out)
+
+        return self.marker + base64.b64encode(b''.join(out)).decode('ascii')
+
+    def _encode(self, obj, out):
+        encoder = self._encoders.get(type(obj))
+        if encoder is not None:
+            encoder(obj, out)
+            return
+
+        if obj is self.storage and obj is not None:
+            out.append(b'S')
+            return
+
+        if obj.__class__.__module__ != builtin_module:
+            storage = self.storage
+            if storage is not None and obj.__class__ in storage._obj_store:
+                # nested objects are always referenced (see simplify)
+                store = storage._obj_store[obj.__class__]
+                store.save(obj)
+                out.append(b'R')
+                self._encode_str(store.prefix, out)
+                uuid = obj.__uuid__
+                out.append(_uuid.pack(uuid & _uuid_mask, uuid >> 64))
+                return
+
+            if hasattr(obj, 'to_dict') and hasattr(obj, 'base_cls'):
+                self._encode_object(obj, out)
+                return
+
+        self._encode_json(obj, out)
+
+    def _encode_json(self, obj, out):
+        out.append(b'J')
+        self._encode_str(
+            ujson.dumps(self.simplifier.simplify(obj), **ujson_kwargs), out)
+
+    def _encode_object(self, obj, out):
+        out.append(b'O')
+        self._encode_str(obj.__class__.__name__, out)
+        self._encode(obj.to_dict(), out)
+
+    @staticmethod
+    def _encode_none(obj, out):
+        out.append(b'N')
+
+    @staticmethod
+    def _encode_bool(obj, out):
+        out.append(b'T' if obj else b'F')
+
+    def _encode_int(self, obj, out):
+        if _int64_min <= obj <= _int64_max:
+            out.append(b'i')
+            out.append(_int64.pack(obj))
+        else:
+            self._encode_json(obj, out)
+
+    @staticmethod
+    def _encode_float(obj, out):
+        out.append(b'd')
+        out.append(_float64.pack(obj))
+
+    def _encode_numpy_float(self, obj, out):
+        self._encode_float(float(obj), out)
+
+    def _encode_numpy_int(self, obj, out):
+        self._encode_int(int(obj), out)
+
+    @staticmethod
+    def _encode_str(obj, out):
+        data = obj.encode('utf-8')
+        out.append(b's')
+        out.append(_length.pack(len(data)))
+        out.append(data)
+
+    @staticmethod
+    def _encode_bytes(obj, out):
+        out.append(b'b')
+        out.append(_length.pack(len(obj)))
+        out.append(obj)
+
+    def _encode_list(self, obj, out):
+        out.append(b'l')
+        out.append(_length.pack(len(obj)))
+        encode = self._encode
+        for item in obj:
+            encode(item, out)
+
+    def _encode_tuple(self, obj, out):
+        out.append(b't')
+        out.append(_length.pack(len(obj)))
+        encode = self._encode
+        for item in obj:
+            encode(item, out)
+
+    def _encode_dict(self, obj, out):
+        excluded = self.simplifier.excluded_keys
+        items = [(key, value) for key, value in obj.items()
+                 if key not in excluded]
+        out.append(b'D')
+        out.append(_length.pack(len(items)))
+        encode = self._encode
+        for key, value in items:
+            encode(key, out)
+            encode(value, out)
+
+    def _encode_array(self, obj, out):
+        if obj.dtype.hasobject:
+            self._encode_json(obj, out)
+            return
+        out.append(b'a')
+        self._encode_str(obj.dtype.str, out)
+        out.append(_length.pack(obj.ndim))
+        for dim in obj.shape:
+            out.append(_length.pack(dim))
+        data = obj.tobytes(order='C')
+        out.append(_length.pack(len(data)))
+        out.append(data)
+
+    # DECODING
+
+    def decode(self, string):
+        if not string.startswith(self.marker):
+            # compatibility: rows written before switching to this codec
+            return self.simplifier.from_json(string)
+
+        data = base64.b64decode(string[len(self.marker):])
+        obj, _ = self._decode(data, 0)
+        return obj
+
+    def _decode(self, data, pos):
+        return self._decoders[data[pos]](data, pos + 1)
+
+    @staticmethod
+    def _decode_none(data, pos):
+        return None, pos
+
+    @staticmethod
+    def _decode_true(data, pos):
+        return True, pos
+
+    @staticmethod
+    def _decode_false(data, pos):
+        return False, pos
+
+    @staticmethod
+    def _decode_int(data, pos):
+        return _int64.unpack_from(data, pos)[0], pos + 8
+
+    @staticmethod
+    def _decode_float(data, pos):
+        return _float64.unpack_from(data, pos)[0], pos + 8
+
+    @staticmethod
+    def _read_str(data, pos):
+        # expects the position after the `s` tag
+        length = _length.unpack_from(data, pos)[0]
+        pos += 4
+        return data[pos:pos + length].decode('utf-8'), pos + length
+
+    def _decode_str(self, data, pos):
+        return self._read_str(data, pos)
+
+    @staticmethod
+    def _decode_bytes(data, pos):
+        length = _length.unpack_from(data, pos)[0]
+        pos += 4
+        return data[pos:pos + length], pos + length
+
+    def _decode_list(self, data, pos):
+        length = _length.unpack_from(data, pos)[0]
+        pos += 4
+        result = []
+        decode = self._decode
+        for _ in range(length):
+            item, pos = decode(data, pos)
+            result.append(item)
+        return result, pos
+
+    def _decode_tuple(self, data, pos):
+        result, pos = self._decode_list(data, pos)
+        return tuple(result), pos
+
+    def _decode_dict(self, data, pos):
+        length = _length.unpack_from(data, pos)[0]
+        pos += 4
+        result = {}
+        decode = self._decode
+        for _ in range(length):
+            key, pos = decode(data, pos)
+            value, pos = decode(data, pos)
+            result[key] = value
+        return result, pos
+
+    def _decode_array(self, data, pos):
+        dtype, pos = self._read_str(data, pos + 1)
+        ndim = _length.unpack_from(data, pos)[0]
+        pos += 4
+        shape = struct.unpack_from('<%dI' % ndim, data, pos)
+        pos += 4 * ndim
+        length = _length.unpack_from(data, pos)[0]
+        pos += 4
+        # copy, since arrays from a buffer are read-only
+        array = np.frombuffer(data[pos:pos + length],
+                              dtype=np.dtype(dtype)).reshape(shape).copy()
+        return array, pos + length
+
+    def _decode_reference(self, data, pos):
+        prefix, pos = self._read_str(data, pos + 1)
+        low, high = _uuid.unpack_from(data, pos)
+        store = self.storage._stores[prefix]
+        return store.load((high << 64) | low), pos + 16
+
+    def _decode_object(self, data, pos):
+        cls_name, pos = self._read_str(data, pos + 1)
+        attributes, pos = self._decode(data, pos)
+        class_list = self.simplifier.class_list
+        if cls_name not in class_list:
+            self.simplifier.update_class_list()
+            class_list = self.simplifier.class_list
+            if cls_name not in class_list:
+                # same as in ObjectJSON.build
+                return None, pos
+        return class_list[cls_name].from_dict(attributes), pos
+
+    def _decode_storage(self, data, pos):
+        return self.storage, pos
+
+    def _decode_json(self, data, pos):
+        string, pos = self._read_str(data, pos + 1)
+        return self.simplifier.build(ujson.loads(string)), pos
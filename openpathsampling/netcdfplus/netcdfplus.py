@@ -11,8 +11,11 @@ from uuid import UUID
 import netCDF4
 import numpy as np
 from .dictify import UUIDObjectJSON
+from .codec import BinaryCodec
 from .stores import NamedObjectStore, ObjectStore, PseudoAttributeStore
 from .proxy import LoaderProxy
+from .util import (quantize, dequantize, delta_encode, delta_decode,
+                   contiguous_ranges)
 
 import sys
 if sys.version_info > (3, ):
@@ -51,10 +54,12 @@ class NetCDFPlus(netCDF4.Dataset):
         'long': np.int64,
         'index': np.int32,
         'length': np.int32,
+        'quantized': np.int32,
         'bool': np.int16,
         'str': str,
         'json': str,
         'jsonobj': str,
+        'binobj': str,
         'numpy.float32': np.float32,
         'numpy.float64': np.float64,
         'numpy.int8': np.int8,
@@ -71,6 +76,11 @@ class NetCDFPlus(netCDF4.Dataset):
         'uuid': str
     }
 
+    # codecs used for object variable types other than `json` and `jsonobj`
+    _codec_types = {
+        'binobj': BinaryCodec
+    }
+
     class ValueDelegate(object):
         """
         Value delegate for objects that implement __getitem__ and __setitem__
@@ -136,6 +146,123 @@ class NetCDFPlus(netCDF4.Dataset):
         def __len__(self):
             return len(self.variable)
 
+        def get_rows(self, start, stop):
+            """
+            Return the values of consecutive rows, reading the variable once
+
+            Parameters
+            ----------
+            start : int
+                the first row
+            stop : int
+                the row after the last one
+
+            Returns
+            -------
+            list
+                the same as `[delegate[idx] for idx in range(start, stop)]`
+            """
+            getter = self.getter
+            return [getter(row) for row in self.variable[start:stop]]
+
+    class DeltaDelegate(ValueDelegate):
+        """
+        Value delegate for `quantized` variables with delta coded rows
+
+        Rows are coded with :func:`.delta_encode`: every `key_interval`-th
+        row is a key row and keeps its quantized value, the rows in between
+        store the difference to the row before. Reading a row therefore
+        reads the rows from its key row on. The getter and setter convert
+        between the values and the quantized (not delta coded) rows.
+
+        Rows have to be written in order, as stores append them: writing a
+        row that is not a key row reads the row before it, and rewriting a
+        row does not update the difference stored in the next one.
+
+        Attributes
+        ----------
+        key_interval : int
+            the number of rows from one key row to the next
+        """
+
+        def __init__(self, variable, key_interval, getter=None, setter=None,
+                     store=None):
+            super(NetCDFPlus.DeltaDelegate, self).__init__(
+                variable, getter, setter, store)
+            self.key_interval = key_interval
+
+        def _decode(self, start, stop):
+            # the quantized rows `start` to `stop`
+            key = start - start % self.key_interval
+            return delta_decode(
+                self.variable[key:stop], key, self.key_interval)[start - key:]
+
+        def _decode_positions(self, positions):
+            # the quantized rows at the positions, reading each range of
+            # needed blocks once
+            interval = self.key_interval
+            rows = {}
+            blocks = sorted(set(pos // interval for pos in positions))
+            for first, last in contiguous_ranges(blocks):
+                start = first * interval
+                stop = min(last * interval, max(positions) + 1)
+                for pos, row in enumerate(self._decode(start, stop), start):
+                    rows[pos] = row
+
+            return np.array([rows[pos] for pos in positions])
+
+        def _positions(self, key):
+            n_rows = len(self.variable)
+            if isinstance(key, slice):
+                return list(range(*key.indices(n_rows)))
+            else:
+                return [pos + n_rows if pos < 0 else pos
+                        for pos in np.asarray(key).tolist()]
+
+        def __getitem__(self, key):
+            rest = ()
+            if type(key) is tuple:
+                key, rest = key[0], key[1:]
+
+            if isinstance(key, (int, np.integer)):
+                position = key + len(self.variable) if key < 0 else key
+                quantized = self._decode(position, position + 1)[0]
+            elif isinstance(key, slice) and key.step in (None, 1):
+                start, stop, _ = key.indices(len(self.variable))
+                quantized = self._decode(start, max(start, stop))
+            else:
+                quantized = self._decode_positions(self._positions(key))
+
+            if rest:
+                if quantized.ndim == self.variable.ndim:
+                    rest = (slice(None),) + rest
+                quantized = quantized[rest]
+
+            return self.getter(quantized)
+
+        def __setitem__(self, key, value):
+            quantized = self.setter(value)
+            if isinstance(key, (int, np.integer)):
+                start = key + len(self.variable) if key < 0 else key
+                rows = quantized[np.newaxis]
+            elif isinstance(key, slice) and key.step in (None, 1):
+                start = key.indices(len(self.variable) + len(quantized))[0]
+                rows = quantized
+            else:
+                raise KeyError(
+                    'Delta coded rows are written singly or as a range')
+
+            previous = None
+            if start % self.key_interval:
+                previous = self._decode(start - 1, start)[0]
+
+            encoded = delta_encode(rows, start, self.key_interval, previous)
+            self.variable[start:start + len(encoded)] = encoded
+
+        def get_rows(self, start, stop):
+            getter = self.getter
+            return [getter(row) for row in self._decode(start, stop)]
+
     @property
     def objects(self):
         """
@@ -367,6 +494,8 @@ class NetCDFPlus(netCDF4.Dataset):
 
     def _create_simplifier(self):
         self.simplifier = UUIDObjectJSON(self)
+        self.codecs = {var_type: codec_class(self.simplifier)
+                       for var_type, codec_class in self._codec_types.items()}
 
     @property
     def filename(self):
@@ -903,6 +1032,11 @@ class NetCDFPlus(netCDF4.Dataset):
             setter = lambda v: self.simplifier.to_json(v)
             getter = lambda v: self.simplifier.from_json(v)
 
+        elif var_type in self.codecs:
+            codec = self.codecs[var_type]
+            setter = lambda v: codec.encode(v, as_object=True)
+            getter = codec.decode
+
         elif var_type.startswith('obj.'):
             getter = lambda v: [
                 None if w[0] == '-' else store.load(int(UUID(w)))
@@ -971,6 +1105,11 @@ class NetCDFPlus(netCDF4.Dataset):
 
             getter, setter, store = self.create_type_delegate(var.var_type)
 
+            if var.var_type == 'quantized':
+                precision = float(var.precision)
+                getter = lambda v: dequantize(v, precision)
+                setter = lambda v: quantize(v, precision)
+
             to_uuid_chunks = NetCDFPlus.to_uuid_chunks
             # to_uuid_chunks34 = NetCDFPlus.to_uuid_chunks34
 
@@ -1032,7 +1171,13 @@ class NetCDFPlus(netCDF4.Dataset):
                     else:
                         getter = _get2(lambda v: v)
 
-            delegate = NetCDFPlus.ValueDelegate(var, getter, setter, store)
+            key_interval = int(getattr(var, 'key_interval', 1))
+            if var.var_type == 'quantized' and key_interval > 1:
+                delegate = NetCDFPlus.DeltaDelegate(
+                    var, key_interval, getter, setter, store)
+            else:
+                delegate = NetCDFPlus.ValueDelegate(
+                    var, getter, setter, store)
 
             # this is a trick to speed up the s/getter. If we do not need
             # to _cast_ because of python objects of units we can copy
@@ -1050,7 +1195,9 @@ class NetCDFPlus(netCDF4.Dataset):
                         description=None,
                         chunksizes=None,
                         simtk_unit=None,
-                        maskable=False):
+                        maskable=False,
+                        precision=None,
+                        key_interval=None):
         """
         Create a new variable in the netCDF storage.
 
@@ -1070,7 +1217,7 @@ class NetCDFPlus(netCDF4.Dataset):
             it is faster. Possible input strings are
             `int`, `float`, `long`, `str`, `numpy.float32`, `numpy.float64`,
             `numpy.int8`, `numpy.int16`, `numpy.int32`, `numpy.int64`, `json`,
-            `obj.<store>`, `lazyobj.<store>`
+            `obj.<store>`, `lazyobj.<store>`, `quantized`
         dimensions : str or tuple of str
             A tuple representing the dimensions used for the netcdf variable.
             If not specified then the default dimension of the storage is used.
@@ -1094,10 +1241,25 @@ class NetCDFPlus(netCDF4.Dataset):
             exist and if they have not yet been written they are filled with
             a fill_value which is treated as a non-set variable. The created
             variable will interpret this values as `None` when returned
+        precision : float or None
+            required for the `quantized` var_type: values are stored as
+            integer multiples of this precision (in the units of
+            `simtk_unit`, if given) and compressed. Decoded values differ
+            from the saved ones by at most half the precision.
+        key_interval : int or None
+            for `quantized` variables: if larger than one, only every
+            `key_interval`-th row stores its values, the rows in between
+            store the difference to the row before (see
+            :func:`.delta_encode`). Consecutive frames of a trajectory differ
+            little, so this compresses much better.
         """
 
         ncfile = self
 
+        quantized = var_type == 'quantized'
+        if quantized and not precision > 0:
+            raise ValueError('Quantized variables need a positive precision')
+
         if type(dimensions) is str:
             dimensions = [dimensions]
 
@@ -1149,6 +1311,15 @@ class NetCDFPlus(netCDF4.Dataset):
             )
 
             setattr(ncvar, 'var_vlen', 'True')
+        elif quantized:
+            # the integers of close values compress well
+            ncvar = ncfile.createVariable(
+                var_name, nc_type, dimensions, chunksizes=chunksizes,
+                zlib=True, shuffle=True
+            )
+            setattr(ncvar, 'precision', float(precision))
+            if key_interval is not None and key_interval > 1:
+                setattr(ncvar, 'key_interval', int(key_interval))
         else:
             ncvar = ncfile.createVariable(
                 var_name, nc_type, dimensions, chunksizes=chunksizes,
@@ -1204,6 +1375,30 @@ class NetCDFPlus(netCDF4.Dataset):
 
         return ncvar
 
+    def quantization_report(self):
+        """
+        Return the precision guarantees of all quantized variables
+
+        Returns
+        -------
+        dict of str: dict
+            for each `quantized` variable the `precision` of the stored
+            values, the largest possible difference to the saved values
+            (`max_error`, half the precision) and the `unit` of both (`None`
+            if the variable has no unit)
+        """
+        report = {}
+        for name, variable in self.variables.items():
+            if getattr(variable, 'var_type', None) == 'quantized':
+                precision = float(variable.precision)
+                report[name] = {
+                    'precision': precision,
+                    'max_error': precision / 2.0,
+                    'unit': getattr(variable, 'unit', None)
+                }
+
+        return report
+
     def update_delegates(self):
         """
         Updates the set of delegates in `self.vars`
@@ -105,6 +105,40 @@ class LoaderProxy(object):
                     self._idx)
 
 
+def prefetch_proxies(proxies):
+    """
+    Load the objects referenced by proxies in bulk
+
+    The proxies are grouped by store and each group is loaded using the
+    `load_many` of the store. Proxies that still reference a loaded object
+    are skipped.
+
+    Parameters
+    ----------
+    proxies : iterable of :class:`LoaderProxy`
+        the proxies to be loaded
+
+    Returns
+    -------
+    list of :class:`openpathsampling.netcdfplus.base.StorableObject`
+        all objects loaded by this call
+    """
+    by_store = {}
+    for proxy in proxies:
+        if proxy._subject is None or proxy._subject() is None:
+            by_store.setdefault(proxy._store, []).append(proxy)
+
+    loaded = []
+    for store, store_proxies in by_store.items():
+        objs = store.load_many([proxy.__uuid__ for proxy in store_proxies])
+        for proxy, obj in zip(store_proxies, objs):
+            if obj is not None:
+                proxy._subject = weakref.ref(obj)
+                loaded.append(obj)
+
+    return loaded
+
+
 class DelayedLoader(object):
     """
     Descriptor class to handle proxy objects in attributes
@@ -126,7 +126,7 @@ class NamedObjectStore(ObjectStore):
         """
 
         if idx not in self.cache:
-            obj = self.simplifier.from_json(json)
+            obj = self.decode_json(json)
 
             self._get_id(idx, obj)
 
@@ -137,6 +137,24 @@ class NamedObjectStore(ObjectStore):
 
             return obj
 
+    def _load_range(self, start, stop):
+        objs = super(NamedObjectStore, self)._load_range(start, stop)
+        names = self.storage.variables[self.prefix + '_name'][start:stop]
+        for obj, name in zip(objs, names):
+            if obj is not None:
+                setattr(obj, '_name', name)
+                obj.fix_name()
+
+        return objs
+
+    def _load_position(self, idx):
+        if type(idx) is str:
+            if idx in self.name_idx:
+                return sorted(list(self.name_idx[idx]))[-1]
+            return None
+
+        return super(NamedObjectStore, self)._load_position(idx)
+
     def find(self, name):
         """
         Return last object with a given name
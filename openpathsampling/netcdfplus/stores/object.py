@@ -6,6 +6,7 @@ from openpathsampling.netcdfplus.base import StorableNamedObject, StorableObject
 from openpathsampling.netcdfplus.cache import MaxCache, Cache, NoCache, \
     WeakLRUCache
 from openpathsampling.netcdfplus.proxy import LoaderProxy
+from openpathsampling.netcdfplus.util import contiguous_ranges
 
 from future.utils import iteritems
 
@@ -116,14 +117,16 @@ class ObjectStore(StorableNamedObject):
         Parameters
         ----------
         content_class
-        json : bool or str `json` or `jsonobj`
+        json : bool or str `json`, `jsonobj` or `binobj`
             if `False` the store will not create a json variable for
             serialization if `True` the store will use the json pickling to
             store objects and a single storable object will be serialized and
             not referenced. If a string is given the string is taken as the
-            variable type of the json variable. Here only two values are
-            allowed: `jsonobj` (equivalent to `True`) or `json` which will
-            also reference directly given storable objects.
+            variable type of the json variable. Here only three values are
+            allowed: `jsonobj` (equivalent to `True`), `json` which will
+            also reference directly given storable objects, or `binobj`
+            which serializes like `jsonobj` but uses the compact
+            :class:`.BinaryCodec` (existing JSON rows can still be read).
 
         nestable : bool
             if `True` this marks the content_class to be saved as nested dict
@@ -187,12 +190,12 @@ class ObjectStore(StorableNamedObject):
 
         self.proxy_index = WeakValueDictionary()
 
-        if json in [True, False, 'json', 'jsonobj']:
+        if json in [True, False, 'json', 'jsonobj', 'binobj']:
             self.json = json
         else:
             raise ValueError(
-                'Valid settings for json are only True, False, `json` or '
-                '`jsonobj`.')
+                'Valid settings for json are only True, False, `json`, '
+                '`jsonobj` or `binobj`.')
 
         if self.content_class is not None \
                 and not issubclass(self.content_class, StorableObject):
@@ -276,6 +279,24 @@ class ObjectStore(StorableNamedObject):
             '(not created)'
         )
 
+    def decode_json(self, json):
+        """
+        Recreate an object from a raw row of the json variable
+
+        Parameters
+        ----------
+        json : str
+            the serialized object, as written by the codec of the store
+
+        Returns
+        -------
+        object
+        """
+        codec = self.storage.codecs.get(self.json)
+        if codec is None:
+            return self.simplifier.from_json(json)
+        return codec.decode(json)
+
     @property
     def simplifier(self):
         """
@@ -444,6 +465,105 @@ class ObjectStore(StorableNamedObject):
         obj = self.vars['json'][idx]
         return obj
 
+    def _load_range(self, start, stop):
+        """
+        Load the objects at positions `start` to `stop - 1`
+
+        Subclasses can override this to read all objects at once. The
+        default reads the `json` variable in one go if the store uses the
+        default `_load` and calls `_load` for each position otherwise.
+
+        Returns
+        -------
+        list of :class:`openpathsampling.netcdfplus.base.StorableObject`
+        """
+        if self.json and type(self)._load == ObjectStore._load:
+            jsons = self.variables['json'][start:stop]
+            return [self.decode_json(json) for json in jsons]
+        else:
+            return [self._load(pos) for pos in range(start, stop)]
+
+    def _load_rows(self, variable, start, stop):
+        # the same as `[self.vars[variable][idx] for idx in range(start, stop)]`
+        # but reading the netCDF variable only once
+        return self.vars[variable].get_rows(start, stop)
+
+    def _load_position(self, idx):
+        # the position `load` reads `idx` from; `None` if it is not in this
+        # store (then `load` will try the fallbacks)
+        if isinstance(idx, (long, int)):
+            if idx < 1000000000:
+                return idx
+            else:
+                return self.index.get(idx)
+
+        return None
+
+    def _prefetch_positions(self, positions):
+        for start, stop in contiguous_ranges(positions):
+            objs = self._load_range(start, stop)
+            for pos, obj in zip(range(start, stop), objs):
+                if obj is not None:
+                    self._get_id(pos, obj)
+                    self.cache[pos] = obj
+
+    def load_many(self, indices):
+        """
+        Return objects from the storage, reading missing ones in bulk
+
+        The positions of all objects that are not cached are sorted and
+        coalesced into contiguous ranges, which are each read at once and
+        put in the cache. Then the objects are returned as `load` would.
+
+        Parameters
+        ----------
+        indices : iterable of int
+            the integer indices or UUIDs of the objects to be loaded
+
+        Returns
+        -------
+        list of :py:class:`openpathsampling.netcdfplus.base.StorableObject`
+            the loaded objects in the order of `indices`
+        """
+        indices = list(indices)
+
+        if not isinstance(self.cache, NoCache):
+            cache = self.cache
+            n_objects = len(self)
+            missing = set()
+            for idx in indices:
+                pos = self._load_position(idx)
+                if pos is not None and 0 <= pos < n_objects \
+                        and pos not in cache:
+                    missing.add(pos)
+
+            self._prefetch_positions(sorted(missing))
+
+        return [self.load(idx) for idx in indices]
+
+    def iter(self, prefetch=None):
+        """
+        Iterate over all stored objects in the order they were saved
+
+        Parameters
+        ----------
+        prefetch : int or None
+            if given, load blocks of this many objects at once using
+            `load_many`; otherwise load each object separately
+
+        Returns
+        -------
+        Iterator
+        """
+        if not prefetch:
+            for obj in self:
+                yield obj
+        else:
+            uuids = self.index.list
+            for start in range(0, len(uuids), prefetch):
+                for obj in self.load_many(uuids[start:start + prefetch]):
+                    yield obj
+
     def clear_cache(self):
         """Clear the cache and force reloading"""
 
@@ -573,7 +693,9 @@ class ObjectStore(StorableNamedObject):
             chunksizes=None,
             description=None,
             simtk_unit=None,
-            maskable=False
+            maskable=False,
+            precision=None,
+            key_interval=None
     ):
         """
         Create a new variable in the netCDF storage. This is just a helper
@@ -592,7 +714,7 @@ class ObjectStore(StorableNamedObject):
             it is faster. Possible input strings are
             `int`, `float`, `long`, `str`, `numpy.float32`, `numpy.float64`,
             `numpy.int8`, `numpy.int16`, `numpy.int32`, `numpy.int64`, `json`,
-            `obj.<store>`, `lazyobj.<store>`
+            `obj.<store>`, `lazyobj.<store>`, `quantized`
         dimensions : str or tuple of str
             A tuple representing the dimensions used for the netcdf variable.
             If not specified then the default dimension of the storage is used.
@@ -616,6 +738,12 @@ class ObjectStore(StorableNamedObject):
             exist and if they have not yet been written they are filled with
             a fill_value which is treated as a non-set variable. The created
             variable will interpret this values as `None` when returned
+        precision : float or None
+            the precision of a `quantized` variable, see
+            :meth:`.NetCDFPlus.create_variable`
+        key_interval : int or None
+            the rows between key rows of a delta coded `quantized` variable,
+            see :meth:`.NetCDFPlus.create_variable`
         """
 
         # add the main dimension to the var_type
@@ -668,7 +796,9 @@ class ObjectStore(StorableNamedObject):
             chunksizes=chunksizes,
             description=description,
             simtk_unit=simtk_unit,
-            maskable=maskable
+            maskable=maskable,
+            precision=precision,
+            key_interval=key_interval
         )
 
     @property
@@ -931,7 +1061,7 @@ class ObjectStore(StorableNamedObject):
         """
 
         if idx not in self.cache:
-            obj = self.simplifier.from_json(json)
+            obj = self.decode_json(json)
 
             self._get_id(idx, obj)
 
@@ -1,4 +1,5 @@
 from openpathsampling.netcdfplus.base import StorableObject
+from openpathsampling.netcdfplus.util import uuids_from_strings
 
 from .object import ObjectStore
 
@@ -43,6 +44,16 @@ class VariableStore(ObjectStore):
         self.var_names = var_names_new
         self._cached_all = False
 
+        # classes that declare the stored variables as their fields are
+        # restored by a function compiled for them, others by `__init__`
+        fields = self.content_class._dict_fields
+        if fields is not None and list(fields) == self.var_names:
+            self._to_values, self._from_values = \
+                self.content_class.row_serializers()
+        else:
+            self._to_values = None
+            self._from_values = self.content_class
+
     def to_dict(self):
         return {
             'content_class': self.content_class,
@@ -50,13 +61,53 @@ class VariableStore(ObjectStore):
         }
 
     def _save(self, obj, idx):
-        for var in self.var_names:
-            self.write(var, idx, obj)
+        if self._to_values is None or self._has_lazy_vars():
+            for var in self.var_names:
+                self.write(var, idx, obj)
+        else:
+            variables = self.vars
+            for var, value in zip(self.var_names, self._to_values(obj)):
+                variables[var][idx] = value
+
+    def _has_lazy_vars(self):
+        # lazy variables also replace the attribute by a proxy in `write`
+        try:
+            return self._lazy_vars
+        except AttributeError:
+            self._lazy_vars = any(
+                self.vars[var].var_type.startswith('lazy')
+                for var in self.var_names)
+            return self._lazy_vars
 
     def _load(self, idx):
         # kwargs = {var: self.vars[var][idx] for var in self.var_names}
         args = [self.vars[var][idx] for var in self.var_names]
-        return self.content_class(*args)
+        return self._from_values(*args)
+
+    def _load_range(self, start, stop):
+        self._prefetch_references(start, stop)
+        data = zip(*[
+            self.vars[var][start:stop]
+            for var in self.var_names
+        ])
+        from_values = self._from_values
+        return [from_values(*args) for args in data]
+
+    def _prefetch_references(self, start, stop):
+        # load the objects referenced in `obj.` variables in bulk from their
+        # stores, so the getters find them in the cache
+        for var in self.var_names:
+            variable = self.variables[var]
+            if not variable.var_type.startswith('obj.'):
+                continue
+
+            strings = variable[start:stop]
+            if hasattr(variable, 'var_vlen'):
+                # each row is the concatenation of 36 character UUIDs
+                strings = [w[i:i + 36]
+                           for w in strings for i in range(0, len(w), 36)]
+
+            self.vars[var].store.load_many(uuids_from_strings(strings))
 
     def initialize(self):
         super(VariableStore, self).initialize()
@@ -109,7 +160,7 @@ class VariableStore(ObjectStore):
         if idx not in self.cache:
             # attr = {var: self.vars[var].getter(data[nn])
             #         for nn, var in enumerate(self.var_names)}
-            obj = self.content_class(*data)
+            obj = self._from_values(*data)
             self._get_id(idx, obj)
 
             # self.index[obj.__uuid__] = idx
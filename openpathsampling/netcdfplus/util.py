@@ -1,5 +1,8 @@
 from time import time as tt
 import logging
+from uuid import UUID
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -18,3 +21,237 @@ def with_timing_logging(func):
         return _wrapped
     else:
         return func
+
+
+def contiguous_ranges(positions):
+    """
+    Split sorted positions into ranges of consecutive positions
+
+    Parameters
+    ----------
+    positions : list of int
+        sorted, unique positions
+
+    Returns
+    -------
+    list of tuple of int
+        the `(start, stop)` of each range, so that the positions are
+        `range(start, stop)` for all ranges
+    """
+    ranges = []
+    start = None
+    stop = None
+    for pos in positions:
+        if pos == stop:
+            stop += 1
+        else:
+            if start is not None:
+                ranges.append((start, stop))
+            start = pos
+            stop = pos + 1
+
+    if start is not None:
+        ranges.append((start, stop))
+
+    return ranges
+
+
+def uuids_from_strings(strings):
+    """
+    Convert stored UUID strings to UUIDs, skipping empty (`-`) references
+
+    Parameters
+    ----------
+    strings : iterable of str
+        the UUID strings as stored in `obj.` and `lazyobj.` variables
+
+    Returns
+    -------
+    list of int
+    """
+    return [int(UUID(s)) for s in strings if s[0] != '-']
+
+
+_quantized_min = np.iinfo(np.int32).min + 1
+_quantized_max = np.iinfo(np.int32).max
+
+
+def quantize(values, precision):
+    """
+    Round values to integer multiples of `precision`
+
+    This is the encoding of `quantized` variables. The decoded values
+    differ from the original ones by at most half the precision.
+
+    Parameters
+    ----------
+    values : array-like
+        the values (without units)
+    precision : float
+        the spacing of the representable values
+
+    Returns
+    -------
+    numpy.ndarray of numpy.int32
+        the values in units of `precision`
+
+    Raises
+    ------
+    ValueError
+        if a value cannot be represented, i.e. is not finite or its
+        magnitude exceeds about 2e9 times the precision
+    """
+    scaled = np.rint(np.asarray(values, dtype=np.float64) / precision)
+    if not np.all(np.isfinite(scaled)) or \
+            np.any(scaled < _quantized_min) or np.any(scaled > _quantized_max):
+        raise ValueError(
+            'Values cannot be stored with precision %g: not finite or out '
+            'of range' % precision)
+
+    return scaled.astype(np.int32)
+
+
+def dequantize(quantized, precision):
+    """
+    Return the values of quantized integers
+
+    Parameters
+    ----------
+    quantized : array-like of int
+        the values in units of `precision`, as returned by :func:`quantize`
+    precision : float
+        the spacing of the representable values
+
+    Returns
+    -------
+    numpy.ndarray of numpy.float32
+    """
+    return (np.asarray(quantized, dtype=np.float64) * precision).astype(
+        np.float32)
+
+
+def quantization_error(values, precision):
+    """
+    Return the largest error from storing values with a precision
+
+    Use this to check a precision with typical data before choosing it.
+
+    Parameters
+    ----------
+    values : array-like
+        the values (without units)
+    precision : float
+        the spacing of the representable values
+
+    Returns
+    -------
+    float
+        the largest absolute difference between the values and the values
+        after encoding and decoding
+    """
+    values = np.asarray(values, dtype=np.float64)
+    decoded = dequantize(quantize(values, precision), precision)
+    return float(np.max(np.abs(decoded - values))) if values.size else 0.0
+
+
+def _zigzag(values):
+    # map small integers of both signs to small non-negative ones
+    # (0, -1, 1, -2, ... to 0, 1, 2, 3, ...), which compress better
+    return (values << 1) ^ (values >> 31)
+
+
+def _unzigzag(values):
+    unsigned = values.view(np.uint32)
+    return (unsigned >> 1).astype(np.int32) ^ -(unsigned & 1).astype(np.int32)
+
+
+def delta_encode(quantized, start, key_interval, previous=None):
+    """
+    Delta code quantized rows along the first axis
+
+    Rows at positions that are multiples of `key_interval` (key rows) keep
+    their values, all other rows store the difference to the row before.
+    Consecutive frames of a trajectory differ by little, so the differences
+    are small integers that compress much better than the values. The
+    differences are zigzag mapped (0, -1, 1, -2, ... to 0, 1, 2, 3, ...),
+    so that small negative ones have no leading one bits either.
+
+    The differences are taken in int32 arithmetic, which may wrap around;
+    :func:`delta_decode` wraps back in the same way, so the decoded values
+    are always exact.
+
+    Parameters
+    ----------
+    quantized : array-like of int
+        the quantized rows (see :func:`quantize`) for the consecutive
+        positions starting at `start`
+    start : int
+        the position of the first row
+    key_interval : int
+        the number of rows from one key row to the next
+    previous : array-like of int or None
+        the quantized row at position `start - 1`; required if `start` is
+        not a key row
+
+    Returns
+    -------
+    numpy.ndarray of numpy.int32
+        the rows as stored
+
+    Raises
+    ------
+    ValueError
+        if `start` is not a key row and `previous` is not given
+    """
+    quantized = np.asarray(quantized, dtype=np.int32)
+    encoded = quantized.copy()
+    encoded[1:] = quantized[1:] - quantized[:-1]
+    if start % key_interval and len(quantized):
+        if previous is None:
+            raise ValueError(
+                'Row %d is not a key row, the row before is needed' % start)
+        encoded[0] = quantized[0] - np.asarray(previous, dtype=np.int32)
+
+    encoded = _zigzag(encoded)
+    first_key = -start % key_interval
+    encoded[first_key::key_interval] = quantized[first_key::key_interval]
+    return encoded
+
+
+def delta_decode(encoded, start, key_interval):
+    """
+    Return the quantized rows of delta coded rows
+
+    Parameters
+    ----------
+    encoded : array-like of int
+        rows as returned by :func:`delta_encode`, for the consecutive
+        positions starting at `start`
+    start : int
+        the position of the first row, which has to be a key row
+    key_interval : int
+        the number of rows from one key row to the next
+
+    Returns
+    -------
+    numpy.ndarray of numpy.int32
+        the quantized rows
+
+    Raises
+    ------
+    ValueError
+        if `start` is not a key row
+    """
+    if start % key_interval:
+        raise ValueError('Decoding has to start at a key row, not %d' % start)
+
+    encoded = np.asarray(encoded, dtype=np.int32)
+    differences = _unzigzag(encoded)
+    differences[::key_interval] = encoded[::key_interval]
+    decoded = np.empty_like(encoded)
+    for key in range(0, len(encoded), key_interval):
+        block = slice(key, key + key_interval)
+        np.cumsum(differences[block], axis=0, dtype=np.int32,
+                  out=decoded[block])
+
+    return decoded
@@ -327,6 +327,57 @@ class Histogram(SparseHistogram):
             return self._inputs == other._inputs
         return True
 
+    def to_dict(self):
+        """Return the parameters and counts as a dict of builtin types.
+
+        Used to store the histogram, e.g., as part of an analysis that can
+        be continued later; see :meth:`from_dict`.
+
+        Returns
+        -------
+        dict :
+            the inputs, bin parameters and counts of this histogram
+        """
+        left_bin_edges = self.left_bin_edges
+        if left_bin_edges is not None:
+            left_bin_edges = [float(edge) for edge in left_bin_edges]
+        counts = self._histogram or {}
+        return {
+            'inputs': list(self._inputs),
+            'left_bin_edges': left_bin_edges,
+            'bin_width': self.bin_width,
+            'count': float(self.count),
+            # bins as floats, like the keys made by map_to_bins
+            'counts': {tuple(float(b) for b in key): float(value)
+                       for (key, value) in counts.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, dct):
+        """Rebuild a histogram from the output of :meth:`to_dict`.
+
+        Parameters
+        ----------
+        dct : dict
+            the dict made by :meth:`to_dict`
+
+        Returns
+        -------
+        :class:`.Histogram` :
+            histogram with the same parameters and counts
+        """
+        hist = cls(*dct['inputs'])
+        if dct['left_bin_edges'] is not None:
+            hist.left_bin_edges = np.array(dct['left_bin_edges'])
+            hist.bin_width = dct['bin_width']
+            hist.bin_widths = np.array((hist.bin_width,))
+        hist._histogram = collections.Counter(
+            {tuple(float(b) for b in key): value
+             for (key, value) in dct['counts'].items()}
+        )
+        hist.count = dct['count']
+        return hist
+
     def _normalization(self):
         """Return normalization constant (integral over this histogram)."""
         hist = self('l')
@@ -14,6 +14,7 @@ import openpathsampling as paths
 from openpathsampling.netcdfplus import StorableNamedObject, StorableObject
 from openpathsampling.pathmover_inout import InOutSet, InOut
 from .ops_logging import initialization_logging
+from .profiling import profile
 from .treelogic import TreeMixin
 
 from openpathsampling.deprecations import deprecate, has_deprecations
@@ -89,6 +90,27 @@ class SampleMaxLengthError(Exception):
         self.details = details
 
 
+class SampleEarlyRejectionError(Exception):
+    def __init__(self, message, trial_sample, details):
+        super(SampleEarlyRejectionError, self).__init__(message)
+        self.trial_sample = trial_sample
+        self.details = details
+
+
+class EarlyRejectionError(Exception):
+    """
+    Raised when the dynamics were stopped since the trial cannot be accepted
+
+    Attributes
+    ----------
+    last_trajectory : :class:`.Trajectory`
+        the trajectory generated until the dynamics were stopped
+    """
+    def __init__(self, message, last_trajectory):
+        super(EarlyRejectionError, self).__init__(message)
+        self.last_trajectory = last_trajectory
+
+
 class MoveChangeNaNError(Exception):
     pass
 
@@ -497,10 +519,48 @@ class IdentityPathMover(PathMover):
 ###############################################################################
 
 class SampleMover(PathMover):
+    """
+    A mover that creates trial samples and accepts or rejects them
+
+    Attributes
+    ----------
+    verify_certificates : bool
+        if `True`, trials with an :class:`.EnsembleCertificate` (see
+        :meth:`.Ensemble.candidate_tracker`) are still tested against
+        their full ensemble, and a `RuntimeError` is raised if the
+        verdicts differ. Default is `False`; set it on the class to debug
+        all movers.
+    """
+
+    verify_certificates = False
+
+    # certificates of the trials created by the last call
+    _certificates = ()
+
     def __init__(self):
         super(SampleMover, self).__init__()
 
-    def metropolis(self, trials):
+    def _in_ensemble(self, ensemble, trajectory):
+        """Whether a trial trajectory is in its ensemble
+
+        Uses the certificate issued for the trial, if there is one.
+        """
+        for certificate in self._certificates:
+            if certificate.applies_to(ensemble, trajectory):
+                break
+        else:
+            return ensemble(trajectory, candidate=self._trust_candidate)
+
+        if self.verify_certificates:
+            full = ensemble(trajectory)
+            if full != certificate.valid:
+                raise RuntimeError(
+                    "Certificate of %s says %s, full check says %s for %s"
+                    % (ensemble.name, certificate.valid, full, trajectory))
+
+        return certificate.valid
+
+    def metropolis(self, trials, rand=None):
         """Implements the Metropolis acceptance for a list of trial samples
 
         The Metropolis uses the .bias for each sample and checks of samples
@@ -512,6 +572,11 @@ class SampleMover(PathMover):
         ----------
         trials : list of openpathsampling.Sample
             the list of all samples to be applied in a change.
+        rand : float or None
+            the random number to compare with; if `None` (default) a new
+            one is drawn. Movers that decide on a trial early (see
+            :attr:`EngineMover.early_rejection`) draw it before creating
+            the trial.
 
         Returns
         -------
@@ -537,7 +602,7 @@ class SampleMover(PathMover):
         # TODO: This isn't right. `bias` should be associated with the
         # change; not with each individual sample. ~~~DWHS
         for ens, sample in trial_dict.items():
-            valid = ens(sample.trajectory, candidate=self._trust_candidate)
+            valid = self._in_ensemble(ens, sample.trajectory)
             if not valid:
                 # one sample not valid reject
                 accepted = False
@@ -546,7 +611,11 @@ class SampleMover(PathMover):
             else:
                 probability *= sample.bias
 
-        rand = random.random()
+        # the certificates are only valid for one acceptance
+        self._certificates = ()
+
+        if rand is None:
+            rand = random.random()
 
         if rand > probability:
             # rejected
@@ -637,7 +706,8 @@ class SampleMover(PathMover):
             # engine-specific exceptions if something goes wrong.
             # Most common should be `EngineNaNError` if nan is detected and
             # `EngineMaxLengthError`
-            trials, call_details = self(*samples)
+            with profile('trial', mover=self):
+                trials, call_details = self(*samples)
 
         except SampleNaNError as e:
             e.details.update({'rejection_reason': 'nan'})
@@ -655,8 +725,18 @@ class SampleMover(PathMover):
                 input_samples=samples,
                 details=paths.Details(**e.details)
             )
+        except SampleEarlyRejectionError as e:
+            e.details.update({'rejection_reason': 'early_rejection'})
+            return paths.RejectedEarlySampleMoveChange(
+                samples=e.trial_sample,
+                mover=self,
+                input_samples=samples,
+                details=paths.Details(**e.details)
+            )
 
-        accepted, acceptance_details = self._accept(trials)
+        with profile('acceptance', mover=self):
+            accepted, acceptance_details = self._accept(
+                trials, call_details.get('metropolis_random'))
 
         # update details
         kwargs = {}
@@ -694,13 +774,30 @@ class SampleMover(PathMover):
         # Default is that the original samples are returned
         return args
 
-    def _accept(self, trials):
+    def _accept(self, trials, rand=None):
         """Function to determine the acceptance of a trial
 
         Defaults to calling the Metropolis acceptance criterion for all returned
         trial samples. Means all samples most be valid and accepted.
         """
-        return self.metropolis(trials)
+        return self.metropolis(trials, rand)
+
+
+class _TrialLengthLimit(object):
+    # running condition that stops the dynamics as soon as the trial would
+    # have more than `max_length` frames; `n_fixed` is the number of frames
+    # the trial has besides the ones being generated
+    def __init__(self, max_length, n_fixed):
+        self.max_length = max_length
+        self.n_fixed = n_fixed
+        self.exceeded = False
+
+    def __call__(self, trajectory, trusted=False):
+        if len(trajectory) + self.n_fixed > self.max_length:
+            self.exceeded = True
+            return False
+
+        return True
 
 
 ###############################################################################
@@ -731,10 +828,26 @@ class EngineMover(SampleMover):
       calls the functions to make the trajectories (depending on the nature
       of the mover). Frequently, this is the only thing to override (two-way
       shooting, shifting).
+    * ``_generate``: runs the engine; use this instead of calling
+      ``engine.generate`` directly to support early rejection
+
+    Early rejection: if ``early_rejection`` is set (for a mover, or for all
+    movers on the class), the random number of the Metropolis acceptance is
+    drawn before the trial is created. If the selector can tell the longest
+    acceptable trial for it (see
+    :meth:`.ShootingPointSelector.max_accepted_length`, e.g., the
+    :class:`.UniformSelector`), the dynamics are stopped once the trial gets
+    longer and the trial is rejected with the ``'early_rejection'``
+    rejection reason. These trials would be rejected anyway, so this does
+    not change the sampling but saves the dynamics for long trials.
     """
 
     default_engine = None
     reject_max_length = True
+    early_rejection = False
+
+    # the limit of the trial currently created, see `_generate`
+    _length_limit = None
 
     # this will store the engine attribute for all subclasses as well
     _included_attr = ['_engine']
@@ -778,13 +891,33 @@ class EngineMover(SampleMover):
         return [self.target_ensemble]
 
     def __call__(self, input_sample):
+        self._certificates = []
         initial_trajectory = input_sample.trajectory
         shooting_index = self.selector.pick(initial_trajectory)
 
+        early_details = {}
+        if self.early_rejection:
+            rand = random.random()
+            early_details['metropolis_random'] = rand
+            max_length = self.selector.max_accepted_length(
+                initial_trajectory, rand)
+            if max_length is not None:
+                early_details['max_accepted_length'] = max_length
+                self._length_limit = max_length
+
         try:
             trial_trajectory, run_details = self._run(initial_trajectory,
                                                       shooting_index)
 
+        except EarlyRejectionError as e:
+            trial, details = self._build_sample(
+                input_sample, shooting_index, e.last_trajectory,
+                'early_rejection')
+            details.update(early_details)
+
+            raise SampleEarlyRejectionError('Sample rejected early', trial,
+                                            details)
+
         except paths.engines.EngineNaNError as e:
             trial, details = self._build_sample(
                 input_sample, shooting_index, e.last_trajectory, 'nan')
@@ -802,11 +935,84 @@ class EngineMover(SampleMover):
             trial, details = self._build_sample(
                 input_sample, shooting_index, trial_trajectory)
 
+        finally:
+            self._length_limit = None
+
         trials = [trial]
         details.update(run_details)
+        details.update(early_details)
 
         return trials, details
 
+    def _generate(self, snapshot, running, n_fixed=0):
+        """Run the engine, stopping once the trial cannot be accepted
+
+        Parameters
+        ----------
+        snapshot : :class:`.BaseSnapshot`
+            the initial snapshot
+        running : list of callable
+            the running conditions (see :meth:`.DynamicsEngine.generate`)
+        n_fixed : int
+            the number of frames the trial has at least in addition to the
+            ones generated here
+
+        Returns
+        -------
+        :class:`.Trajectory`
+            the generated trajectory
+
+        Raises
+        ------
+        EarlyRejectionError
+            if the trial got too long to be accepted
+        """
+        if self._length_limit is None:
+            return self.engine.generate(snapshot, running=running)
+
+        limit = _TrialLengthLimit(self._length_limit, n_fixed)
+        initial = paths.Trajectory([snapshot])
+        if not limit(initial):
+            # the known part alone is too long; no need to run at all
+            raise EarlyRejectionError(
+                'Trial longer than %d frames' % self._length_limit, initial)
+
+        partial = self.engine.generate(snapshot, running=running + [limit])
+        if limit.exceeded:
+            raise EarlyRejectionError(
+                'Trial longer than %d frames' % self._length_limit, partial)
+
+        return partial
+
+    def _candidate_tracker(self, fixed, direction):
+        """Tracker of the target ensemble for a trial, see `_certify`
+
+        Parameters
+        ----------
+        fixed : :class:`.Trajectory`
+            the frames of the trial that are not generated
+        direction : +1 or -1
+            +1 if the generated frames are appended to `fixed`, -1 if they
+            are prepended (reversed)
+
+        Returns
+        -------
+        callable or None
+            the running condition following the generated frames, `None`
+            if no certificate can be issued
+        """
+        if not self._trust_candidate:
+            return None
+        return self.target_ensemble.candidate_tracker(fixed, direction)
+
+    def _certify(self, tracker, trial_trajectory, partial_trajectory):
+        """Keep the certificate of the tracker for the acceptance"""
+        if tracker is not None:
+            certificate = tracker.certificate(trial_trajectory,
+                                              partial_trajectory)
+            if certificate is not None:
+                self._certificates.append(certificate)
+
     def _build_sample(
             self,
             input_sample,
@@ -853,26 +1059,30 @@ class EngineMover(SampleMover):
 
     def _make_forward_trajectory(self, trajectory, shooting_index):
         initial_snapshot = trajectory[shooting_index]  # .copy()
+        prefix = trajectory[0:shooting_index]
         run_f = paths.PrefixTrajectoryEnsemble(self.target_ensemble,
-                                               trajectory[0:shooting_index]
-                                              ).can_append
-        partial_trajectory = self.engine.generate(initial_snapshot,
-                                                  running=[run_f])
-        trial_trajectory = (trajectory[0:shooting_index] +
-                            partial_trajectory)
+                                               prefix).can_append
+        tracker = self._candidate_tracker(prefix, +1)
+        running = [run_f] if tracker is None else [run_f, tracker]
+        partial_trajectory = self._generate(initial_snapshot, running,
+                                            n_fixed=len(prefix))
+        trial_trajectory = prefix + partial_trajectory
+        self._certify(tracker, trial_trajectory, partial_trajectory)
         # TODO: this should check for overshoot; only works now if ensemble
         # doesn't overshoot
         return trial_trajectory
 
     def _make_backward_trajectory(self, trajectory, shooting_index):
         initial_snapshot = trajectory[shooting_index].reversed  # _copy()
+        suffix = trajectory[shooting_index + 1:]
         run_f = paths.SuffixTrajectoryEnsemble(self.target_ensemble,
-                                               trajectory[shooting_index + 1:]
-                                              ).can_prepend
-        partial_trajectory = self.engine.generate(initial_snapshot,
-                                                  running=[run_f])
-        trial_trajectory = (partial_trajectory.reversed +
-                            trajectory[shooting_index + 1:])
+                                               suffix).can_prepend
+        tracker = self._candidate_tracker(suffix, -1)
+        running = [run_f] if tracker is None else [run_f, tracker]
+        partial_trajectory = self._generate(initial_snapshot, running,
+                                            n_fixed=len(suffix))
+        trial_trajectory = partial_trajectory.reversed + suffix
+        self._certify(tracker, trial_trajectory, partial_trajectory)
         # TODO: this should check for overshoot; only works now if ensemble
         # doesn't overshoot
         return trial_trajectory
@@ -1577,8 +1787,9 @@ class SelectionMover(PathMover):
         return mover, details
 
     def move(self, sample_set):
-        weights = self._selector(sample_set)
-        mover, details = self.select_mover(weights)
+        with profile('selection', mover=self):
+            weights = self._selector(sample_set)
+            mover, details = self.select_mover(weights)
         subchange = mover.move(sample_set)
 
         path = paths.RandomChoiceMoveChange(
@@ -2205,6 +2416,17 @@ class OneWayShootingMover(SpecializedRandomChoiceMover):
     def engine(self):
         return self.movers[0].engine
 
+    @property
+    def early_rejection(self):
+        """bool : early rejection of the submovers (see
+        :class:`.EngineMover`)"""
+        return self.movers[0].early_rejection
+
+    @early_rejection.setter
+    def early_rejection(self, value):
+        for mover in self.movers:
+            mover.early_rejection = value
+
 
 class OneWayExtendMover(SpecializedRandomChoiceMover):
     """
@@ -2250,25 +2472,29 @@ class AbstractTwoWayShootingMover(EngineMover):
     def direction(self):  # pragma: no cover
         return 'bidrectional'
 
+    # `n_fixed` is the number of frames of the other half of the trial that
+    # is already known (used for early rejection)
+
     def _make_forward_trajectory(self, trajectory, initial_snapshot,
-                                 shooting_index):
+                                 shooting_index, n_fixed=0):
         fwd_ens = paths.PrefixTrajectoryEnsemble(
             self.target_ensemble,
             trajectory[0:shooting_index]
         )
-        fwd_partial = self.engine.generate(initial_snapshot,
-                                           running=[fwd_ens.can_append])
+        fwd_partial = self._generate(initial_snapshot, [fwd_ens.can_append],
+                                     n_fixed=n_fixed)
         return fwd_partial
 
     def _make_backward_trajectory(self, trajectory, initial_snapshot,
-                                  shooting_index):
+                                  shooting_index, n_fixed=0):
         # run backward
         bkwd_ens = paths.SuffixTrajectoryEnsemble(
             self.target_ensemble,
             trajectory[shooting_index + 1:]
         )
-        bkwd_partial = self.engine.generate(initial_snapshot.reversed,
-                                            running=[bkwd_ens.can_prepend])
+        bkwd_partial = self._generate(initial_snapshot.reversed,
+                                      [bkwd_ens.can_prepend],
+                                      n_fixed=n_fixed)
         return bkwd_partial
 
     def _run(self, trajectory, shooting_index):
@@ -2309,8 +2535,8 @@ class ForwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
         # TODO: come up with a test that shows why you need mid_traj here;
         # should be a SeqEns with OptionalEnsembles. Exact example is hard!
         mid_traj = trajectory[0:shooting_index] + fwd_partial
-        bkwd_partial = self._make_backward_trajectory(mid_traj, modified,
-                                                      shooting_index)
+        bkwd_partial = self._make_backward_trajectory(
+            mid_traj, modified, shooting_index, n_fixed=len(fwd_partial) - 1)
 
         # join the two
         trial_trajectory = bkwd_partial.reversed + fwd_partial[1:]
@@ -2356,8 +2582,9 @@ class BackwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
         # should be a SeqEns with OptionalEnsembles. Exact example is hard!
         mid_traj = bkwd_partial.reversed + trajectory[shooting_index + 1:]
         mid_traj_shoot_idx = len(bkwd_partial) - 1
-        fwd_partial = self._make_forward_trajectory(mid_traj, modified,
-                                                    mid_traj_shoot_idx)
+        fwd_partial = self._make_forward_trajectory(
+            mid_traj, modified, mid_traj_shoot_idx,
+            n_fixed=len(bkwd_partial) - 1)
         #logger.info("Complete forward shot (length " +
                     #str(len(fwd_partial)) + ")")
 
@@ -2398,6 +2625,17 @@ class TwoWayShootingMover(SpecializedRandomChoiceMover):
     def modifier(self):
         return self.movers[0].modifier
 
+    @property
+    def early_rejection(self):
+        """bool : early rejection of the submovers (see
+        :class:`.EngineMover`)"""
+        return self.movers[0].early_rejection
+
+    @early_rejection.setter
+    def early_rejection(self, value):
+        for mover in self.movers:
+            mover.early_rejection = value
+
 
 class MinusMover(SubPathMover):
     """
@@ -5,17 +5,164 @@ import os
 import openpathsampling as paths
 from .path_simulator import PathSimulator, MCStep
 from ..ops_logging import initialization_logging
+from ..profiling import profile
 
 
 logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
 
+class DecorrelationTracker(object):
+    """
+    Tracks which replicas still contain frames of their initial trajectory
+
+    The frames of the initial trajectory of each replica are kept as a set
+    of UUIDs. With `time_reversal`, a snapshot and its reversed count as the
+    same frame: their UUIDs only differ in the lowest bit, which is cleared.
+    :meth:`update` only looks at replicas whose trajectory changed, and for
+    one-way shooting only at the frames that were replaced, so checking the
+    samples after a step is cheap.
+
+    Parameters
+    ----------
+    sample_set : :class:`.SampleSet`
+        the initial samples
+    time_reversal : bool
+        whether a reversed frame of an initial trajectory counts as
+        correlated
+
+    Attributes
+    ----------
+    n_shared : dict of int: int
+        for each replica the number of frames of the current trajectory
+        that are (or are reversed) frames of the initial trajectory
+    """
+    def __init__(self, sample_set, time_reversal=True):
+        self.time_reversal = time_reversal
+        self._originals = {
+            sample.replica: set(self._keys(sample.trajectory))
+            for sample in sample_set
+        }
+        self._trajectories = {}
+        self.n_shared = {}
+        self.update(sample_set)
+
+    def _keys(self, trajectory):
+        uuids = (snap.__uuid__ for snap in trajectory.iter_proxies())
+        if self.time_reversal:
+            return [uuid & ~1 for uuid in uuids]
+        else:
+            return list(uuids)
+
+    def _count(self, trajectory, originals):
+        return sum(1 for key in self._keys(trajectory) if key in originals)
+
+    def update(self, sample_set, change=None):
+        """
+        Count the initial frames in the current samples
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the current samples, which contain all replicas of the initial
+            sample set
+        change : :class:`.MoveChange` or None
+            the change that led from the previous to the current samples. A
+            replica shot one-way from its previous trajectory is updated
+            from the frames that were replaced and generated; other changed
+            replicas are recounted.
+
+        Returns
+        -------
+        int
+            the number of replicas that are still correlated
+        """
+        shots = self._shots(change) if change is not None else {}
+        for replica, originals in self._originals.items():
+            trajectory = sample_set[replica].trajectory
+            previous = self._trajectories.get(replica)
+            if trajectory is previous:
+                continue
+
+            self._trajectories[replica] = trajectory
+            replaced = self._replaced(previous, trajectory,
+                                      shots.get(id(trajectory)))
+            if replaced is None:
+                self.n_shared[replica] = self._count(trajectory, originals)
+            else:
+                leaving, entering = replaced
+                self.n_shared[replica] += (self._count(entering, originals)
+                                           - self._count(leaving, originals))
+
+        return self.n_correlated
+
+    @staticmethod
+    def _shots(change):
+        # the changes of one-way shooting (or extension) moves by the id of
+        # their trial trajectories
+        shots = {}
+        for subchange in change:
+            if isinstance(subchange, paths.SampleMoveChange) and \
+                    isinstance(subchange.mover, paths.EngineMover) and \
+                    subchange.mover.direction in ['forward', 'backward']:
+                for sample in subchange.samples:
+                    shots[id(sample.trajectory)] = subchange
+        return shots
+
+    @staticmethod
+    def _replaced(previous, trajectory, shot):
+        # the (leaving, entering) frames if `trajectory` is the trial of
+        # `shot` from `previous`: it keeps the frames of `previous` up to
+        # (forward) or from (backward) the shooting snapshot. None otherwise.
+        if shot is None or previous is None:
+            return None
+
+        details = shot.details
+        snapshot = getattr(details, 'shooting_snapshot', None)
+        if getattr(details, 'initial_trajectory', None) is not previous or \
+                snapshot is None or snapshot not in previous:
+            return None
+
+        index = previous.index(snapshot)
+        if shot.mover.direction == 'forward':
+            position = index
+            n_kept = index + 1
+        else:
+            n_kept = len(previous) - index
+            position = len(trajectory) - n_kept
+        if not 0 <= position < len(trajectory) or \
+                trajectory.get_as_proxy(position).__uuid__ != \
+                snapshot.__uuid__:
+            return None
+
+        if shot.mover.direction == 'forward':
+            return previous[n_kept:], trajectory[n_kept:]
+        else:
+            return previous[:index], trajectory[:position]
+
+    @property
+    def n_correlated(self):
+        """int : number of replicas that are still correlated"""
+        return sum(1 for n_shared in self.n_shared.values() if n_shared)
+
+    @property
+    def correlated_replicas(self):
+        """list of int : the replicas that are still correlated"""
+        return sorted(replica for replica, n_shared in self.n_shared.items()
+                      if n_shared)
+
+
 class PathSampling(PathSimulator):
     """
     General path sampling code.
 
     Takes a single move_scheme and generates samples from that, keeping one
     per replica after each move.
+
+    Attributes
+    ----------
+    profiler : :class:`.Profiler` or None
+        if set, the time spent in the phases of :meth:`run` is collected by
+        this profiler; default `None`
     """
 
     calc_name = "PathSampling"
@@ -49,6 +196,7 @@ class PathSampling(PathSimulator):
                                ['move_scheme', 'sample_set'])
         self.live_visualizer = None
         self.status_update_frequency = 1
+        self.profiler = None
 
         if initialize:
             samples = []
@@ -195,31 +343,27 @@ class PathSampling(PathSimulator):
         meant in the sense commonly used in one-way shooting: this runs
         until no configurations from the original trajectories remain.
         """
-        originals = {s.replica: s.trajectory for s in self.sample_set}
-        current = self.sample_set
+        tracker = DecorrelationTracker(self.sample_set, time_reversal)
+        n_replicas = len(tracker.n_shared)
 
         # cache the output stream; force the primary `run` method to not
         # output anything
         original_output_stream = self.output_stream
         self.output_stream = open(os.devnull, 'w')
 
-        def n_correlated(sample_set, originals):
-            return sum([originals[r].is_correlated(sample_set[r],
-                                                   time_reversal)
-                        for r in originals])
-
         original_output_stream.write("Decorrelating trajectories....\n")
-        to_decorrelate = n_correlated(self.sample_set, originals)
+        to_decorrelate = tracker.n_correlated
         # walrus in py38!
         while to_decorrelate:
             out_str = "Step {}: {} of {} trajectories still correlated\n"
             paths.tools.refresh_output(
-                out_str.format(self.step + 1, to_decorrelate, len(originals)),
+                out_str.format(self.step + 1, to_decorrelate, n_replicas),
                 refresh=False,
                 output_stream=original_output_stream
             )
             self.run(1)
-            to_decorrelate = n_correlated(self.sample_set, originals)
+            to_decorrelate = tracker.update(self.sample_set,
+                                            self._current_step.change)
 
         paths.tools.refresh_output(
             "Step {}: All trajectories decorrelated!\n".format(self.step+1),
@@ -241,69 +385,87 @@ class PathSampling(PathSimulator):
 
         initial_time = time.time()
 
-        for nn in range(n_steps):
-            self.step += 1
-            logger.info("Beginning MC cycle " + str(self.step))
-            refresh = self.allow_refresh
-            if self.step % self.status_update_frequency == 0:
-                # do we visualize this step?
-                if self.live_visualizer is not None and mcstep is not None:
-                    # do we visualize at all?
-                    self.live_visualizer.draw_ipynb(mcstep)
-                    refresh = False
-
-                elapsed = time.time() - initial_time
-
-                if nn > 0:
-                    time_per_step = elapsed / nn
-                else:
-                    time_per_step = 1.0
-
-                paths.tools.refresh_output(
-                    "Working on Monte Carlo cycle number " + str(self.step)
-                    + "\n" + paths.tools.progress_string(nn, n_steps,
-                                                         elapsed),
-                    refresh=refresh,
-                    output_stream=self.output_stream
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.activate()
+
+        try:
+            for nn in range(n_steps):
+                self.step += 1
+                logger.info("Beginning MC cycle " + str(self.step))
+                refresh = self.allow_refresh
+                if self.step % self.status_update_frequency == 0:
+                    # do we visualize this step?
+                    if self.live_visualizer is not None \
+                            and mcstep is not None:
+                        # do we visualize at all?
+                        self.live_visualizer.draw_ipynb(mcstep)
+                        refresh = False
+
+                    elapsed = time.time() - initial_time
+
+                    if nn > 0:
+                        time_per_step = elapsed / nn
+                    else:
+                        time_per_step = 1.0
+
+                    paths.tools.refresh_output(
+                        "Working on Monte Carlo cycle number "
+                        + str(self.step) + "\n"
+                        + paths.tools.progress_string(nn, n_steps, elapsed),
+                        refresh=refresh,
+                        output_stream=self.output_stream
+                    )
+
+                time_start = time.time()
+                with profile('move'):
+                    movepath = self._mover.move(self.sample_set,
+                                                step=self.step)
+                    samples = movepath.results
+                    new_sampleset = self.sample_set.apply_samples(samples)
+                time_elapsed = time.time() - time_start
+
+                # TODO: we can save this with the MC steps for timing? The
+                # bit below works, but is only a temporary hack
+                setattr(movepath.details, "timing", time_elapsed)
+
+                mcstep = MCStep(
+                    simulation=self,
+                    mccycle=self.step,
+                    previous=self.sample_set,
+                    active=new_sampleset,
+                    change=movepath
                 )
 
-            time_start = time.time()
-            movepath = self._mover.move(self.sample_set, step=self.step)
-            samples = movepath.results
-            new_sampleset = self.sample_set.apply_samples(samples)
-            time_elapsed = time.time() - time_start
-
-            # TODO: we can save this with the MC steps for timing? The bit
-            # below works, but is only a temporary hack
-            setattr(movepath.details, "timing", time_elapsed)
+                self._current_step = mcstep
+                with profile('save'):
+                    self.save_current_step()
 
-            mcstep = MCStep(
-                simulation=self,
-                mccycle=self.step,
-                previous=self.sample_set,
-                active=new_sampleset,
-                change=movepath
-            )
+                # if self.storage is not None:
+                #     # I think this is done automatically when saving
+                #     # snapshots
+                #     # for cv in cvs:
+                #     #     n_len = len(self.storage.snapshots)
+                #     #     cv(self.storage.snapshots[n_samples:n_len])
+                #     #     n_samples = n_len
+                #
+                #     self.storage.steps.save(mcstep)
 
-            self._current_step = mcstep
-            self.save_current_step()
+                if self.step % self.save_frequency == 0:
+                    self.sample_set.sanity_check()
+                    with profile('sync'):
+                        self.sync_storage()
 
-            # if self.storage is not None:
-            #     # I think this is done automatically when saving snapshots
-            #     # for cv in cvs:
-            #     #     n_len = len(self.storage.snapshots)
-            #     #     cv(self.storage.snapshots[n_samples:n_len])
-            #     #     n_samples = n_len
-            #
-            #     self.storage.steps.save(mcstep)
-
-            if self.step % self.save_frequency == 0:
-                self.sample_set.sanity_check()
-                self.sync_storage()
+                self.sample_set = new_sampleset
 
-            self.sample_set = new_sampleset
+                if profiler is not None:
+                    profiler.end_step(movepath.subchange)
 
-        self.sync_storage()
+            with profile('sync'):
+                self.sync_storage()
+        finally:
+            if profiler is not None:
+                profiler.deactivate()
 
         if self.live_visualizer is not None and mcstep is not None:
             self.live_visualizer.draw_ipynb(mcstep)
@@ -33,6 +33,9 @@ class MCStep(StorableObject):
     change : MoveChange
         the movechange describing the transition from pre to post
     """
+    # the variables of the MCStepStore
+    _dict_fields = ['simulation', 'mccycle', 'previous', 'active', 'change']
+
     def __init__(self, simulation=None, mccycle=-1, previous=None,
                  active=None, change=None):
         super(MCStep, self).__init__()
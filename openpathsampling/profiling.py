@@ -0,0 +1,346 @@
+"""
+Timing of the phases of path sampling runs
+
+A :class:`Profiler` collects the wall-clock time spent in the phases of a
+simulation (mover selection, dynamics, acceptance, saving, ...) and
+attributes it to the mover doing the work. Code that should be timed
+opens a phase with :func:`profile`, which does nothing unless a profiler is
+active:
+
+>>> with profile('engine.integrate'):
+...     snapshot = engine.generate_next_frame()
+
+To profile a simulation, give it a profiler:
+
+>>> sim.profiler = Profiler('run.nc.profile.json', dump_frequency=100)
+>>> sim.run(1000)
+>>> sim.profiler.summary()
+"""
+
+import json
+import sys
+import timeit
+
+from openpathsampling.tools import replace_file
+
+timer = timeit.default_timer
+
+# the profiler collecting timings, see `Profiler.activate`
+_active = None
+
+
+class _NullPhase(object):
+    # used when no profiler is active
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_null_phase = _NullPhase()
+
+
+def active_profiler():
+    """
+    Return the active profiler
+
+    Returns
+    -------
+    :class:`Profiler` or None
+    """
+    return _active
+
+
+def profile(phase, mover=None):
+    """
+    Time a phase with the active profiler
+
+    Parameters
+    ----------
+    phase : str
+        the name of the phase, e.g. `'engine.integrate'`
+    mover : :class:`.PathMover` or None
+        if given, the time of this phase and all phases inside it is
+        attributed to this mover
+
+    Returns
+    -------
+    context manager
+        a no-op if no profiler is active
+    """
+    if _active is None:
+        return _null_phase
+    return _Phase(_active, phase, mover)
+
+
+class _Phase(object):
+    __slots__ = ['profiler', 'name', 'mover', 'start', 'children']
+
+    def __init__(self, profiler, name, mover):
+        self.profiler = profiler
+        self.name = name
+        self.mover = mover
+
+    def __enter__(self):
+        profiler = self.profiler
+        if self.mover is not None:
+            profiler._movers.append(self.mover)
+        profiler._phases.append(self)
+        self.children = 0.0
+        self.start = timer()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = timer() - self.start
+        profiler = self.profiler
+        phases = profiler._phases
+        phases.pop()
+        if phases:
+            phases[-1].children += elapsed
+
+        # only the time not spent in nested phases
+        profiler._record(self.name, elapsed - self.children)
+        if self.mover is not None:
+            profiler._movers.pop()
+
+        return False
+
+
+class Profiler(object):
+    """
+    Accumulates the time spent in phases of a simulation per mover
+
+    Phases can be nested; each phase only counts the time not spent in the
+    phases inside it, so the times of all phases add up to the total time.
+    During a step, times are collected per mover. At the end of the step
+    (see :meth:`end_step`) the movers are replaced by their path in the
+    :class:`.MoveChange` tree of the step, e.g. `'RootMover >
+    OneWayShootingMover > ForwardShootMover'`.
+
+    The phases of a :class:`.PathSampling` run are `'move'` (the time of
+    the move not spent in the phases below, e.g. applying the new
+    samples), `'selection'` (choosing the submover), `'trial'`,
+    `'acceptance'`, `'save'` and `'sync'`, and the phases of the engine:
+    `'engine.integrate'`, `'engine.snapshot'` (building snapshots),
+    `'engine.nan_check'` and `'engine.stop_check'` (the stopping
+    conditions).
+
+    Parameters
+    ----------
+    filename : str or None
+        the sidecar file (JSON) the timings are written to by :meth:`dump`
+    dump_frequency : int or None
+        if given (and a filename is set), the timings are written every
+        `dump_frequency` steps
+
+    Attributes
+    ----------
+    timings : dict of (str, str): list of [float, int]
+        for each mover path and phase the total time in seconds and the
+        number of times the phase was entered. Phases outside of any mover
+        (e.g. saving) have the mover path `''`.
+    n_steps : int
+        the number of steps profiled
+    """
+
+    def __init__(self, filename=None, dump_frequency=None):
+        self.filename = filename
+        self.dump_frequency = dump_frequency
+        self.timings = {}
+        self.n_steps = 0
+        self._step_timings = {}
+        self._phases = []
+        self._movers = []
+
+    def _record(self, phase, seconds):
+        key = (self._movers[-1] if self._movers else None, phase)
+        try:
+            entry = self._step_timings[key]
+        except KeyError:
+            self._step_timings[key] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def activate(self):
+        """
+        Make this the profiler collecting the timings of :func:`profile`
+        """
+        global _active
+        _active = self
+
+    def deactivate(self):
+        """
+        Stop collecting timings, if this is the active profiler
+        """
+        global _active
+        if _active is self:
+            _active = None
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.deactivate()
+        return False
+
+    @staticmethod
+    def _mover_paths(change):
+        # the path of each mover from the root of the change tree
+        paths = {}
+        todo = [(change, ())]
+        while todo:
+            current, path = todo.pop()
+            mover = current.mover
+            if mover is not None:
+                path = path + (mover.name,)
+                if mover not in paths:
+                    paths[mover] = ' > '.join(path)
+
+            todo.extend((sub, path) for sub in current.subchanges)
+
+        return paths
+
+    def end_step(self, change=None):
+        """
+        Add the timings of the current step to the totals
+
+        Parameters
+        ----------
+        change : :class:`.MoveChange` or None
+            the change of the step, used to find the path of each mover
+        """
+        mover_paths = self._mover_paths(change) if change is not None else {}
+        timings = self.timings
+        for (mover, phase), (seconds, count) in self._step_timings.items():
+            if mover is None:
+                path = ''
+            else:
+                path = mover_paths.get(mover) or mover.name
+
+            entry = timings.setdefault((path, phase), [0.0, 0])
+            entry[0] += seconds
+            entry[1] += count
+
+        self._step_timings = {}
+        self.n_steps += 1
+
+        if self.filename is not None and self.dump_frequency and \
+                self.n_steps % self.dump_frequency == 0:
+            self.dump()
+
+    def reset(self):
+        """
+        Remove all collected timings
+        """
+        self.timings = {}
+        self._step_timings = {}
+        self.n_steps = 0
+
+    def to_dict(self):
+        """
+        Return the collected timings as a JSON serializable dict
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            'n_steps': self.n_steps,
+            'timings': [
+                {'mover': path, 'phase': phase,
+                 'seconds': seconds, 'count': count}
+                for (path, phase), (seconds, count)
+                in sorted(self.timings.items())
+            ]
+        }
+
+    def dump(self, filename=None):
+        """
+        Write the collected timings to a JSON file
+
+        The file is replaced at once, so it can be read while a simulation
+        is running.
+
+        Parameters
+        ----------
+        filename : str or None
+            the file to write; defaults to :attr:`filename`
+        """
+        if filename is None:
+            filename = self.filename
+        if filename is None:
+            raise ValueError('No file to dump the timings to')
+
+        replace_file(filename, json.dumps(self.to_dict(), indent=1))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read timings written by :meth:`dump`
+
+        Parameters
+        ----------
+        filename : str
+
+        Returns
+        -------
+        :class:`Profiler`
+        """
+        with open(filename) as f:
+            dct = json.load(f)
+
+        profiler = cls()
+        profiler.n_steps = dct['n_steps']
+        profiler.timings = {
+            (entry['mover'], entry['phase']): [entry['seconds'],
+                                               entry['count']]
+            for entry in dct['timings']
+        }
+        return profiler
+
+    def phase_totals(self):
+        """
+        Return the total time of each phase over all movers
+
+        Returns
+        -------
+        dict of str: float
+        """
+        totals = {}
+        for (path, phase), (seconds, count) in self.timings.items():
+            totals[phase] = totals.get(phase, 0.0) + seconds
+
+        return totals
+
+    def summary(self, output=sys.stdout):
+        """
+        Write where the time was spent, per mover and phase
+
+        Parameters
+        ----------
+        output : file
+            file to direct output
+        """
+        total = sum(seconds for seconds, _ in self.timings.values())
+        output.write("Profiled {n} steps, {total:.3f} s\n".format(
+            n=self.n_steps, total=total))
+        by_mover = {}
+        for (path, phase), entry in self.timings.items():
+            by_mover.setdefault(path, []).append((phase, entry))
+
+        for path in sorted(by_mover):
+            lines = sorted(by_mover[path], key=lambda line: -line[1][0])
+            mover_total = sum(entry[0] for _, entry in lines)
+            output.write("{path} ({fraction:.2%}):\n".format(
+                path=path or 'simulation',
+                fraction=mover_total / total if total else 0.0))
+            for phase, (seconds, count) in lines:
+                output.write(
+                    "  {phase} {seconds:.3f} s ({fraction:.2%}) in {count} "
+                    "calls, {mean:.3g} ms per call\n".format(
+                        phase=phase, seconds=seconds,
+                        fraction=seconds / total if total else 0.0,
+                        count=count, mean=1000.0 * seconds / count))
@@ -7,7 +7,6 @@ from openpathsampling.netcdfplus import DelayedLoader
 
 from openpathsampling.tools import refresh_output
 
-from collections import Counter
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +31,9 @@ class SampleSet(StorableObject):
 
     The dictionaries ensemble_dict and replica_dict are conveniences which
     should be kept consistent by any method which modifies the container.
-    They do not need to be stored.
+    They do not need to be stored. The lists in them are replaced, not
+    changed in place, so that copies of a SampleSet (e.g., by
+    `apply_samples`) can share them.
 
     Note
     ----
@@ -69,12 +70,42 @@ class SampleSet(StorableObject):
 
         self._lazy = {}
 
-        self.samples = []
-        self.ensemble_dict = {}
-        self.replica_dict = {}
-        self.extend(samples)
+        if isinstance(samples, SampleSet):
+            self._copy_containers(samples)
+        else:
+            self.samples = []
+            self._members = set()
+            self.ensemble_dict = {}
+            self.replica_dict = {}
+            self.extend(samples)
         self.movepath = movepath
 
+    def _copy_containers(self, other):
+        # The lists in ensemble_dict and replica_dict are never changed in
+        # place (see `_add_to` and `_remove_from`), so copies can share
+        # them. Only the containers are copied, which is done at C speed.
+        self.samples = list(other.samples)
+        self._members = set(other._members)
+        self.ensemble_dict = dict(other.ensemble_dict)
+        self.replica_dict = dict(other.replica_dict)
+
+    @staticmethod
+    def _add_to(dct, key, sample):
+        try:
+            dct[key] = dct[key] + [sample]
+        except KeyError:
+            dct[key] = [sample]
+
+    @staticmethod
+    def _remove_from(dct, key, sample):
+        remaining = [s for s in dct[key] if s is not sample]
+        if len(remaining) == len(dct[key]):
+            raise ValueError('%r not in SampleSet' % sample)
+        if remaining:
+            dct[key] = remaining
+        else:
+            del dct[key]
+
     @property
     def ensembles(self):
         return self.ensemble_dict.keys()
@@ -110,7 +141,7 @@ class SampleSet(StorableObject):
             if key != value.replica:
                 raise SampleKeyError(key, value, value.replica)
 
-        if value in self.samples:
+        if value in self._members:
             # if value is already in this, we don't need to do anything
             return
         # Setting works by replacing one with the same key. We pick one with
@@ -126,18 +157,17 @@ class SampleSet(StorableObject):
         self.append(value)
 
     def __eq__(self, other):
-        return Counter(self.samples) == Counter(other.samples)
+        # samples are unique within a SampleSet
+        return len(self.samples) == len(other.samples) and \
+            all(sample in self._members for sample in other.samples)
 
     def __ne__(self, other):
         return not self == other
 
     def __delitem__(self, sample):
-        self.ensemble_dict[sample.ensemble].remove(sample)
-        self.replica_dict[sample.replica].remove(sample)
-        if len(self.ensemble_dict[sample.ensemble]) == 0:
-            del self.ensemble_dict[sample.ensemble]
-        if len(self.replica_dict[sample.replica]) == 0:
-            del self.replica_dict[sample.replica]
+        self._remove_from(self.ensemble_dict, sample.ensemble, sample)
+        self._remove_from(self.replica_dict, sample.replica, sample)
+        self._members.remove(sample)
         self.samples.remove(sample)
 
     # TODO: add support for remove and pop
@@ -151,7 +181,7 @@ class SampleSet(StorableObject):
 
     def __contains__(self, item):
         # check for Sample, replica (int) and Ensemble, too
-        if item in self.samples:
+        if item in self._members:
             return True
         elif item in self.ensemble_dict:
             return True
@@ -173,21 +203,16 @@ class SampleSet(StorableObject):
             return []
 
     def append(self, sample):
-        if sample in self.samples:
+        if sample in self._members:
             # question: would it make sense to raise an error here? can't
             # have more than one copy of the same sample, but should we
             # ignore it silently or complain?
             return
 
+        self._members.add(sample)
         self.samples.append(sample)
-        try:
-            self.ensemble_dict[sample.ensemble].append(sample)
-        except KeyError:
-            self.ensemble_dict[sample.ensemble] = [sample]
-        try:
-            self.replica_dict[sample.replica].append(sample)
-        except KeyError:
-            self.replica_dict[sample.replica] = [sample]
+        self._add_to(self.ensemble_dict, sample.ensemble, sample)
+        self._add_to(self.replica_dict, sample.replica, sample)
 
     def extend(self, samples):
         # note that this works whether the parameter samples is a list of
@@ -202,6 +227,23 @@ class SampleSet(StorableObject):
     def apply_samples(self, samples, copy=True):
         """Update by setting samples by replica in the order given
 
+        Each sample replaces the sample with the same replica ID, if there
+        is one, and is appended to :attr:`samples`.
+
+        Parameters
+        ----------
+        samples : Sample or list of Sample or MoveChange
+            the samples to set; for a move change its results
+        copy : bool
+            if `True` (default) the samples are set in a copy and this
+            SampleSet remains unchanged. The copy shares the lists of
+            samples per ensemble and per replica with this SampleSet; only
+            the entries that are replaced are new.
+
+        Returns
+        -------
+        :class:`.SampleSet`
+            the updated SampleSet
         """
         if isinstance(samples, Sample):
             samples = [samples]
@@ -287,6 +329,12 @@ class SampleSet(StorableObject):
             assert self.samples.count(samp) == 1, \
                     "More than one instance of %r!" % samp
 
+        # and that the set of members has exactly these samples
+        assert len(self._members) == nsamps, \
+            "Members has %d samples, not %d" % (len(self._members), nsamps)
+        for samp in self.samples:
+            assert samp in self._members, "Sample not in members! %r" % samp
+
     def append_as_new_replica(self, sample):
         """
         Adds the given sample to this SampleSet, with a new replica ID.
@@ -387,7 +435,8 @@ class SampleSet(StorableObject):
             preconditions=None,
             strategies=None,
             reuse_strategy='avoid',
-            engine=None):
+            engine=None,
+            processes=1):
         """
         Create a SampleSet with as many initial samples as possible.
 
@@ -423,6 +472,9 @@ class SampleSet(StorableObject):
             tried
         engine : :class:`openpathsampling.engines.DyanmicsEngine`
             the engine used for extending moves
+        processes : int
+            the number of processes used to split the trajectories (see
+            :class:`.SplitPlanner`)
 
         Returns
         -------
@@ -537,7 +589,13 @@ class SampleSet(StorableObject):
         for pos, ens_list in enumerate(ensembles):
             found_samples_str += '.' if ens_list in ensembles_to_fill else '+'
 
+        # all splits are done at once, when they are first needed
+        planner = paths.SplitPlanner(processes=processes)
+
         for str_idx, (strategy, options) in enumerate(strategies):
+            if strategy == 'split':
+                planner.plan(ensembles_to_fill, trajectories)
+
             for idx, ens_list in reversed(list(enumerate(ensembles_to_fill))):
                 pos = ensembles.index(ens_list)
 
@@ -581,6 +639,7 @@ class SampleSet(StorableObject):
                             **opts
                         )
                     elif strategy == 'split':
+                        opts.setdefault('planner', planner)
                         sample = ens.split_sample_from_trajectories(
                             trajectories=trajectories,
                             used_trajectories=used_trajectories,
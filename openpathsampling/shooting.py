@@ -1,5 +1,6 @@
 import math
 import logging
+from collections import OrderedDict
 
 import numpy as np
 
@@ -10,6 +11,14 @@ init_log = logging.getLogger('openpathsampling.initialization')
 
 
 class ShootingPointSelector(StorableNamedObject):
+    # number of trajectories whose cumulative biases are kept, so that the
+    # picking and the acceptance of a move compute them only once
+    _n_cached = 4
+
+    def __init__(self):
+        super(ShootingPointSelector, self).__init__()
+        self._cumulative_cache = OrderedDict()
+
     def f(self, snapshot, trajectory):
         """
         Returns the unnormalized proposal probability of a snapshot
@@ -35,10 +44,38 @@ class ShootingPointSelector(StorableNamedObject):
 
     def _biases(self, trajectory):
         """
-        Returns a list of unnormalized proposal probabilities for all
-        snapshots in trajectory
+        Returns the unnormalized proposal probabilities for all snapshots in
+        trajectory
+
+        Selectors that can compute all probabilities at once (e.g. from the
+        values of a CV for the whole trajectory) should override this.
+        """
+        return np.array([self.f(s, trajectory) for s in trajectory],
+                        dtype=float)
+
+    def _cumulative_biases(self, trajectory):
         """
-        return [self.f(s, trajectory) for s in trajectory]
+        Returns the cumulative sum of the proposal probabilities
+
+        The sums of the last few trajectories are kept (trajectories are
+        identified by their UUID and length, i.e. they are assumed not to
+        be changed in place).
+        """
+        cache = self.__dict__.get('_cumulative_cache')
+        if cache is None:
+            # subclasses that do not call the base `__init__`
+            cache = self._cumulative_cache = OrderedDict()
+
+        key = (trajectory.__uuid__, len(trajectory))
+        try:
+            cumulative = cache.pop(key)
+        except KeyError:
+            cumulative = np.cumsum(self._biases(trajectory), dtype=float)
+            if len(cache) >= self._n_cached:
+                cache.popitem(last=False)
+
+        cache[key] = cumulative
+        return cumulative
 
     def sum_bias(self, trajectory):
         """
@@ -55,8 +92,31 @@ class ShootingPointSelector(StorableNamedObject):
         only for the non-symmetric proposal of different snapshots is given
         by `probability(old_trajectory) / probability(new_trajectory)`
         """
+        cumulative = self._cumulative_biases(trajectory)
+        return float(cumulative[-1]) if len(cumulative) else 0.0
 
-        return sum(self._biases(trajectory))
+    def max_accepted_length(self, trajectory, rand):
+        """
+        Longest trial (from `trajectory`) that passes the acceptance
+
+        This is used for early rejection (see :class:`.EngineMover`). It is
+        only possible if :meth:`probability_ratio` depends on nothing but
+        the lengths of the trajectories.
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory`
+            the trajectory the shooting point was picked from
+        rand : float
+            the random number of the Metropolis acceptance
+
+        Returns
+        -------
+        int or None
+            the maximal number of frames of an accepted trial; `None` if
+            there is no such bound
+        """
+        return None
 
     def pick(self, trajectory):
         """
@@ -64,21 +124,15 @@ class ShootingPointSelector(StorableNamedObject):
 
         Notes
         -----
-        The native implementation is very slow. Simple picking algorithm
+        This evaluates the proposal probabilities of all frames (once per
+        trajectory, see :meth:`sum_bias`). Simple picking algorithms
         should override this function.
         """
-
-        prob_list = self._biases(trajectory)
-        sum_bias = sum(prob_list)
-
-        rand = np.random.random() * sum_bias
-        idx = 0
-        prob = prob_list[0]
-        while prob <= rand and idx < len(prob_list):
-            idx += 1
-            prob += prob_list[idx]
-
-        return idx
+        cumulative = self._cumulative_biases(trajectory)
+        rand = np.random.random() * cumulative[-1]
+        # the first frame whose cumulative probability exceeds `rand`
+        idx = int(np.searchsorted(cumulative, rand, side='right'))
+        return min(idx, len(cumulative) - 1)
 
 
 class GaussianBiasSelector(ShootingPointSelector):
@@ -119,6 +173,11 @@ class GaussianBiasSelector(ShootingPointSelector):
         l_s = self.collectivevariable(snapshot)
         return math.exp(-self.alpha * (l_s - self.l_0) ** 2)
 
+    def _biases(self, trajectory):
+        # evaluate the CV for all frames at once
+        l_s = np.asarray(self.collectivevariable(trajectory), dtype=float)
+        return np.exp(-self.alpha * (l_s - self.l_0) ** 2)
+
 
 class UniformSelector(ShootingPointSelector):
     """
@@ -149,6 +208,14 @@ class UniformSelector(ShootingPointSelector):
                                 len(trajectory) - self.pad_end)
         return idx
 
+    def max_accepted_length(self, trajectory, rand):
+        # the acceptance is sum_bias(old) / sum_bias(new)
+        if rand <= 0.0:
+            return None
+
+        return int(math.floor(self.sum_bias(trajectory) / rand)) + \
+            self.pad_start + self.pad_end
+
 
 class InterfaceConstrainedSelector(ShootingPointSelector):
     """
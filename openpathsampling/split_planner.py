@@ -0,0 +1,203 @@
+"""
+Finding the subtrajectories of long trajectories for many ensembles
+
+Creating initial conditions from trajectories (see
+:meth:`.SampleSet.generate_from_trajectories`) splits every trajectory for
+every ensemble. A :class:`SplitPlanner` does all of these splits at once:
+
+1. ensembles that know their subtrajectories from per-frame volume labels
+   (see :meth:`.Ensemble.candidate_slices`, e.g. the TIS ensembles) only
+   propose candidates. The labels are evaluated once per frame and shared
+   by all ensembles using the same volumes.
+2. the candidates are tested exactly, and all other ensembles are split as
+   usual. These checks are independent and can run in several processes.
+
+>>> planner = SplitPlanner(processes=4)
+>>> planner.plan(ensembles, trajectories)
+>>> parts = planner.split(ensemble, trajectory)
+"""
+
+import logging
+import multiprocessing
+import os
+
+import openpathsampling as paths
+
+logger = logging.getLogger(__name__)
+
+# ensembles and trajectories of the current plan; the worker processes are
+# forked and inherit these, so only indices are sent to them
+_plan_data = None
+
+
+def _run_task(task):
+    ensembles, trajectories = _plan_data
+    ensemble = ensembles[task[1]]
+    trajectory = trajectories[task[2]]
+    if task[0] == 'check':
+        return bool(ensemble(trajectory[task[3]:task[4]]))
+    else:
+        return [(part.start, part.stop)
+                for part in ensemble.iter_valid_slices(trajectory)]
+
+
+def _fork_context():
+    if not hasattr(os, 'fork'):
+        return None
+    get_context = getattr(multiprocessing, 'get_context', None)
+    if get_context is None:
+        # Python 2 always forks
+        return multiprocessing
+    return get_context('fork')
+
+
+class SplitPlanner(object):
+    """
+    Splits trajectories for many ensembles at once and remembers the results
+
+    The results are the same as for :meth:`.Ensemble.split` with default
+    arguments.
+
+    Parameters
+    ----------
+    processes : int
+        the number of processes for the exact checks; `1` (default) runs
+        them in this process. Several processes need `fork` (not on
+        Windows), otherwise the checks run in this process. The ensembles
+        and trajectories are not sent to the processes, but the collective
+        variables are evaluated in each process again.
+    chunksize : int
+        the number of checks sent to a process at once
+
+    Attributes
+    ----------
+    n_checks : int
+        the number of exact checks of candidates so far
+    n_splits : int
+        the number of trajectories split without candidates so far
+    """
+
+    def __init__(self, processes=1, chunksize=64):
+        self.processes = processes
+        self.chunksize = chunksize
+        self.n_checks = 0
+        self.n_splits = 0
+        self._slices = {}
+
+    @staticmethod
+    def _key(ensemble, trajectory):
+        return ensemble.__uuid__, trajectory.__uuid__
+
+    def plan(self, ensembles, trajectories):
+        """
+        Find the subtrajectories of all trajectories in all ensembles
+
+        Parameters
+        ----------
+        ensembles : list of :class:`.Ensemble` or list of list
+            the ensembles; nested lists (as in
+            :meth:`.MoveScheme.list_initial_ensembles`) are flattened
+        trajectories : (list of) :class:`.Trajectory`
+            the trajectories to split
+        """
+        flat = []
+        for ens in ensembles:
+            for sub in (ens if isinstance(ens, list) else [ens]):
+                if sub not in flat:
+                    flat.append(sub)
+        ensembles = flat
+        trajectories = paths.Trajectory._to_list_of_trajectories(
+            trajectories)
+
+        tasks = []
+        candidates = {}
+        planned = set(self._slices)
+        for ens_idx, ens in enumerate(ensembles):
+            for traj_idx, traj in enumerate(trajectories):
+                key = self._key(ens, traj)
+                if key in planned:
+                    continue
+                planned.add(key)
+                parts = ens.candidate_slices(traj)
+                if parts is None:
+                    tasks.append(('split', ens_idx, traj_idx))
+                else:
+                    candidates[key] = parts
+                    tasks.extend(('check', ens_idx, traj_idx,
+                                  part.start, part.stop)
+                                 for part in parts)
+
+        results = self._run(ensembles, trajectories, tasks)
+
+        for key in candidates:
+            self._slices[key] = []
+        for task, result in zip(tasks, results):
+            key = self._key(ensembles[task[1]], trajectories[task[2]])
+            if task[0] == 'check':
+                self.n_checks += 1
+                if result:
+                    self._slices[key].append(slice(task[3], task[4]))
+            else:
+                self.n_splits += 1
+                self._slices[key] = [slice(start, stop)
+                                     for start, stop in result]
+
+        logger.info('planned %d ensembles for %d trajectories: %d exact '
+                    'checks, %d splits', len(ensembles), len(trajectories),
+                    sum(1 for task in tasks if task[0] == 'check'),
+                    sum(1 for task in tasks if task[0] == 'split'))
+
+    def _run(self, ensembles, trajectories, tasks):
+        global _plan_data
+        context = _fork_context()
+        _plan_data = (ensembles, trajectories)
+        try:
+            if self.processes > 1 and context is not None and \
+                    len(tasks) > 1:
+                pool = context.Pool(self.processes)
+                try:
+                    return pool.map(_run_task, tasks, self.chunksize)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                return [_run_task(task) for task in tasks]
+        finally:
+            _plan_data = None
+
+    def slices(self, ensemble, trajectory):
+        """
+        Return the slices of the subtrajectories in an ensemble
+
+        Parameters
+        ----------
+        ensemble : :class:`.Ensemble`
+        trajectory : :class:`.Trajectory`
+
+        Returns
+        -------
+        list of `slice`
+            as :meth:`.Ensemble.iter_valid_slices` with default arguments;
+            planned now if this was not done before
+        """
+        key = self._key(ensemble, trajectory)
+        if key not in self._slices:
+            self.plan([ensemble], [trajectory])
+        return list(self._slices[key])
+
+    def split(self, ensemble, trajectory):
+        """
+        Return the subtrajectories in an ensemble
+
+        Parameters
+        ----------
+        ensemble : :class:`.Ensemble`
+        trajectory : :class:`.Trajectory`
+
+        Returns
+        -------
+        list of :class:`.Trajectory`
+            as :meth:`.Ensemble.split` with default arguments
+        """
+        return [trajectory[part]
+                for part in self.slices(ensemble, trajectory)]
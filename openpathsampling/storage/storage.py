@@ -14,6 +14,7 @@ from openpathsampling.netcdfplus import NetCDFPlus, WeakLRUCache, ObjectStore, \
 from .stores import SnapshotWrapperStore
 
 import openpathsampling.engines as peng
+from openpathsampling.engines.features.shared import ContainerStore
 
 logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
@@ -159,6 +160,31 @@ class Storage(NetCDFPlus):
         self.cvs.sync_all()
         self.sync()
 
+    def deduplication_report(self):
+        """
+        Summarize the savings of the deduplicating container stores
+
+        See :attr:`.SnapshotWrapperStore.deduplicate_containers`.
+
+        Returns
+        -------
+        dict
+            for each store that deduplicates its content the number of
+            stored rows (`n_stored`), of containers stored as an alias
+            (`n_aliases`) and the approximate number of bytes saved
+            (`bytes_saved`); `total` sums these over all stores
+        """
+        report = {}
+        for name, store in self._stores.items():
+            if isinstance(store, ContainerStore) and store.deduplicate:
+                report[name] = store.deduplication_summary()
+
+        report['total'] = {
+            key: sum(summary[key] for summary in report.values())
+            for key in ['n_stored', 'n_aliases', 'bytes_saved']
+        }
+        return report
+
     def set_caching_mode(self, mode='default'):
         r"""
         Set default values for all caches
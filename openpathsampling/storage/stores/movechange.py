@@ -29,18 +29,20 @@ class MoveChangeStore(ObjectStore):
         cls_name = self.vars['cls'][idx]
 
         cls = self.class_list[cls_name]
-        obj = cls.__new__(cls)
-        MoveChange.__init__(obj, mover=self.vars['mover'][idx])
-
-        obj.samples = self.vars['samples'][idx]
-        obj.subchanges = self.vars['subchanges'][idx]
-        obj.details = self.vars['details'][idx]
         try:
-            obj.input_samples = self.vars['input_samples'][idx]
+            input_samples = self.vars['input_samples'][idx]
         except KeyError:  # BACKWARDS COMPATIBILITY; REMOVE IN 2.0
-            obj.input_samples = None
-
-        return obj
+            input_samples = None
+
+        # all MoveChanges are restored from the fields of MoveChange
+        from_values = cls.row_serializers()[1]
+        return from_values(
+            mover=self.vars['mover'][idx],
+            subchanges=self.vars['subchanges'][idx],
+            samples=self.vars['samples'][idx],
+            input_samples=input_samples,
+            details=self.vars['details'][idx]
+        )
 
     def initialize(self, units=None):
         super(MoveChangeStore, self).initialize()
@@ -120,30 +122,31 @@ class MoveChangeStore(ObjectStore):
     def _load_partial_samples(self, cls_name, samples_idxs,
                               input_samples_idxs, mover_idx, details_idx):
         cls = self.class_list[cls_name]
-        obj = cls.__new__(cls)
-        MoveChange.__init__(obj)
 
+        mover = None
         if mover_idx[0] != '-':
-            obj.mover = self.storage.pathmovers.load(int(UUID(mover_idx)))
+            mover = self.storage.pathmovers.load(int(UUID(mover_idx)))
 
+        samples = []
         if len(samples_idxs) > 0:
             samples_idxs = self.storage.to_uuid_chunks(samples_idxs)
-            obj.samples = [
+            samples = [
                 self.storage.samples.load(int(UUID(idx)))
                 for idx in samples_idxs]
-        else:
-            obj.samples = []
 
+        input_samples = []
         if len(input_samples_idxs) > 0:
             input_samples_idxs = \
                 self.storage.to_uuid_chunks(input_samples_idxs)
-            obj.input_samples = [
+            input_samples = [
                 self.storage.samples.load(int(UUID(idx))) if idx[0] != '-' else
                 None for idx in input_samples_idxs]
-        else:
-            obj.input_samples = []
 
+        details = None
         if details_idx[0] != '-':
-            obj.details = self.storage.details.proxy(int(UUID(details_idx)))
+            details = self.storage.details.proxy(int(UUID(details_idx)))
 
-        return obj
+        # the subchanges are added by `_load_partial_subchanges`
+        from_values = cls.row_serializers()[1]
+        return from_values(mover=mover, subchanges=[], samples=samples,
+                           input_samples=input_samples, details=details)
@@ -4,6 +4,7 @@ from uuid import UUID
 
 import openpathsampling.engines as peng
 from openpathsampling.netcdfplus import IndexedObjectStore
+from openpathsampling.netcdfplus.util import contiguous_ranges
 
 logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
@@ -121,6 +122,60 @@ class BaseSnapshotStore(IndexedObjectStore):
         self._get(st_idx, obj)
         return obj
 
+    def load_many(self, indices):
+        """
+        Load snapshots, reading all stored rows in contiguous blocks
+
+        Parameters
+        ----------
+        indices : iterable of int
+            the snapshot indices as used in `load`
+
+        Returns
+        -------
+        list of :obj:`openpathsampling.engines.BaseSnapshot`
+            the loaded snapshot instances in the order of `indices`
+        """
+        indices = list(indices)
+        rows = []
+        for idx in indices:
+            pos = idx // 2
+            if pos in self.index:
+                rows.append(self.index[pos])
+            else:
+                raise KeyError(idx)
+
+        loaded = {}
+        for start, stop in contiguous_ranges(
+                sorted(set(row for row in rows if row >= 0))):
+            loaded.update(zip(range(start, stop),
+                              self._load_range(start, stop)))
+
+        objs = []
+        for idx, row in zip(indices, rows):
+            obj = loaded.get(row)
+            if obj is not None and idx & 1:
+                obj = obj.reversed
+            objs.append(obj)
+
+        return objs
+
+    def _load_range(self, start, stop):
+        objs = []
+        for _ in range(start, stop):
+            obj = self._cls.__new__(self._cls)
+            self._cls.init_empty(obj)
+            objs.append(obj)
+
+        self._get_range(start, stop, objs)
+        return objs
+
+    def _get_range(self, start, stop, snapshots):
+        # fill snapshots for rows `start` to `stop - 1`; subclasses can
+        # read each variable in one go
+        for idx, snapshot in zip(range(start, stop), snapshots):
+            self._get(idx, snapshot)
+
     def save(self, obj, idx=None):
         pos = idx // 2
 
@@ -154,6 +209,44 @@ class BaseSnapshotStore(IndexedObjectStore):
 
         return idx
 
+    def save_many(self, snapshots, idxs):
+        """
+        Save snapshots into consecutive rows
+
+        Parameters
+        ----------
+        snapshots : list of :obj:`openpathsampling.engines.BaseSnapshot`
+            the snapshots to be saved, none of them saved yet
+        idxs : list of int
+            the snapshot index of each snapshot as used in `save`
+        """
+        start = len(self.index)
+        stop = start + len(snapshots)
+        positions = [idx // 2 for idx in idxs]
+
+        for pos in positions:
+            self.index.append(pos)
+
+        try:
+            self._set_range(start, snapshots)
+            self.vars['index'][start:stop] = positions
+
+        except:
+            logger.debug('Problem saving rows %d to %d !' % (start, stop))
+            for pos in positions:
+                del self.index[pos]
+            raise
+
+        for n_idx, obj in zip(range(start, stop), snapshots):
+            self.cache[n_idx] = obj
+            self._set_id(n_idx, obj)
+
+    def _set_range(self, start, snapshots):
+        # write snapshots into rows starting at `start`; subclasses can write
+        # each variable in one go
+        for idx, snapshot in enumerate(snapshots, start):
+            self._set(idx, snapshot)
+
     def _save(self, snapshot, idx):
         """
         Add the current state of the snapshot in the database.
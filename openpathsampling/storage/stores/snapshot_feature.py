@@ -1,5 +1,8 @@
 import logging
 
+import numpy as np
+
+from openpathsampling.engines.trajectory import stack_arrays
 from .snapshot_base import BaseSnapshotStore
 
 logger = logging.getLogger(__name__)
@@ -25,10 +28,30 @@ class FeatureSnapshotStore(BaseSnapshotStore):
     def _set(self, idx, snapshot):
         [self.write(attr, idx, snapshot) for attr in self.storables]
 
+    def _set_range(self, start, snapshots):
+        numpy_features = self.snapshot_class.__features__.numpy
+        stop = start + len(snapshots)
+        for attr in self.storables:
+            values = [getattr(snapshot, attr) for snapshot in snapshots]
+            if attr in numpy_features and \
+                    (self.vars[attr].var_type.startswith('numpy.') or
+                     self.vars[attr].var_type == 'quantized') and \
+                    all(type(value) is np.ndarray for value in values):
+                self.vars[attr][start:stop] = stack_arrays(values)
+            else:
+                for idx, snapshot in enumerate(snapshots, start):
+                    self.write(attr, idx, snapshot)
+
     def _get(self, idx, snapshot):
         [setattr(snapshot, attr, self.vars[attr][idx])
          for attr in self.storables]
 
+    def _get_range(self, start, stop, snapshots):
+        for attr in self.storables:
+            values = self._load_rows(attr, start, stop)
+            for snapshot, value in zip(snapshots, values):
+                setattr(snapshot, attr, value)
+
     def initialize(self):
         super(FeatureSnapshotStore, self).initialize()
 
@@ -4,6 +4,7 @@ from uuid import UUID
 import openpathsampling.engines as peng
 from openpathsampling.netcdfplus import ObjectStore, \
     NetCDFPlus, LoaderProxy
+from openpathsampling.netcdfplus.util import contiguous_ranges
 
 from .snapshot_feature import FeatureSnapshotStore
 from .snapshot_value import SnapshotValueStore
@@ -102,6 +103,23 @@ class SnapshotWrapperStore(ObjectStore):
         # so CVs will be storable
         self.only_mention = False
 
+        # if set to true the statics and kinetics stores of new snapshot
+        # types store equal content only once (see `ContainerStore`)
+        self.deduplicate_containers = False
+
+        # precision of the coordinates and velocities (feature name to
+        # precision in nm and nm/ps) of new snapshot types. These are stored
+        # lossy as `quantized` variables, see `NetCDFPlus.create_variable`
+        self.quantization = {}
+
+        # rows from one key row of the quantized variables to the next; the
+        # rows in between store the difference to the row before
+        self.quantization_key_interval = 32
+
+        # positions known to hold fully stored snapshots; avoids reading
+        # the `store` variable each time a stored snapshot is referenced
+        self._stored_positions = set()
+
     @property
     def treat_missing_snapshot_type(self):
         return self._treat_missing_snapshot_type
@@ -224,6 +242,38 @@ class SnapshotWrapperStore(ObjectStore):
             snap = store[int(idx)]
             return snap
 
+    def _load_position(self, idx):
+        if isinstance(idx, (int, long)):
+            if idx < 10000000000:
+                return idx
+            else:
+                return self.index.get(idx)
+
+        return None
+
+    def _prefetch_positions(self, positions):
+        # a snapshot and its reversed are stored once at `idx // 2` and the
+        # forward one is cached, so read the snapshots from the stores of
+        # their types in blocks of consecutive stored positions
+        cache = self.cache
+        stored = sorted(set(
+            idx // 2 for idx in positions if (idx ^ 1) not in cache))
+
+        for start, stop in contiguous_ranges(stored):
+            store_idxs = self.variables['store'][start:stop]
+            by_store = {}
+            for pos, store_idx in zip(range(start, stop), store_idxs):
+                store_idx = int(store_idx)
+                if store_idx >= 0:
+                    by_store.setdefault(store_idx, []).append(pos)
+
+            for store_idx, poss in by_store.items():
+                store = self.store_snapshot_list[store_idx]
+                snaps = store.load_many([2 * pos for pos in poss])
+                for pos, snap in zip(poss, snaps):
+                    self._get_id(2 * pos, snap)
+                    cache[2 * pos] = snap
+
     def __len__(self):
         return len(self.storage.dimensions[self.prefix]) * 2
 
@@ -325,9 +375,13 @@ class SnapshotWrapperStore(ObjectStore):
 
         if n_idx is not None:
             # snapshot is mentioned
-            store_idx = int(self.variables['store'][n_idx // 2])
+            pos = n_idx // 2
+            if pos in self._stored_positions:
+                return self.reference(obj)
+            store_idx = int(self.variables['store'][pos])
             if not store_idx == -1:
                 # and stored
+                self._stored_positions.add(pos)
                 return self.reference(obj)
 
         if self.only_mention:
@@ -379,6 +433,77 @@ class SnapshotWrapperStore(ObjectStore):
 
         return self.reference(obj)
 
+    def save_many(self, snapshots):
+        """
+        Save several snapshots, writing new snapshots of a type at once
+
+        New snapshots are written into consecutive rows, so the `store`
+        variable and the variables of the snapshot stores are written for
+        all of them together instead of once per snapshot. Snapshots that
+        are not new or that need special treatment (proxies, unknown
+        snapshot types, mentioned snapshots) are saved one by one.
+
+        Parameters
+        ----------
+        snapshots : iterable of :obj:`openpathsampling.engines.BaseSnapshot`
+            the snapshots to be saved
+        """
+        if self.only_mention:
+            for snapshot in snapshots:
+                self.save(snapshot)
+            return
+
+        run = []
+        run_descriptor = None
+        new_uuids = set()
+        for snapshot in snapshots:
+            if isinstance(snapshot, LoaderProxy):
+                if snapshot._store is not self:
+                    self.save(snapshot)
+                continue
+
+            uuid = snapshot.__uuid__
+            if uuid & ~1 in new_uuids:
+                # the snapshot or its reversed copy is already in the run
+                continue
+
+            descriptor = snapshot.engine.descriptor
+            if uuid in self.index or descriptor not in self.type_list:
+                # stored or mentioned before, or of a new type
+                self.save(snapshot)
+                continue
+
+            if descriptor != run_descriptor:
+                self._save_run(run)
+                run = []
+                run_descriptor = descriptor
+
+            run.append(snapshot)
+            new_uuids.add(uuid & ~1)
+
+        self._save_run(run)
+
+    def _save_run(self, snapshots):
+        # save new snapshots of the same type into consecutive positions
+        if not snapshots:
+            return
+
+        store, store_idx = self.type_list[snapshots[0].engine.descriptor]
+        start = len(self.index) // 2
+        stop = start + len(snapshots)
+        self.vars['store'][start:stop] = [store_idx] * len(snapshots)
+        for snapshot in snapshots:
+            self.index.append(snapshot.__uuid__)
+
+        n_idxs = list(range(2 * start, 2 * stop, 2))
+        store.save_many(snapshots, n_idxs)
+
+        for snapshot, n_idx in zip(snapshots, n_idxs):
+            self._auto_complete_single_snapshot(snapshot, n_idx)
+            self._set_id(n_idx, snapshot)
+            self.cache[n_idx] = snapshot
+            self._stored_positions.add(n_idx // 2)
+
     def _save(self, obj, n_idx):
         try:
             store, store_idx = self.type_list[obj.engine.descriptor]
@@ -539,6 +664,10 @@ class SnapshotWrapperStore(ObjectStore):
         # for complete this does not make sense
         if cv_store.allow_incomplete:
 
+            # objects whose values are in the store and can be evicted from
+            # the fast CV cache
+            synced = []
+
             # loop all objects in the fast CV cache
             for obj, value in cv._cache_dict.cache.items():
                 if value is not None:
@@ -548,6 +677,8 @@ class SnapshotWrapperStore(ObjectStore):
                     if pos is None:
                         continue
 
+                    synced.append(obj)
+
                     if cv_store.time_reversible:
                         pos //= 2
 
@@ -562,6 +693,8 @@ class SnapshotWrapperStore(ObjectStore):
                     cv_store.index[pos] = n_idx
                     cv_store.cache[n_idx] = value
 
+            cv._cache_dict.cache.synced(cv_store, synced)
+
     @staticmethod
     def _get_cv_name(cv_idx):
         return 'cv' + str(cv_idx)
@@ -10,8 +10,10 @@ class TrajectoryStore(ObjectStore):
         return {}
 
     def _save(self, trajectory, idx):
-        self.vars['snapshots'][idx] = trajectory
         store = self.storage.snapshots
+        # write new snapshots together before referencing them
+        store.save_many(trajectory.iter_proxies())
+        self.vars['snapshots'][idx] = trajectory
 
         for frame, snapshot in enumerate(trajectory.iter_proxies()):
             if type(snapshot) is not LoaderProxy:
@@ -41,6 +43,10 @@ class TrajectoryStore(ObjectStore):
         trajectory = Trajectory(self.vars['snapshots'][idx])
         return trajectory
 
+    def _load_range(self, start, stop):
+        return [Trajectory(snaps)
+                for snaps in self.vars['snapshots'][start:stop]]
+
     def cache_all(self):
         """Load all samples as fast as possible into the cache
 
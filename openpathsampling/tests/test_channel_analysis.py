@@ -159,6 +159,19 @@ class TestChannelAnalysis(object):
         assert_equal(results._results,
                      {'incr': [(0,1)], 'decr': [(2,3)], None: [(1,2)]})
 
+    def test_analyze_cached_by_trajectory(self):
+        actives = [self.incr_1, self.decr_1, self.incr_1, self.none_1,
+                   self.decr_1, self.incr_1]
+        steps = [paths.MCStep(mccycle=i, active=active)
+                 for (i, active) in enumerate(actives)]
+        results = paths.ChannelAnalysis(steps, self.channels)
+        assert_equal(results._results,
+                     {'incr': [(0, 1), (2, 3), (5, 6)],
+                      'decr': [(1, 2), (4, 5)],
+                      None: [(3, 4)]})
+        # each trajectory is only tested once
+        assert_equal(len(results._channel_cache), 3)
+
     def test_expand_results(self):
         expanded = paths.ChannelAnalysis._expand_results(self.toy_results)
         assert_equal(expanded, self.toy_expanded_results)
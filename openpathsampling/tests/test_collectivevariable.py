@@ -372,3 +372,120 @@ class TestFunctionCV(object):
 
             if os.path.isfile(fname):
                 os.remove(fname)
+
+
+class TestSharedValueCache(object):
+    def setup(self):
+        self.traj = make_1d_traj([0.0, 1.0, 2.0, 3.0])
+        self.shared = paths.netcdfplus.SharedValueCache(max_bytes=None)
+        self.entry = np.zeros(8).nbytes + self.shared.entry_overhead
+
+    def _make_cv(self, name):
+        cv = paths.FunctionCV(name, lambda s: s.coordinates[0][0] * np.ones(8))
+        cv._cache_dict.cache = self.shared.view(cv)
+        return cv
+
+    def test_values_by_uuid(self):
+        cv = self._make_cv("x")
+        _ = cv(self.traj)
+        assert self.shared.misses == 4
+        assert len(cv._cache_dict.cache) == 4
+        # a proxy-like object with the same UUID hits the cache
+        proxy = paths.netcdfplus.LoaderProxy(None, self.traj[1].__uuid__)
+        assert cv._cache_dict.cache[proxy][0] == 1.0
+        assert self.shared.hits == 1
+        assert set(cv._cache_dict.cache) == set(self.traj)
+
+    def test_eviction(self):
+        self.shared.max_bytes = 3 * self.entry
+        cv = self._make_cv("x")
+        _ = cv(self.traj)
+        assert self.shared.evictions == 1
+        assert self.shared.nbytes == 3 * self.entry
+        assert self.traj[0] not in cv._cache_dict.cache
+        assert self.traj[3] in cv._cache_dict.cache
+
+    def test_pin(self):
+        self.shared.max_bytes = 2 * self.entry
+        cv_a = self._make_cv("a")
+        cv_b = self._make_cv("b")
+        cv_a._cache_dict.cache.pin()
+        _ = cv_a(self.traj)
+        _ = cv_b(self.traj)
+        assert len(cv_a._cache_dict.cache) == 4
+        assert len(cv_b._cache_dict.cache) == 2
+        assert self.shared.pinned_nbytes == 4 * self.entry
+        cv_a._cache_dict.cache.unpin()
+        assert self.shared.nbytes == 2 * self.entry
+        assert len(self.shared) == 2
+
+    def test_release_owner(self):
+        cv = self._make_cv("x")
+        _ = cv(self.traj)
+        assert len(self.shared) == 4
+        del cv
+        import gc
+        gc.collect()
+        assert len(self.shared) == 0
+
+    def test_pin_cache(self):
+        cv = paths.FunctionCV("x", lambda s: s.coordinates[0][0])
+        assert cv.pin_cache() is cv
+        assert cv._cache_dict.cache.pinned
+        assert cv.unpin_cache() is cv
+        assert not cv._cache_dict.cache.pinned
+
+    def test_hold_until_synced(self):
+        class Holder(object):
+            pass
+
+        self.shared.max_bytes = 0
+        holder = Holder()
+        cv = self._make_cv("x")
+        cache = cv._cache_dict.cache
+        cache.hold(holder)
+        _ = cv(self.traj)
+        assert len(cache) == 4
+        assert self.shared.evictions == 0
+        cache.synced(holder, self.traj[:2])
+        assert len(cache) == 2
+        assert self.traj[3] in cache
+        # values of collected objects cannot be saved anymore
+        traj = make_1d_traj([5.0])
+        _ = cv(traj)
+        assert len(cache) == 3
+        del traj
+        import gc
+        gc.collect()
+        assert len(cache) == 2
+        # neither if the holder is gone
+        del holder
+        gc.collect()
+        assert len(cache) == 0
+
+    def test_storage_sync_evicted(self):
+        import gc
+        import tempfile
+        tmp = tempfile.mkdtemp()
+        fname = os.path.join(tmp, "cv_sync.nc")
+        shared = paths.CollectiveVariable.shared_cache
+        max_bytes = shared.max_bytes
+        storage = paths.Storage(fname, "w")
+        try:
+            storage.save(self.traj)
+            cv = paths.FunctionCV("x", lambda s: s.xyz[0][0]) \
+                .with_diskcache(allow_incomplete=True)
+            storage.save(cv)
+            shared.max_bytes = 0
+            _ = cv(self.traj)
+            storage.snapshots.sync_cv(cv)
+            store = storage.cvs.cache_store(cv)
+            assert len(store.vars['value']) == 4
+            assert len(cv._cache_dict.cache) == 0
+            assert sorted(store.vars['value'][:]) == [0.0, 1.0, 2.0, 3.0]
+        finally:
+            shared.max_bytes = max_bytes
+            storage.close()
+            gc.collect()
+            os.remove(fname)
+            os.rmdir(tmp)
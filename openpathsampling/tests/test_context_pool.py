@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+from builtins import object
+import gc
+
+from nose.tools import assert_equal
+
+from openpathsampling.engines.openmm.context_pool import ContextPool
+
+
+class MockContext(object):
+    def __init__(self):
+        self.state = None
+
+
+class MockSimulation(object):
+    def __init__(self):
+        self.context = MockContext()
+
+
+class MockTopology(object):
+    def __init__(self, atoms):
+        self.atoms = atoms
+
+    def to_dict(self):
+        return {'atoms': self.atoms}
+
+
+class MockEngine(object):
+    # keeps its state as the current snapshot of an OpenMMEngine does
+    def __init__(self, system='system', atoms=('C', 'O')):
+        self.system = system
+        self.integrator = 'integrator'
+        self.topology = MockTopology(list(atoms))
+        self.openmm_properties = {}
+        self.pooled = None
+        self.state = None
+
+    @property
+    def context(self):
+        self.pooled.activate(self)
+        return self.pooled.simulation.context
+
+    def run(self, state):
+        self.context.state = state
+        self.state = state
+
+    def save_context_state(self):
+        self.state = self.pooled.simulation.context.state
+
+    def restore_context_state(self):
+        if self.state is not None:
+            self.pooled.simulation.context.state = self.state
+
+
+class MockContextPool(ContextPool):
+    @staticmethod
+    def _xml(obj):
+        return str(obj)
+
+    @staticmethod
+    def _create(engine, platform):
+        return MockSimulation()
+
+
+class TestContextPool(object):
+    def setup(self):
+        self.pool = MockContextPool()
+
+    def _acquire(self, engine):
+        engine.pooled = self.pool.acquire(engine)
+        return engine.pooled
+
+    def test_shared(self):
+        engine_a = MockEngine()
+        engine_b = MockEngine()
+        pooled = self._acquire(engine_a)
+        assert self._acquire(engine_b) is pooled
+        assert_equal(len(self.pool), 1)
+        assert_equal(pooled.n_engines, 2)
+
+    def test_key(self):
+        engines = [MockEngine(), MockEngine(system='other'),
+                   MockEngine(atoms=('C', 'N'))]
+        # the last one has the same system, but different atoms
+        pooled = [self._acquire(engine) for engine in engines]
+        assert_equal(len(set(pooled)), 3)
+        assert_equal(len(self.pool), 3)
+
+    def test_state_per_engine(self):
+        engine_a = MockEngine()
+        engine_b = MockEngine()
+        context = self._acquire(engine_a).simulation.context
+        self._acquire(engine_b)
+
+        engine_a.run('a1')
+        engine_b.run('b1')
+        assert_equal(context.state, 'b1')
+        # using the context again restores the state of engine A
+        assert_equal(engine_a.context.state, 'a1')
+        engine_a.run('a2')
+        assert_equal(engine_b.context.state, 'b1')
+        assert_equal(engine_a.state, 'a2')
+
+    def test_unload_frees(self):
+        engine_a = MockEngine()
+        engine_b = MockEngine()
+        pooled = self._acquire(engine_a)
+        self._acquire(engine_b)
+
+        self.pool.release(pooled, engine_a, free=True)
+        # still used by engine B
+        assert hasattr(pooled.simulation, 'context')
+        self.pool.release(pooled, engine_b, free=True)
+        assert not hasattr(pooled.simulation, 'context')
+        assert_equal(len(self.pool), 0)
+
+    def test_idle_reuse(self):
+        engine = MockEngine()
+        pooled = self._acquire(engine)
+        self.pool.release(pooled, engine)
+        assert_equal(len(self.pool), 1)
+        engine = MockEngine()
+        assert self._acquire(engine) is pooled
+
+        # only the `max_idle` most recently released ones are kept
+        other = MockEngine(system='other')
+        other_pooled = self._acquire(other)
+        self.pool.release(pooled, engine)
+        self.pool.release(other_pooled, other)
+        assert_equal(len(self.pool), 1)
+        assert not hasattr(pooled.simulation, 'context')
+        self.pool.clear()
+        assert not hasattr(other_pooled.simulation, 'context')
+        assert_equal(len(self.pool), 0)
+
+    def test_garbage_collected(self):
+        engine = MockEngine()
+        pooled = self._acquire(engine)
+        del engine
+        gc.collect()
+        assert_equal(pooled.n_engines, 0)
+        assert pooled.owner is None
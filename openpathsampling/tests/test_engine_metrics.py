@@ -0,0 +1,185 @@
+from __future__ import absolute_import
+from builtins import object
+import os
+import tempfile
+
+import numpy as np
+from nose.tools import assert_equal, raises
+
+import openpathsampling as paths
+from openpathsampling.engines import (
+    EngineHook, EngineMetrics, MemorySink, CSVSink, PrometheusTextSink
+)
+from .test_helpers import make_1d_traj
+
+
+class SteppingEngine(paths.engines.DynamicsEngine):
+    # moves by 0.1 per frame; the frames in `nan_frames` are nan once
+    _default_options = {}
+
+    def __init__(self, options=None, nan_frames=()):
+        options = dict(options or {}, n_frames_max=100)
+        super(SteppingEngine, self).__init__(options=options)
+        self.nan_frames = set(nan_frames)
+        self.n_calls = 0
+        self.x = 0.0
+
+    @property
+    def current_snapshot(self):
+        return paths.engines.toy.Snapshot(
+            coordinates=np.array([[self.x]]),
+            velocities=np.array([[1.0]]),
+            engine=self
+        )
+
+    @current_snapshot.setter
+    def current_snapshot(self, snapshot):
+        self.x = snapshot.coordinates[0][0]
+
+    def generate_next_frame(self):
+        self.n_calls += 1
+        if self.n_calls in self.nan_frames:
+            self.x = float('nan')
+        else:
+            self.x += 0.1
+        with self._timed('snapshot'):
+            return self.current_snapshot
+
+    @staticmethod
+    def is_valid_snapshot(snapshot):
+        return not np.isnan(snapshot.coordinates[0][0])
+
+
+class RecordingHook(EngineHook):
+    def __init__(self):
+        self.calls = []
+
+    def before_trajectory(self, engine, initial):
+        self.calls.append(('before', len(initial)))
+
+    def after_frame(self, engine, trajectory, snapshot):
+        self.calls.append(('frame', len(trajectory)))
+
+    def on_retry(self, engine, trajectory, cause):
+        self.calls.append(('retry', cause))
+
+    def after_trajectory(self, engine, trajectory, error=None):
+        self.calls.append(('after', len(trajectory)))
+
+
+class TestEngineMetrics(object):
+    def setup(self):
+        self.engine = SteppingEngine()
+        self.engine.name = 'stepping'
+        self.initial = make_1d_traj([0.0])[0]
+        self.sink = MemorySink()
+        self.engine.metrics = EngineMetrics(sinks=[self.sink])
+
+    @staticmethod
+    def _below(x_max):
+        return lambda traj, trusted: traj[-1].xyz[0][0] < x_max
+
+    def test_counters(self):
+        traj = self.engine.generate(self.initial, self._below(0.45))
+        assert_equal(len(traj), 6)
+        metrics = self.engine.metrics
+        assert_equal(metrics.frames, 5)
+        assert_equal(metrics.trajectories, 1)
+        assert set(metrics.seconds) == set(['integrate', 'snapshot',
+                                            'nan_check', 'stop_check'])
+        assert all(value >= 0.0 for value in metrics.seconds.values())
+        assert metrics.frames_per_second >= 0.0
+        assert_equal(metrics.retries, {'nan': 0, 'error': 0,
+                                       'max_length': 0})
+
+        assert_equal(len(self.sink.records), 1)
+        record = self.sink.records[0]
+        assert_equal(record['engine'], 'stepping')
+        assert_equal(record['frames'], 5)
+
+        metrics.reset()
+        assert_equal(metrics.frames, 0)
+        assert_equal(metrics.seconds['integrate'], 0.0)
+
+    def test_nan_retry(self):
+        engine = SteppingEngine(options={'on_nan': 'retry'},
+                                nan_frames=[2])
+        engine.metrics = EngineMetrics(publish_frequency=0)
+        traj = engine.generate(self.initial, self._below(0.25))
+        assert_equal(len(traj), 4)
+        assert_equal(engine.metrics.retries['nan'], 1)
+        assert_equal(engine.metrics.failures['nan'], 0)
+
+    @raises(paths.engines.EngineNaNError)
+    def test_nan_failure(self):
+        engine = SteppingEngine(nan_frames=[1])
+        metrics = EngineMetrics(publish_frequency=0)
+        engine.metrics = metrics
+        try:
+            engine.generate(self.initial, self._below(0.25))
+        finally:
+            assert_equal(metrics.failures['nan'], 1)
+            assert_equal(metrics.trajectories, 1)
+
+    def test_hooks(self):
+        hook = RecordingHook()
+        self.engine.add_hook(hook)
+        self.engine.generate(self.initial, self._below(0.25))
+        assert_equal(hook.calls, [('before', 1), ('frame', 2),
+                                  ('frame', 3), ('frame', 4),
+                                  ('after', 4)])
+        self.engine.remove_hook(hook)
+        assert_equal(list(self.engine.hooks), [])
+        # hooks are per engine
+        assert_equal(list(SteppingEngine().hooks), [])
+
+    def test_csv_sink(self):
+        tmp = tempfile.mkdtemp()
+        filename = os.path.join(tmp, 'metrics.csv')
+        self.engine.metrics.sinks = [CSVSink(filename)]
+        self.engine.generate(self.initial, self._below(0.25))
+        self.engine.generate(self.initial, self._below(0.15))
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert_equal(len(lines), 3)
+        header = lines[0].split(',')
+        assert_equal(header[:2], ['time', 'engine'])
+        frames = header.index('frames')
+        assert_equal([line.split(',')[frames] for line in lines[1:]],
+                     ['3', '5'])
+        os.remove(filename)
+        os.rmdir(tmp)
+
+    def test_prometheus_sink(self):
+        tmp = tempfile.mkdtemp()
+        filename = os.path.join(tmp, 'engine.prom')
+        self.engine.metrics.sinks = [PrometheusTextSink(filename)]
+        self.engine.generate(self.initial, self._below(0.25))
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert '# TYPE ops_engine_frames_total counter' in lines
+        assert 'ops_engine_frames_total{engine="stepping"} 3' in lines
+        assert 'ops_engine_retries_total{engine="stepping",cause="nan"} 0' \
+            in lines
+        assert any(line.startswith(
+            'ops_engine_seconds_total{engine="stepping",phase="integrate"} ')
+            for line in lines)
+        assert not os.path.exists(filename + '.tmp')
+        os.remove(filename)
+        os.rmdir(tmp)
+
+    def test_nested_timing(self):
+        import openpathsampling.engines.metrics as metrics_module
+        timer = metrics_module.timer
+        clock = iter(range(1, 100))
+        metrics_module.timer = lambda: float(next(clock))
+        try:
+            metrics = EngineMetrics()
+            with metrics.timing('integrate'):
+                with metrics.timing('snapshot'):
+                    pass
+        finally:
+            metrics_module.timer = timer
+        # the snapshot time is not counted for the integration
+        assert_equal(metrics.seconds, {'integrate': 2.0, 'snapshot': 1.0,
+                                       'nan_check': 0.0, 'stop_check': 0.0})
@@ -919,6 +919,65 @@ class TestSequentialEnsemble(EnsembleTest):
             self._single_test(ensemble.can_append, ttraj[test], 
                               append_results[test], failmsg)
 
+    def _check_candidate_tracker(self, ensemble, direction):
+        tests = ['upper_in_out_in', 'upper_in_out_out_in', 'upper_in_in',
+                 'upper_in_in_out_in', 'upper_in_out_in_in',
+                 'upper_in_out_in_out_in', 'upper_in_out_out_out',
+                 'upper_out_in', 'upper_in', 'upper_in_hit_out',
+                 'upper_in_cross_in']
+        for test in tests:
+            traj = ttraj[test]
+            for n_fixed in range(len(traj)):
+                # as for a candidate, fixed frames in the interior of the
+                # trial are outside of the state
+                if direction > 0:
+                    fixed = traj[:n_fixed]
+                    generated = traj[n_fixed:]
+                    interior = fixed[1:]
+                else:
+                    fixed = traj[len(traj) - n_fixed:]
+                    generated = traj[:len(traj) - n_fixed].reversed
+                    interior = fixed[:-1]
+                if any(vol1(snap) for snap in interior):
+                    continue
+                tracker = ensemble.candidate_tracker(fixed, direction)
+                for n in range(1, len(generated) + 1):
+                    assert_equal(tracker(generated[:n]), True)
+                certificate = tracker.certificate(traj, generated)
+                assert_equal(certificate.valid, ensemble(traj),
+                             "Failure in %s with %d fixed" % (test, n_fixed))
+                assert certificate.applies_to(ensemble, traj)
+
+    def test_tps_candidate_tracker(self):
+        assert_equal(self.tis.candidate_tracker(paths.Trajectory([])), None)
+        for direction in [+1, -1]:
+            self._check_candidate_tracker(self.pseudo_tis, direction)
+
+    def test_tps_candidate_tracker_union(self):
+        other = SequentialEnsemble([
+            AllInXEnsemble(vol3) & self.length1,
+            AllOutXEnsemble(vol1 | vol3),
+            self.inX & self.length1
+        ])
+        union = self.pseudo_tis | other
+        for direction in [+1, -1]:
+            self._check_candidate_tracker(union, direction)
+        assert_equal((union | self.tis).candidate_tracker(
+            paths.Trajectory([])), None)
+
+    def test_tps_candidate_tracker_restart(self):
+        traj = ttraj['upper_in_in_out_in']
+        other = ttraj['upper_in_out_in']
+        tracker = self.pseudo_tis.candidate_tracker(traj[:0])
+        for n in range(1, len(traj) + 1):
+            tracker(traj[:n])
+        assert_equal(tracker.certificate(traj, traj).valid, False)
+        # the engine started over (e.g., after a NaN)
+        assert_equal(tracker.certificate(other, other), None)
+        for n in range(1, len(other) + 1):
+            tracker(other[:n])
+        assert_equal(tracker.certificate(other, other).valid, True)
+
     def test_sequential_enter_exit(self):
         """SequentialEnsembles based on Enters/ExitsXEnsemble"""
         # TODO: this includes a test of the overlap ability
@@ -1198,6 +1257,15 @@ class TestTISEnsemble(EnsembleTest):
         assert_equal(summ['max_lambda'], self.maxl)
         assert_equal(summ['min_lambda'], self.minl)
 
+    def test_tis_trajectory_summaries(self):
+        other = ttraj['upper_in_out_in']
+        summaries = self.tis.trajectory_summaries([self.traj, other])
+        assert_equal(len(summaries), 2)
+        assert_equal(summaries[0], self.tis.trajectory_summary(self.traj))
+        assert_equal(summaries[1]['max_lambda'], max(op(other)))
+        assert_equal(summaries[1]['min_lambda'], min(op(other)))
+        assert_equal(self.tis.trajectory_summaries([]), [])
+
     def test_tis_trajectory_summary_str(self):
         mystr = self.tis.trajectory_summary_str(self.traj)
         teststr = ("initial_state=stateA final_state=stateA min_lambda=" +
@@ -1230,6 +1298,37 @@ class TestTISEnsemble(EnsembleTest):
             failmsg = "Failure in "+test+"("+str(ttraj[test])+"): "
             self._single_test(test_f, ttraj[test], results[test], failmsg)
 
+    def test_tis_candidate_tracker(self):
+        # the candidates that are not in the ensemble are rejected as well
+        candidates = ['upper_in_out_cross_out_in', 'upper_in_cross_in',
+                      'upper_in_out_in', 'upper_in_in', 'upper_in_out_cross',
+                      'upper_out_in', 'upper_in_out_out_out']
+        for test in candidates:
+            traj = ttraj[test]
+            for n_fixed in range(len(traj)):
+                fixed = traj[:n_fixed]
+                tracker = self.tis.candidate_tracker(fixed)
+                for n in range(n_fixed + 1, len(traj) + 1):
+                    assert_equal(tracker(traj[n_fixed:n]), True)
+                generated = traj[n_fixed:]
+                certificate = tracker.certificate(traj, generated)
+                assert_equal(certificate.valid, self.tis(traj),
+                             "Failure in %s from %d" % (test, n_fixed))
+                assert certificate.applies_to(self.tis, traj)
+                assert not certificate.applies_to(self.tis, traj[:])
+
+    def test_tis_candidate_tracker_restart(self):
+        traj = ttraj['upper_in_out_cross_out_in']
+        other = ttraj['upper_in_out_in']
+        tracker = self.tis.candidate_tracker(traj[:0])
+        for n in range(1, len(traj) + 1):
+            tracker(traj[:n])
+        # the engine started over (e.g., after a NaN)
+        assert_equal(tracker.certificate(other, other), None)
+        for n in range(1, len(other) + 1):
+            tracker(other[:n])
+        assert_equal(tracker.certificate(other, other).valid, False)
+
     def test_tis_ensemble_candidate_cv_max(self):
         cv_max_func = lambda t, cv_: max(cv_(t))
         cv_max = paths.netcdfplus.FunctionPseudoAttribute(
@@ -101,6 +101,20 @@ class TestHistogram(object):
         assert_equal(histo.compare_parameters(self.hist_nbins), False)
         assert_equal(self.hist_nbins.compare_parameters(histo), False)
 
+    def test_to_dict(self):
+        # with range, bins from data, and not yet built
+        self.hist_binwidth_range.histogram(self.data)
+        self.hist_nbins.histogram(self.data)
+        for histo in [self.hist_binwidth_range, self.hist_nbins,
+                      Histogram(n_bins=5)]:
+            dct = histo.to_dict()
+            reloaded = Histogram.from_dict(dct)
+            assert_equal(reloaded.to_dict(), dct)
+            assert_equal(reloaded.count, histo.count)
+            if histo._histogram is not None:
+                assert_equal(reloaded.compare_parameters(histo), True)
+                assert_items_equal(reloaded(), histo())
+
     def test_xvals(self):
         histo = Histogram(n_bins=5)
         hist = histo.histogram(self.data) # need this to set the bins
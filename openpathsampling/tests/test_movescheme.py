@@ -18,6 +18,7 @@ import math
 
 import openpathsampling as paths
 from openpathsampling.high_level.move_scheme import *
+from openpathsampling.high_level.move_scheme import _key_as_list
 from openpathsampling.high_level.move_strategy import (
     levels,
     MoveStrategy, OneWayShootingStrategy, NearestNeighborRepExStrategy,
@@ -159,6 +160,26 @@ class TestMoveAcceptanceAnalysis(object):
         assert list(analysis._trials.values()) == [1] * len_trials
         assert list(analysis._accepted.values()) == accepted * len_trials
 
+    def test_encode_move_change(self):
+        scheme = self.scheme
+        steps = self.steps + [self.null_mover_6]
+        encoded = [scheme.encode_move_change(step.change) for step in steps]
+        for step, step_encoded in zip(steps, encoded):
+            change = step.change
+            nodes = list(change)
+            assert len(step_encoded) == len(nodes)
+            for (path_id, accepted), node in zip(step_encoded, nodes):
+                assert scheme.move_path_movers[path_id] is node.mover
+                key = scheme.move_paths[path_id]
+                assert str(_key_as_list(key)) == str(change.key(node))
+                assert accepted == node.accepted
+
+        # ids are stable
+        again = scheme.encode_move_change(steps[1].change)
+        assert (again == encoded[1]).all()
+        n_paths = len(scheme.move_paths)
+        assert max(enc[:, 0].max() for enc in encoded) == n_paths - 1
+
     def test_add_steps(self):
         # also tests n_total_trials
         acceptance = MoveAcceptanceAnalysis(self.scheme)
@@ -70,6 +70,14 @@ def setup_module():
     nan_causing_template.kinetics = kinetics
 
 
+def nan_snapshot():
+    coordinates = np.array(template.coordinates._value)
+    coordinates[0] = np.nan
+    return peng.Snapshot.construct(coordinates=coordinates * u.nanometers,
+                                   box_vectors=template.box_vectors,
+                                   velocities=template.velocities)
+
+
 class TestOpenMMEngine(object):
     def setup(self):
 
@@ -164,6 +172,63 @@ class TestOpenMMEngine(object):
         assert_not_equal_array_array(old_pos, new_pos)
         assert_not_equal_array_array(old_vel, new_vel)
 
+    def test_get_energy(self):
+        self.engine.generate_next_frame()
+        assert(self.engine.current_energies is None)
+        self.engine.options['get_energy'] = True
+        self.engine.generate_next_frame()
+        potential, kinetic = self.engine.current_energies
+        assert(kinetic.value_in_unit(u.kilojoule_per_mole) > 0.0)
+        self.engine.options['get_energy'] = False
+
+    def test_is_valid_snapshot(self):
+        snap = self.engine.generate_next_frame()
+        assert(self.engine.is_valid_snapshot(snap))
+        assert(not self.engine.is_valid_snapshot(nan_snapshot()))
+        assert(not peng.Engine.is_valid_snapshot(nan_snapshot()))
+
+    def test_nan_check_on_creation(self):
+        snap = self.engine.generate_next_frame()
+        assert_equal(snap._is_valid, True)
+        # the result of the check on creation is used
+        snap._is_valid = False
+        assert(not self.engine.is_valid_snapshot(snap))
+        # copies are checked again
+        assert(self.engine.is_valid_snapshot(snap.copy_with_replacement()))
+
+    def test_context_pool(self):
+        pool = peng.context_pool
+        simulation = self.engine.simulation
+        other = self.engine.from_new_options(options={'n_frames_max': 10})
+        assert(other.simulation is simulation)
+        integrator = mm.LangevinIntegrator(300*u.kelvin,
+                                           old_div(1.0, u.picoseconds),
+                                           2.0*u.femtoseconds)
+        integrator.setConstraintTolerance(0.00001)
+        copy = peng.Engine(template.topology, system, integrator,
+                           options={'n_steps_per_frame': 5})
+        copy.initialize('CPU')
+        assert(copy.simulation is simulation)
+
+        # each engine keeps its own state on the shared context
+        snap = self.engine.current_snapshot
+        copy.generate_next_frame()
+        assert(self.engine.current_snapshot is snap)
+        self.engine.generate_next_frame()
+        state = simulation.context.getState(getPositions=True)
+        assert_not_equal_array_array(
+            state.getPositions(asNumpy=True)._value,
+            snap.coordinates._value
+        )
+        self.engine.current_snapshot = snap
+
+        # unloaded contexts are freed
+        for engine in [self.engine, other, copy]:
+            engine.unload_context()
+        assert_equal(len(pool), 0)
+        self.engine.initialize('CPU')
+        assert(self.engine.simulation is not simulation)
+
     def test_generate(self):
         try:
             _ = self.engine.generate(self.engine.current_snapshot, [true_func])
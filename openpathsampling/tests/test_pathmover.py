@@ -276,6 +276,154 @@ class TestOneWayShootingMover(TestShootingMover):
         assert_equal(mover.ensemble, mover.movers[0].ensemble)
         assert_equal(mover.ensemble, mover.movers[1].ensemble)
 
+class FixedLengthSelector(UniformSelector):
+    # accepts trials up to a fixed length, for early rejection tests
+    def __init__(self, max_length):
+        super(FixedLengthSelector, self).__init__()
+        self.max_length = max_length
+
+    def max_accepted_length(self, trajectory, rand):
+        return self.max_length
+
+
+class TestEarlyRejection(TestShootingMover):
+    def test_max_accepted_length(self):
+        selector = UniformSelector()
+        traj = make_1d_traj([float(i) for i in range(10)])
+        max_length = selector.max_accepted_length(traj, 0.5)
+        assert_equal(max_length, 18)
+        longest = make_1d_traj([float(i) for i in range(max_length)])
+        too_long = make_1d_traj([float(i) for i in range(max_length + 1)])
+        assert selector.probability_ratio(traj[1], traj, longest) >= 0.5
+        assert selector.probability_ratio(traj[1], traj, too_long) < 0.5
+
+    def test_early_rejection(self):
+        mover = ForwardShootMover(
+            ensemble=self.tps,
+            selector=FixedLengthSelector(10),
+            engine=self.toy_engine
+        )
+        mover.early_rejection = True
+        change = mover.move(self.toy_samp)
+        assert isinstance(change, paths.RejectedEarlySampleMoveChange)
+        assert_equal(change.accepted, False)
+        details = change.details
+        assert_equal(details.rejection_reason, 'early_rejection')
+        assert_equal(details.max_accepted_length, 10)
+        # the dynamics stopped once the trial had 11 frames (or did not
+        # start if the part before the shooting point was too long)
+        prefix_length = self.toy_traj.index(details.shooting_snapshot)
+        assert_equal(prefix_length + len(change.trials[0].trajectory),
+                     max(prefix_length + 1, 11))
+
+    def test_accepted(self):
+        mover = BackwardShootMover(
+            ensemble=self.tps,
+            selector=FixedLengthSelector(1000),
+            engine=self.toy_engine
+        )
+        mover.early_rejection = True
+        change = mover.move(self.toy_samp)
+        assert_equal(change.accepted, True)
+        assert_equal(change.details.max_accepted_length, 1000)
+        assert 0.0 <= change.details.metropolis_random < 1.0
+
+    def test_two_way(self):
+        mover = TwoWayShootingMover(
+            ensemble=self.tps,
+            selector=FixedLengthSelector(10),
+            modifier=paths.NoModification(),
+            engine=self.toy_engine
+        )
+        assert_equal(mover.early_rejection, False)
+        mover.early_rejection = True
+        assert all(m.early_rejection for m in mover.movers)
+        for submover in mover.movers:
+            change = submover.move(self.toy_samp)
+            assert_equal(change.details.rejection_reason, 'early_rejection')
+            # the trials would have more than 60 frames
+            assert len(change.trials[0].trajectory) <= 11
+
+
+class TestEnsembleCertificate(TestShootingMover):
+    def setup(self):
+        super(TestEnsembleCertificate, self).setup()
+        op = self.stateA.collectivevariable
+        interface = CVDefinedVolume(op, -100, 0.3)
+        self.tis = paths.TISEnsemble(self.stateA, self.stateB, interface, op)
+        self.ensemble = self.tis
+        self.samp = SampleSet([Sample(trajectory=self.toy_traj,
+                                      replica=0,
+                                      ensemble=self.ensemble)])
+
+    def teardown(self):
+        SampleMover.verify_certificates = False
+
+    def _mover(self, mover_class):
+        return mover_class(ensemble=self.ensemble, selector=UniformSelector(),
+                           engine=self.toy_engine)
+
+    def test_certified_move(self):
+        SampleMover.verify_certificates = True
+        for mover_class in [ForwardShootMover, BackwardShootMover]:
+            mover = self._mover(mover_class)
+            trials, _ = mover(self.samp[0])
+            assert_equal(len(mover._certificates), 1)
+            certificate = mover._certificates[0]
+            assert certificate.applies_to(self.ensemble, trials[0].trajectory)
+            assert_equal(certificate.valid, True)
+
+            change = mover.move(self.samp)
+            assert change.details.metropolis_acceptance > 0.0
+            assert_equal(mover._certificates, ())
+
+    def test_certificate_is_used(self):
+        mover = self._mover(ForwardShootMover)
+        trials, _ = mover(self.samp[0])
+        # pretend the certificate says otherwise
+        mover._certificates[0].valid = False
+        accepted, details = mover.metropolis(trials)
+        assert_equal(accepted, False)
+        assert_equal(details['metropolis_acceptance'], 0.0)
+
+    @raises(RuntimeError)
+    def test_verify_certificates(self):
+        mover = self._mover(ForwardShootMover)
+        trials, _ = mover(self.samp[0])
+        mover._certificates[0].valid = False
+        SampleMover.verify_certificates = True
+        mover.metropolis(trials)
+
+    def test_no_certificate_without_trust(self):
+        mover = self._mover(BackwardShootMover)
+        mover._trust_candidate = False
+        trials, _ = mover(self.samp[0])
+        assert_equal(mover._certificates, [])
+        accepted, _ = mover.metropolis(trials, rand=0.0)
+        assert_equal(accepted, True)
+
+
+class TestTPSEnsembleCertificate(TestEnsembleCertificate):
+    def setup(self):
+        super(TestTPSEnsembleCertificate, self).setup()
+        network = paths.TPSNetwork(self.stateA, self.stateB)
+        self.ensemble = network.sampling_ensembles[0]
+        self.samp = SampleSet([Sample(trajectory=self.toy_traj,
+                                      replica=0,
+                                      ensemble=self.ensemble)])
+
+
+class TestMultiStateTPSEnsembleCertificate(TestEnsembleCertificate):
+    def setup(self):
+        super(TestMultiStateTPSEnsembleCertificate, self).setup()
+        network = paths.TPSNetwork.from_states_all_to_all(
+            [self.stateA, self.stateB])
+        self.ensemble = network.sampling_ensembles[0]
+        self.samp = SampleSet([Sample(trajectory=self.toy_traj,
+                                      replica=0,
+                                      ensemble=self.ensemble)])
+
+
 class TestForwardFirstTwoWayShootingMover(TestShootingMover):
     _MoverType = ForwardFirstTwoWayShootingMover
     # this allows us to run the exact same tests for backward-first
@@ -682,6 +682,66 @@ class TestPathSampling(object):
         self.sim = PathSampling(storage=None, move_scheme=scheme,
                                 sample_set=init_cond)
 
+    def test_decorrelation_tracker(self):
+        sample_set = self.sim.sample_set
+        tracker = DecorrelationTracker(sample_set)
+        n_replicas = len(sample_set)
+        assert_equal(tracker.n_correlated, n_replicas)
+        assert_equal(tracker.correlated_replicas,
+                     sorted(s.replica for s in sample_set))
+
+        # replace one trajectory by a new one and one by its reversed
+        samples = list(sample_set)
+        new_traj = make_1d_traj([-0.1, 0.05, 0.5, 1.1])
+        replaced = [
+            paths.Sample(replica=samples[0].replica,
+                         trajectory=new_traj,
+                         ensemble=samples[0].ensemble),
+            paths.Sample(replica=samples[1].replica,
+                         trajectory=samples[1].trajectory.reversed,
+                         ensemble=samples[1].ensemble)
+        ]
+        new_set = sample_set.apply_samples(replaced)
+        assert_equal(tracker.update(new_set), n_replicas - 1)
+        assert_equal(tracker.n_shared[samples[0].replica], 0)
+        assert samples[0].replica not in tracker.correlated_replicas
+
+        no_reversal = DecorrelationTracker(sample_set, time_reversal=False)
+        assert_equal(no_reversal.update(new_set), n_replicas - 2)
+
+    def test_decorrelation_tracker_change(self):
+        initial = self.sim.sample_set
+        tracker = DecorrelationTracker(initial)
+        counted = []
+        count = tracker._count
+        tracker._count = lambda traj, originals: (
+            counted.append(len(traj)) or count(traj, originals))
+        n_shots = 0
+        for step in range(20):
+            previous = self.sim.sample_set
+            self.sim.run(1)
+            change = self.sim._current_step.change
+            del counted[:]
+            tracker.update(self.sim.sample_set, change)
+            # the same result as counting all frames
+            recount = DecorrelationTracker(initial)
+            recount.update(self.sim.sample_set)
+            assert_equal(tracker.n_shared, recount.n_shared)
+
+            shot = change.canonical
+            if shot.accepted and isinstance(shot.mover, paths.EngineMover):
+                # only the replaced and the generated frames are counted
+                old = previous[shot.samples[0].replica].trajectory
+                index = old.index(shot.details.shooting_snapshot)
+                if shot.mover.direction == 'forward':
+                    n_kept = index + 1
+                else:
+                    n_kept = len(old) - index
+                new = shot.samples[0].trajectory
+                assert_equal(sum(counted), len(old) + len(new) - 2 * n_kept)
+                n_shots += 1
+        assert n_shots > 0
+
     def test_run_until_decorrelated(self):
         def all_snaps(sample_set):
             return set(sum([s.trajectory for s in sample_set], []))
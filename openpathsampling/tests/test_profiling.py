@@ -0,0 +1,181 @@
+from __future__ import absolute_import
+from builtins import object
+from nose.tools import assert_equal, raises
+
+import os
+import tempfile
+
+from io import StringIO
+
+from .test_helpers import make_1d_traj
+
+import openpathsampling as paths
+import openpathsampling.profiling as profiling
+from openpathsampling.profiling import Profiler, profile, active_profiler
+
+
+class FakeTimer(object):
+    # each call advances the clock by one second
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        self.time += 1.0
+        return self.time
+
+
+class FakeMover(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeChange(object):
+    def __init__(self, mover, subchanges=()):
+        self.mover = mover
+        self.subchanges = list(subchanges)
+
+
+class TestProfiler(object):
+    def setup(self):
+        self.timer = profiling.timer
+        profiling.timer = FakeTimer()
+        self.profiler = Profiler()
+        self.root = FakeMover('Root')
+        self.shoot = FakeMover('Shoot')
+        self.change = FakeChange(self.root, [FakeChange(self.shoot)])
+
+    def teardown(self):
+        profiling.timer = self.timer
+        self.profiler.deactivate()
+
+    def _run_step(self):
+        with self.profiler:
+            with profile('move'):
+                with profile('trial', mover=self.shoot):
+                    with profile('engine.integrate'):
+                        pass
+                with profile('acceptance', mover=self.shoot):
+                    pass
+        self.profiler.end_step(self.change)
+
+    def test_inactive(self):
+        assert active_profiler() is None
+        with profile('engine.integrate'):
+            pass
+        assert_equal(self.profiler._step_timings, {})
+
+    def test_activate(self):
+        with self.profiler:
+            assert active_profiler() is self.profiler
+        assert active_profiler() is None
+
+    def test_exclusive_times(self):
+        self._run_step()
+        # every timer call advances 1 s: the enclosing phases only count
+        # the time not spent in the nested ones
+        assert_equal(self.profiler.timings, {
+            ('', 'move'): [3.0, 1],
+            ('Root > Shoot', 'trial'): [2.0, 1],
+            ('Root > Shoot', 'engine.integrate'): [1.0, 1],
+            ('Root > Shoot', 'acceptance'): [1.0, 1],
+        })
+        assert_equal(self.profiler.n_steps, 1)
+        totals = self.profiler.phase_totals()
+        assert_equal(sum(totals.values()), 7.0)
+
+    def test_accumulate_steps(self):
+        self._run_step()
+        self._run_step()
+        assert_equal(self.profiler.n_steps, 2)
+        assert_equal(self.profiler.timings[('Root > Shoot', 'trial')],
+                     [4.0, 2])
+        self.profiler.reset()
+        assert_equal(self.profiler.timings, {})
+        assert_equal(self.profiler.n_steps, 0)
+
+    def test_mover_not_in_change(self):
+        with self.profiler:
+            with profile('trial', mover=self.shoot):
+                pass
+        self.profiler.end_step()
+        assert_equal(list(self.profiler.timings), [('Shoot', 'trial')])
+
+    def test_dump_load(self):
+        tmp = tempfile.mkdtemp()
+        filename = os.path.join(tmp, 'profile.json')
+        self.profiler.filename = filename
+        self.profiler.dump_frequency = 2
+        self._run_step()
+        assert not os.path.exists(filename)
+        self._run_step()
+        assert os.path.exists(filename)
+        loaded = Profiler.load(filename)
+        assert_equal(loaded.n_steps, 2)
+        assert_equal(loaded.timings, self.profiler.timings)
+        os.remove(filename)
+        os.rmdir(tmp)
+
+    @raises(ValueError)
+    def test_dump_without_file(self):
+        self.profiler.dump()
+
+    def test_summary(self):
+        self._run_step()
+        output = StringIO()
+        self.profiler.summary(output=output)
+        lines = output.getvalue().splitlines()
+        assert_equal(lines[0], "Profiled 1 steps, 7.000 s")
+        assert_equal(lines[1], "simulation (42.86%):")
+        assert_equal(lines[3], "Root > Shoot (57.14%):")
+        assert lines[4].startswith("  trial 2.000 s (28.57%) in 1 calls")
+
+
+class TestProfiledRun(object):
+    def setup(self):
+        paths.InterfaceSet._reset()
+        cv = paths.FunctionCV("x", lambda x: x.xyz[0][0])
+        state_A = paths.CVDefinedVolume(cv, float("-inf"), 0.0)
+        state_B = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        pes = paths.engines.toy.LinearSlope([0, 0, 0], 0)
+        integ = paths.engines.toy.LangevinBAOABIntegrator(0.01, 0.1, 2.5)
+        topology = paths.engines.toy.Topology(n_spatial=3, masses=[1.0],
+                                              pes=pes)
+        engine = paths.engines.toy.Engine(options={'integ': integ},
+                                          topology=topology)
+        interfaces = paths.VolumeInterfaceSet(cv, float("-inf"),
+                                              [0.0, 0.1, 0.2])
+        network = paths.MISTISNetwork([(state_A, interfaces, state_B)])
+        init_traj = make_1d_traj([-0.1, 0.2, 0.5, 0.8, 1.1])
+        scheme = paths.OneWayShootingMoveScheme(
+            network, selector=paths.UniformSelector(), engine=engine)
+        init_cond = scheme.initial_conditions_from_trajectories(init_traj)
+        self.sim = paths.PathSampling(storage=None, move_scheme=scheme,
+                                      sample_set=init_cond)
+        self.sim.output_stream = open(os.devnull, 'w')
+
+    def teardown(self):
+        self.sim.output_stream.close()
+
+    def test_run(self):
+        profiler = Profiler()
+        self.sim.profiler = profiler
+        self.sim.run(5)
+        assert active_profiler() is None
+        assert_equal(profiler.n_steps, 5)
+
+        phases = set(phase for _, phase in profiler.timings)
+        assert set(['move', 'selection', 'trial', 'acceptance',
+                    'engine.integrate', 'engine.snapshot',
+                    'engine.nan_check', 'engine.stop_check',
+                    'save']) <= phases
+
+        root_name = self.sim.root_mover.name
+        for (path, phase) in profiler.timings:
+            if phase in ['move', 'save', 'sync']:
+                assert_equal(path, '')
+            elif phase == 'selection':
+                assert path.split(' > ')[0] == root_name
+            else:
+                assert path.startswith(root_name + ' > ')
+                assert path.split(' > ')[-1] in ['ForwardShoot',
+                                                 'BackwardShoot']
@@ -0,0 +1,159 @@
+from __future__ import absolute_import
+from builtins import object
+import collections
+
+import numpy as np
+from nose.tools import assert_equal
+
+import openpathsampling as paths
+from openpathsampling.analysis.replica_network import (
+    ReplicaNetwork, condense_repeats, trace_ensembles_for_replica,
+    trace_replicas_for_ensemble
+)
+from .test_helpers import make_1d_traj
+
+MockStep = collections.namedtuple('MockStep', 'active change')
+MockChange = collections.namedtuple('MockChange', 'canonical')
+MockCanonical = collections.namedtuple('MockCanonical', 'mover')
+MockMover = collections.namedtuple('MockMover', 'is_ensemble_change_mover')
+MockNetwork = collections.namedtuple('MockNetwork', 'all_ensembles')
+MockScheme = collections.namedtuple('MockScheme', 'network')
+
+
+def _reference_flow(traces, replicas, ensembles, bottom, top):
+    # the loop over condensed traces, as used before
+    n_up = {ens: 0 for ens in ensembles}
+    n_visit = {ens: 0 for ens in ensembles}
+    for replica in replicas:
+        direction = 0
+        for (loc, count) in traces[replica]:
+            if loc == top:
+                direction = -1
+            elif loc == bottom:
+                direction = +1
+            if direction != 0:
+                n_visit[loc] += count
+            if direction == 1:
+                n_up[loc] += count
+    return {e: float(n_up[e]) / n_visit[e] if n_visit[e] > 0 else 0.0
+            for e in ensembles}
+
+
+def _reference_trips(traces, replicas, bottom, top):
+    result = {'down': [], 'up': [], 'round': []}
+    for replica in replicas:
+        direction = None
+        trip_counter = 0
+        first_direction = None
+        local_down = []
+        local_up = []
+        for (loc, count) in traces[replica]:
+            if loc == top and direction != +1:
+                direction = +1
+                if trip_counter > 0:
+                    local_up.append(trip_counter)
+                trip_counter = 0
+            elif loc == bottom and direction != -1:
+                direction = -1
+                if trip_counter > 0:
+                    local_down.append(trip_counter)
+                trip_counter = 0
+            if direction is not None:
+                if first_direction is None:
+                    first_direction = direction
+                trip_counter += count
+        pairs = []
+        if first_direction == 1:
+            pairs = zip(local_down, local_up)
+        elif first_direction == -1:
+            pairs = zip(local_up, local_down)
+        result['down'].extend(local_down)
+        result['up'].extend(local_up)
+        result['round'].extend([sum(pair) for pair in pairs])
+    return result
+
+
+class TestReplicaNetwork(object):
+    def setup(self):
+        self.ensembles = [paths.LengthEnsemble(i + 1).named('ens%d' % i)
+                          for i in range(4)]
+        traj = make_1d_traj([0.0])
+        repex = MockChange(MockCanonical(MockMover(True)))
+        shoot = MockChange(MockCanonical(MockMover(False)))
+
+        # random neighbor swaps of 4 replicas in 4 ensembles
+        rng = np.random.RandomState(7)
+        order = list(range(4))  # order[ens] = replica
+        self.steps = []
+        for i in range(300):
+            change = shoot
+            if i > 0 and rng.rand() < 0.5:
+                change = repex
+                if rng.rand() < 0.7:
+                    k = rng.randint(3)
+                    order[k], order[k + 1] = order[k + 1], order[k]
+            samples = [paths.Sample(replica=order[e], trajectory=traj,
+                                    ensemble=self.ensembles[e])
+                       for e in range(4)]
+            self.steps.append(MockStep(paths.SampleSet(samples), change))
+
+        scheme = MockScheme(MockNetwork(self.ensembles))
+        self.network = ReplicaNetwork(scheme, self.steps)
+
+    def test_ensemble_indices(self):
+        indices = self.network.ensemble_indices
+        assert_equal(indices.shape, (300, 4))
+        for step, row in zip(self.steps, indices):
+            for sample in step.active:
+                column = self.network.replica_columns[sample.replica]
+                assert_equal(
+                    self.network.index_ensembles[row[column]],
+                    sample.ensemble
+                )
+
+    def test_traces(self):
+        traces = self.network.traces
+        for replica in range(4):
+            assert_equal(traces[replica], condense_repeats(
+                trace_ensembles_for_replica(replica, self.steps)))
+        for ens in self.ensembles:
+            assert_equal(traces[ens], condense_repeats(
+                trace_replicas_for_ensemble(ens, self.steps),
+                use_is=False))
+
+    def test_transitions_and_analysis(self):
+        transitions = collections.Counter()
+        n_accepted = collections.Counter()
+        n_trials = 0
+        prev = None
+        for step in self.steps:
+            if step.change.canonical.mover.is_ensemble_change_mover:
+                n_trials += 1
+                for old in prev.active:
+                    new_ens = step.active[old.replica].ensemble
+                    if new_ens != old.ensemble:
+                        n_accepted[(old.ensemble, new_ens)] += 1
+            prev = step
+        for replica in range(4):
+            trace = self.network.traces[replica]
+            for (a, _), (b, _) in zip(trace[:-1], trace[1:]):
+                transitions[(a, b)] += 1
+
+        assert_equal(self.network.transitions, dict(transitions))
+        n_try, n_acc = self.network.analysis
+        assert_equal(n_acc, dict(n_accepted))
+        assert_equal(n_try, {key: n_trials for key in n_accepted})
+
+    def test_flow(self):
+        bottom, top = self.ensembles[0], self.ensembles[3]
+        expected = _reference_flow(self.network.traces, range(4),
+                                   self.ensembles, bottom, top)
+        assert_equal(self.network.flow(bottom, top), expected)
+
+    def test_trips(self):
+        bottom, top = self.ensembles[0], self.ensembles[3]
+        expected = _reference_trips(self.network.traces, range(4),
+                                    bottom, top)
+        trips = self.network.trips(bottom, top)
+        assert len(trips['round']) > 0
+        assert_equal(trips, expected)
@@ -147,8 +147,62 @@ class TestSampleSet(object):
     def test_del_replica(self):
         raise SkipTest
 
+    def test_del_sample_middle(self):
+        del self.testset[self.s0A]
+        self.testset.consistency_check()
+        # the order of the other samples is kept
+        assert_equal(self.testset.samples, [self.s1A, self.s2B])
+        assert_equal(self.testset.all_from_ensemble(self.ensA), [self.s1A])
+
     def test_apply_samples(self):
-        raise SkipTest
+        ensC = LengthEnsemble(3)
+        s3C = Sample(replica=3, trajectory=Trajectory([0.1, 0.2, 0.3]),
+                     ensemble=ensC)
+        new_set = self.testset.apply_samples([self.s2B_, s3C])
+        new_set.consistency_check()
+        # replaced samples and new replicas are appended
+        assert_equal(new_set.samples, [self.s0A, self.s1A, self.s2B_, s3C])
+        assert_equal(new_set[self.ensB], self.s2B_)
+        # the original set is unchanged
+        self.testset.consistency_check()
+        assert_equal(self.testset.samples, [self.s0A, self.s1A, self.s2B])
+        assert_equal(self.testset[self.ensB], self.s2B)
+        assert_false(ensC in self.testset)
+        # unchanged entries are shared
+        assert_true(new_set.ensemble_dict[self.ensA]
+                    is self.testset.ensemble_dict[self.ensA])
+
+    def test_apply_samples_order(self):
+        s0A_ = Sample(replica=0, trajectory=Trajectory([0.2]),
+                      ensemble=self.ensA)
+        new_set = self.testset.apply_samples([s0A_])
+        new_set.consistency_check()
+        # as for `del` followed by `append`: the new sample is last
+        assert_equal(new_set.samples, [self.s1A, self.s2B, s0A_])
+        assert_equal(new_set.all_from_ensemble(self.ensA), [self.s1A, s0A_])
+        assert_equal(self.testset.samples, [self.s0A, self.s1A, self.s2B])
+
+    def test_apply_samples_no_copy(self):
+        new_set = self.testset.apply_samples(self.s2B_, copy=False)
+        assert_true(new_set is self.testset)
+        assert_equal(self.testset.samples, [self.s0A, self.s1A, self.s2B_])
+        self.testset.consistency_check()
+
+    def test_apply_samples_change_ensemble(self):
+        s1B = Sample(replica=1, trajectory=Trajectory([0.3, 0.4]),
+                     ensemble=self.ensB)
+        new_set = self.testset.apply_samples(s1B)
+        new_set.consistency_check()
+        assert_same_items(new_set.all_from_ensemble(self.ensB),
+                          [self.s2B, s1B])
+        assert_equal(new_set.all_from_ensemble(self.ensA), [self.s0A])
+        assert_equal(self.testset.all_from_ensemble(self.ensA),
+                     [self.s0A, self.s1A])
+
+    def test_inequality(self):
+        assert_true(self.testset != SampleSet([self.s0A, self.s1A]))
+        assert_true(self.testset != SampleSet([self.s0A, self.s1A,
+                                               self.s2B_]))
 
     def test_extend(self):
         testset = SampleSet([self.s0A])
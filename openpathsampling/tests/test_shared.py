@@ -29,3 +29,33 @@ class TestStaticContainerStore(object):
         npt.assert_array_equal(snap.box_vectors, reloaded.box_vectors)
         assert snap.box_vectors is None
         assert reloaded.box_vectors is None
+
+    def test_deduplicate(self):
+        if not openmmtools:
+            pytest.skip("Requires OpenMMTools for testing")
+        testsystem = openmmtools.testsystems.AlanineDipeptideVacuum()
+        snap = paths.engines.openmm.snapshot_from_testsystem(testsystem)
+        # same content, but new containers
+        copy = paths.engines.openmm.Snapshot.construct(
+            coordinates=snap.coordinates,
+            box_vectors=snap.box_vectors,
+            velocities=snap.velocities,
+            engine=snap.engine
+        )
+        storage = paths.Storage("test.nc", 'w')
+        storage.snapshots.deduplicate_containers = True
+        storage.save(snap)
+        storage.save(copy)
+        report = storage.deduplication_report()
+        assert report['total']['n_stored'] == 2
+        assert report['total']['n_aliases'] == 2
+        assert report['total']['bytes_saved'] > 0
+        storage.close()
+
+        load = paths.Storage("test.nc", 'r')
+        assert len(load.snapshots) == 4
+        reloaded = load.snapshots[copy.__uuid__]
+        npt.assert_array_equal(snap.coordinates, reloaded.coordinates)
+        npt.assert_array_equal(snap.velocities, reloaded.velocities)
+        assert load.deduplication_report()['total']['n_aliases'] == 2
+        load.close()
@@ -7,6 +7,7 @@ from openpathsampling.tests.test_helpers import (
     assert_items_equal, CalvinistDynamics
 )
 import pytest
+import numpy as np
 
 from openpathsampling.shooting import *
 from openpathsampling.pathmover import ForwardShootMover, BackwardShootMover
@@ -77,6 +78,30 @@ class TestGaussianBiasSelector(SelectorTest):
         expected = pytest.approx(self.f[frame] / norm)
         assert self.sel.probability(traj[frame], traj) == expected
 
+    def test_biases(self):
+        # computed for the whole trajectory at once
+        np.testing.assert_allclose(self.sel._biases(self.mytraj), self.f)
+        assert self.sel.sum_bias(self.mytraj) == pytest.approx(sum(self.f))
+
+    def test_cumulative_biases_cached(self):
+        traj = self.mytraj
+        cumulative = self.sel._cumulative_biases(traj)
+        assert self.sel._cumulative_biases(traj) is cumulative
+        # a longer trajectory is a different one
+        longer = traj + make_1d_traj([0.25])
+        assert self.sel.sum_bias(longer) == pytest.approx(sum(self.f) + 1.0)
+        for _ in range(self.sel._n_cached):
+            self.sel.sum_bias(make_1d_traj([0.0]))
+        assert self.sel._cumulative_biases(traj) is not cumulative
+
+    def test_pick_searchsorted(self, monkeypatch):
+        # the frame whose cumulative probability first exceeds the number
+        cumulative = np.cumsum(self.f)
+        for frame in range(len(self.f)):
+            rand = (cumulative[frame] - 0.01) / cumulative[-1]
+            monkeypatch.setattr(np.random, 'random', lambda: rand)
+            assert self.sel.pick(self.mytraj) == frame
+
 
 class TestFirstFrameSelector(SelectorTest):
     def test_pick(self):
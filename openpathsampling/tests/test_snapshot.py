@@ -15,6 +15,7 @@ import numpy as np
 import openpathsampling.engines.features as features
 
 from openpathsampling.engines.snapshot import SnapshotFactory
+from openpathsampling.engines.trajectory import stack_arrays
 import openpathsampling as paths
 
 def compate_attribute(snapshot_class, attr_name, attr_value, attr_reversal_fnc):
@@ -64,3 +65,15 @@ class TestSnapshotCopy(object):
         assert_true(new_snap.box_vectors is snap.box_vectors)
         assert_true(new_snap.box_vectors is None)
         assert_true(new_snap.engine is snap.engine)
+
+
+def test_stack_arrays():
+    # rows of one block, like the values of snapshots loaded together
+    block = np.arange(8.0).reshape((4, 1, 2))
+    rows = list(block)
+    stacked = stack_arrays(rows[1:3])
+    assert_allclose(stacked, block[1:3])
+    assert_true(stacked.base is not block)
+    assert_allclose(stack_arrays(rows[::-1]), block[::-1])
+    separate = stack_arrays([np.zeros((1, 2)), np.ones((1, 2))])
+    assert_allclose(separate, [[[0.0, 0.0]], [[1.0, 1.0]]])
@@ -0,0 +1,74 @@
+from __future__ import absolute_import
+from builtins import object
+from nose.tools import assert_equal
+
+import numpy as np
+
+import openpathsampling as paths
+from openpathsampling.split_planner import SplitPlanner
+from .test_helpers import make_1d_traj
+
+
+class TestSplitPlanner(object):
+    def setup(self):
+        paths.InterfaceSet._reset()
+        cv = paths.FunctionCV("x", lambda x: x.xyz[0][0])
+        self.state_A = paths.CVDefinedVolume(cv, float("-inf"), 0.0)
+        self.state_B = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        interfaces = paths.VolumeInterfaceSet(cv, float("-inf"),
+                                              [0.0, 0.2, 0.4])
+        self.network = paths.MISTISNetwork(
+            [(self.state_A, interfaces, self.state_B)]
+        )
+        self.tis_ensembles = self.network.sampling_ensembles
+        rng = np.random.RandomState(11)
+        self.trajectories = [
+            make_1d_traj(list(np.cumsum(rng.normal(0.0, 0.3, 60)) + 0.5))
+            for _ in range(4)
+        ]
+        self.trajectories += [traj.reversed for traj in self.trajectories]
+        # has no candidates; split as before
+        self.length = paths.LengthEnsemble(3)
+
+    def _check_planner(self, planner):
+        ensembles = self.tis_ensembles + [self.length]
+        planner.plan(ensembles, self.trajectories)
+        for ens in ensembles:
+            for traj in self.trajectories:
+                assert_equal(planner.split(ens, traj), ens.split(traj))
+
+    def test_split(self):
+        planner = SplitPlanner()
+        self._check_planner(planner)
+        assert planner.n_checks > 0
+        assert_equal(planner.n_splits, len(self.trajectories))
+        # the interval logic leaves few exact checks
+        n_frames = sum(len(traj) for traj in self.trajectories)
+        assert planner.n_checks < len(self.tis_ensembles) * n_frames
+
+    def test_split_processes(self):
+        self._check_planner(SplitPlanner(processes=2, chunksize=4))
+
+    def test_plan_cached(self):
+        planner = SplitPlanner()
+        planner.plan([self.tis_ensembles], self.trajectories)
+        n_checks = planner.n_checks
+        planner.plan(self.tis_ensembles, self.trajectories)
+        assert_equal(planner.n_checks, n_checks)
+        # not planned before: planned when needed
+        traj = self.trajectories[0]
+        assert_equal(planner.split(self.length, traj),
+                     self.length.split(traj))
+        assert_equal(planner.n_splits, 1)
+
+    def test_generate_from_trajectories(self):
+        ensembles = self.tis_ensembles
+        expected = paths.SampleSet([]).generate_from_trajectories(
+            ensembles, self.trajectories, strategies=['split'])
+        result = paths.SampleSet([]).generate_from_trajectories(
+            ensembles, self.trajectories, strategies=['split'],
+            processes=2)
+        assert_equal(len(result), len(ensembles))
+        for ens in ensembles:
+            assert_equal(result[ens].trajectory,
+                         expected[ens].trajectory)
@@ -10,16 +10,22 @@ import os
 
 import pytest
 
-from nose.tools import (assert_equal)
+from nose.tools import (assert_equal, raises)
 
 import openpathsampling as paths
 
 import openpathsampling.engines.openmm as peng
 import openpathsampling.engines.toy as toys
 
-from openpathsampling.netcdfplus import ObjectJSON
+from openpathsampling.netcdfplus import (ObjectJSON, BinaryCodec,
+                                         ObjectStore, StorableObject,
+                                         LoaderProxy, compile_row_serializers)
+from openpathsampling.netcdfplus.util import (contiguous_ranges, quantize,
+                                             dequantize, quantization_error,
+                                             delta_encode, delta_decode)
 from openpathsampling.storage import Storage
-from .test_helpers import (data_filename, md, compare_snapshot)
+from .test_helpers import (data_filename, md, compare_snapshot,
+                           make_1d_traj)
 
 import numpy as np
 from nose.plugins.skip import SkipTest
@@ -405,3 +411,359 @@ class TestStorage(object):
 
         assert(os.path.isfile(self.filename))
         assert(store.storage_version == paths.version.version)
+
+
+class TestBinaryCodec(object):
+    def setup(self):
+        self.filename = data_filename("codec_test.nc")
+        self.traj = make_1d_traj([0.0, 1.0, 2.0])
+        self.details = paths.Details(
+            integer=1,
+            big_integer=2**70,
+            number=2.5,
+            string='text',
+            array=np.arange(6.0).reshape(2, 3),
+            nothing=None,
+            nested=[1, (2, 3), {'a': 4}],
+            traj=self.traj,
+            snapshot_keys={self.traj[0]: 4}
+        )
+
+    def teardown(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def _check_details(self, loaded):
+        assert_equal(loaded.integer, 1)
+        assert_equal(loaded.big_integer, 2**70)
+        assert_equal(loaded.number, 2.5)
+        assert_equal(loaded.string, 'text')
+        np.testing.assert_array_equal(loaded.array, self.details.array)
+        assert_equal(loaded.nothing, None)
+        assert_equal(loaded.nested, [1, (2, 3), {'a': 4}])
+        assert_equal(loaded.traj, self.traj)
+        assert_equal(loaded.snapshot_keys, {self.traj[0]: 4})
+
+    def test_roundtrip(self):
+        storage = Storage(filename=self.filename, mode='w')
+        codec = BinaryCodec(storage.simplifier)
+        string = codec.encode(self.details, as_object=True)
+        assert string.startswith(BinaryCodec.marker)
+        self._check_details(codec.decode(string))
+        storage.close()
+
+    def test_decode_json(self):
+        # rows written as JSON are still readable
+        storage = Storage(filename=self.filename, mode='w')
+        codec = BinaryCodec(storage.simplifier)
+        string = storage.simplifier.to_json_object(self.details)
+        self._check_details(codec.decode(string))
+        storage.close()
+
+    def test_writable_array(self):
+        storage = Storage(filename=self.filename, mode='w')
+        codec = BinaryCodec(storage.simplifier)
+        loaded = codec.decode(codec.encode(self.details, as_object=True))
+        loaded.array[0, 0] = 10.0
+        assert_equal(loaded.array[0, 0], 10.0)
+        storage.close()
+
+    def test_binobj_store(self):
+        storage = Storage(filename=self.filename, mode='w')
+        # the default stays JSON to keep files readable by older versions
+        assert_equal(storage.details.json, True)
+        storage.create_store('binary_details',
+                             ObjectStore(paths.Details, json='binobj'))
+        storage.finalize_stores()
+        storage.binary_details.save(self.details)
+        storage.close()
+
+        storage = Storage(filename=self.filename, mode='r')
+        assert storage.variables['binary_details_json'][0].startswith(
+            BinaryCodec.marker)
+        self._check_details(storage.binary_details[0])
+        storage.close()
+
+
+class ArgsObject(StorableObject):
+    def __init__(self, a, b=None):
+        super(ArgsObject, self).__init__()
+        self.a = a
+        self.b = b
+
+
+class TestStorableObjectArgs(object):
+    def test_args_cached_per_class(self):
+        class SubArgsObject(ArgsObject):
+            def __init__(self, a):
+                super(SubArgsObject, self).__init__(a)
+
+        args = ArgsObject.args()
+        assert_equal(args, ['self', 'a', 'b'])
+        assert ArgsObject.args() is args
+        assert_equal(SubArgsObject.args(), ['self', 'a'])
+        loaded = ArgsObject.from_dict(ArgsObject(1, 2).to_dict())
+        assert_equal((loaded.a, loaded.b), (1, 2))
+
+
+class RowObject(StorableObject):
+    _dict_fields = ['a', 'b']
+    _dict_defaults = {'_seen': [], '_flag': None}
+    n_init = 0
+
+    def __init__(self, a, b):
+        super(RowObject, self).__init__()
+        RowObject.n_init += 1
+        self.a = a
+        self.b = b
+        self._seen = []
+        self._flag = None
+
+
+class TestRowSerializers(object):
+    def test_roundtrip(self):
+        to_values, from_values = RowObject.row_serializers()
+        assert RowObject.row_serializers()[1] is from_values
+        assert_equal(to_values(RowObject(1, 'x')), (1, 'x'))
+        n_init = RowObject.n_init
+        loaded = from_values(1, b='x')
+        other = from_values(2, 'y')
+        # __init__ is not called, the defaults are new for each object
+        assert_equal(RowObject.n_init, n_init)
+        assert_equal((loaded.a, loaded.b, loaded._flag), (1, 'x', None))
+        loaded._seen.append(1)
+        assert_equal(other._seen, [])
+        assert type(loaded) is RowObject
+
+    @raises(ValueError)
+    def test_invalid_field(self):
+        compile_row_serializers(RowObject, ['a', 'b; import os'])
+
+    @raises(ValueError)
+    def test_default_not_literal(self):
+        compile_row_serializers(RowObject, ['a'], {'_seen': object()})
+
+    def test_schema_of_stored_classes(self):
+        step_store = paths.storage.MCStepStore()
+        assert_equal(step_store.var_names, paths.MCStep._dict_fields)
+        assert step_store._from_values is \
+            paths.MCStep.row_serializers()[1]
+        change = paths.RandomChoiceMoveChange.row_serializers()[1](
+            mover=None, subchanges=[], samples=[], input_samples=[],
+            details=None)
+        assert_equal(change.details, None)
+        assert_equal(change.subchanges, [])
+
+
+class TestPrefetch(object):
+    def setup(self):
+        self.filename = data_filename("prefetch_test.nc")
+        self.trajs = [make_1d_traj([float(i), i + 0.5, i + 0.25])
+                      for i in range(4)]
+        ensemble = paths.LengthEnsemble(3)
+        self.steps = []
+        for i, traj in enumerate(self.trajs):
+            sample = paths.Sample(replica=0, trajectory=traj,
+                                  ensemble=ensemble)
+            change = paths.AcceptedSampleMoveChange(
+                samples=[sample], details=paths.Details(cycle=i))
+            self.steps.append(paths.MCStep(
+                mccycle=i, active=paths.SampleSet([sample]),
+                change=change))
+
+        storage = Storage(filename=self.filename, mode='w')
+        for step in self.steps:
+            storage.save(step)
+        storage.close()
+
+    def teardown(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_contiguous_ranges(self):
+        assert_equal(contiguous_ranges([]), [])
+        assert_equal(contiguous_ranges([1, 2, 3, 7, 9, 10]),
+                     [(1, 4), (7, 8), (9, 11)])
+
+    def test_load_many(self):
+        storage = Storage(filename=self.filename, mode='r')
+        uuids = [traj.__uuid__ for traj in reversed(self.trajs)]
+        loaded = storage.trajectories.load_many(uuids)
+        assert_equal([traj.__uuid__ for traj in loaded], uuids)
+        for traj in loaded:
+            assert storage.trajectories.index[traj.__uuid__] \
+                in storage.trajectories.cache
+        storage.close()
+
+    def test_trajectory_prefetch(self):
+        storage = Storage(filename=self.filename, mode='r')
+        traj = storage.trajectories[2]
+        assert traj.prefetch() is traj
+        for proxy in traj.iter_proxies():
+            assert type(proxy) is LoaderProxy
+            assert proxy._subject() is not None
+        np.testing.assert_array_equal(traj.xyz, self.trajs[2].xyz)
+        reversed_traj = traj.reversed
+        np.testing.assert_array_equal(reversed_traj.xyz,
+                                      self.trajs[2].reversed.xyz)
+        storage.close()
+
+    def test_iter_prefetch(self):
+        storage = Storage(filename=self.filename, mode='r')
+        steps = list(storage.steps.iter(prefetch=3))
+        assert_equal([step.mccycle for step in steps], [0, 1, 2, 3])
+        for step, traj in zip(steps, self.trajs):
+            assert_equal(step.active[0].trajectory, traj)
+        storage.close()
+
+    def test_load_steps_and_changes(self):
+        # both are restored by their compiled row serializers
+        storage = Storage(filename=self.filename, mode='r')
+        for i, step in enumerate(storage.steps):
+            assert type(step) is paths.MCStep
+            assert_equal(step.__uuid__, self.steps[i].__uuid__)
+            change = step.change
+            assert type(change) is paths.AcceptedSampleMoveChange
+            assert_equal(change.__uuid__, self.steps[i].change.__uuid__)
+            assert_equal(change.details.cycle, i)
+            assert_equal(change.samples, step.active.samples)
+            assert_equal(change.subchanges, [])
+            assert change.accepted
+        storage.close()
+
+
+class TestSnapshotSaveMany(object):
+    def setup(self):
+        self.filename = data_filename("save_many_test.nc")
+        self.traj = make_1d_traj([float(i) for i in range(5)])
+
+    def teardown(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_save_trajectory(self):
+        traj = self.traj
+        storage = Storage(filename=self.filename, mode='w')
+        # one frame is already stored, one appears again reversed
+        storage.snapshots.save(traj[2])
+        traj = traj + paths.Trajectory([traj[0].reversed])
+        storage.save(traj)
+        assert_equal(len(storage.snapshots), 10)
+        storage.close()
+
+        storage = Storage(filename=self.filename, mode='r')
+        loaded = storage.trajectories[0]
+        assert_equal([snap.__uuid__ for snap in loaded],
+                     [snap.__uuid__ for snap in traj])
+        np.testing.assert_allclose(loaded.xyz, traj.xyz)
+        np.testing.assert_allclose(loaded.velocities, traj.velocities)
+        storage.close()
+
+
+class TestQuantizedStorage(object):
+    def setup(self):
+        self.filename = data_filename("quantized_test.nc")
+        self.traj = make_1d_traj([0.1234567 * i for i in range(5)],
+                                 velocities=[-0.7654321] * 5)
+
+    def teardown(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_quantize(self):
+        values = np.array([[0.12345, -1.5], [2.0004, 0.0]])
+        encoded = quantize(values, 1e-3)
+        assert encoded.dtype == np.int32
+        assert_equal(encoded.tolist(), [[123, -1500], [2000, 0]])
+        assert np.all(np.abs(dequantize(encoded, 1e-3) - values) <= 5e-4)
+        assert quantization_error(values, 1e-3) <= 5e-4
+        with pytest.raises(ValueError):
+            quantize([np.nan], 1e-3)
+        with pytest.raises(ValueError):
+            quantize([1e10], 1e-3)
+
+    def test_delta_coding(self):
+        limit = np.iinfo(np.int32).max
+        quantized = np.array([[5], [7], [-limit], [limit], [3], [2], [2]],
+                             dtype=np.int32)
+        encoded = delta_encode(quantized, 0, 3)
+        # rows 0, 3 and 6 are key rows, the others store zigzag mapped
+        # differences (2 to 4, -1 to 1)
+        assert_equal(encoded[[0, 1, 3, 5, 6]].tolist(),
+                     [[5], [4], [limit], [1], [2]])
+        # the differences wrap around, the decoded values do not
+        np.testing.assert_array_equal(delta_decode(encoded, 0, 3), quantized)
+        np.testing.assert_array_equal(
+            delta_encode(quantized[2:], 2, 3, previous=quantized[1]),
+            encoded[2:])
+        np.testing.assert_array_equal(delta_decode(encoded[3:], 3, 3),
+                                      quantized[3:])
+        with pytest.raises(ValueError):
+            delta_encode(quantized[2:], 2, 3)
+        with pytest.raises(ValueError):
+            delta_decode(encoded[2:], 2, 3)
+
+    def test_save_load(self):
+        storage = Storage(filename=self.filename, mode='w')
+        storage.snapshots.quantization = {'coordinates': 1e-3}
+        storage.save(self.traj)
+        report = storage.quantization_report()
+        assert_equal(list(report.values()),
+                     [{'precision': 1e-3, 'max_error': 5e-4, 'unit': None}])
+        storage.close()
+
+        storage = Storage(filename=self.filename, mode='r')
+        # read the variables, since loaded snapshots are the ones in memory
+        coordinates, velocities = [
+            [name for name in storage.variables if name.endswith(feature)][0]
+            for feature in ['_coordinates', '_velocities']
+        ]
+        assert_equal(storage.variables[coordinates].var_type, 'quantized')
+        assert_equal(storage.variables[coordinates].key_interval, 32)
+        error = np.max(np.abs(storage.vars[coordinates][0:5] -
+                              self.traj.xyz))
+        assert 0 < error <= 5e-4 + 1e-6
+        # all rows but the first store the (zigzag mapped) difference to
+        # the row before
+        assert_equal(storage.variables[coordinates][0:3, 0, 0].tolist(),
+                     [0, 246, 248])
+        # velocities are not quantized
+        np.testing.assert_array_equal(
+            storage.vars[velocities][0:5],
+            self.traj.velocities.astype(np.float32))
+        storage.close()
+
+    def test_delta_rows(self):
+        storage = Storage(filename=self.filename, mode='w')
+        storage.snapshots.quantization = {'coordinates': 1e-3,
+                                          'velocities': 1e-3}
+        storage.snapshots.quantization_key_interval = 4
+        trajs = [make_1d_traj([0.37 * i + 0.05 * j for i in range(n)],
+                              velocities=[0.11 * j - 0.2 * i
+                                          for i in range(n)])
+                 for j, n in enumerate([7, 3, 6])]
+        storage.save(trajs[0])
+        # single rows, the first one is not a key row
+        for snap in trajs[1]:
+            storage.snapshots.save(snap)
+        storage.save(trajs[2])
+        storage.close()
+
+        storage = Storage(filename=self.filename, mode='r')
+        coordinates = [name for name in storage.vars
+                       if name.endswith('_coordinates')][0]
+        var = storage.vars[coordinates]
+        xyz = np.concatenate([traj.xyz for traj in trajs])
+        assert_equal(len(var), 16)
+        for key in [slice(None), 9, -1, slice(2, 11, 3), [15, 6, 7],
+                    (slice(5, 10), 0, 0)]:
+            np.testing.assert_allclose(var[key], xyz[key], atol=5e-4 + 1e-6)
+        np.testing.assert_allclose(var.get_rows(5, 9), xyz[5:9],
+                                   atol=5e-4 + 1e-6)
+        for traj in [trajs[0], trajs[2]]:
+            loaded = storage.trajectories[traj.__uuid__]
+            np.testing.assert_allclose(loaded.xyz, traj.xyz,
+                                       atol=5e-4 + 1e-6)
+            np.testing.assert_allclose(loaded.velocities, traj.velocities,
+                                       atol=5e-4 + 1e-6)
+        storage.close()
@@ -6,7 +6,9 @@ from .test_helpers import (make_1d_traj, MoverWithSignature, RandomMDEngine,
                            assert_frame_equal, assert_items_equal)
 
 from openpathsampling.analysis.tis import *
-from openpathsampling.analysis.tis.core import steps_to_weighted_trajectories
+from openpathsampling.analysis.tis.core import (
+    steps_to_weighted_trajectories, trajectory_maxima
+)
 from openpathsampling.analysis.tis.flux import default_flux_sort
 import openpathsampling as paths
 
@@ -95,6 +97,47 @@ class TISAnalysisTester(object):
             sample_sets.append(sample_set)
         return sample_sets
 
+    def _make_fake_minus_steps(self, scheme, descriptions):
+        network = scheme.network
+        state_adjustment = {
+            self.state_A: lambda x: x,
+            self.state_B: lambda x: 1.0 - x
+        }
+
+        minus_ensemble_to_mover = {m.minus_ensemble: m
+                                   for m in scheme.movers['minus']}
+
+        assert_equal(set(minus_ensemble_to_mover.keys()),
+                     set(network.minus_ensembles))
+        steps = []
+        mccycle = 0
+        for minus_traj in descriptions:
+            for i, minus_ensemble in enumerate(network.minus_ensembles):
+                replica = -1 - i
+                adjustment = state_adjustment[minus_ensemble.state_vol]
+                traj = make_1d_traj([adjustment(s) for s in minus_traj])
+                assert_equal(minus_ensemble(traj), True)
+                samp = paths.Sample(trajectory=traj,
+                                    ensemble=minus_ensemble,
+                                    replica=replica)
+                sample_set = paths.SampleSet([samp])
+                change = paths.AcceptedSampleMoveChange(
+                    samples=[samp],
+                    mover=minus_ensemble_to_mover[samp.ensemble],
+                    details=paths.Details()
+                )
+                # NOTE: this makes it so that only one ensemble is
+                # represented in the same set at any time, which isn't quite
+                # how it actually works. However, this is doesn't matter for
+                # the current implementation
+                steps.append(paths.MCStep(mccycle=mccycle,
+                                          active=sample_set,
+                                          change=change))
+
+                mccycle += 1
+        assert_equal(len(steps), 4)
+        return steps
+
     def sampling_ensembles_for_transition(self, network, state_A, state_B):
         analysis_AB = network.transitions[(state_A, state_B)]
         sampling_AB = network.analysis_to_sampling[analysis_AB][0]
@@ -144,6 +187,12 @@ class TISAnalysisTester(object):
             self.mistis.sampling_ensembles
         )
 
+        a = 0.1  # just a number to simplify the trajectory-making
+        self.minus_move_descriptions = [
+            [-a, a, a, -a, -a, -a, -a, -a, a, a, a, a, a, -a],
+            [-a, a, a, a, -a, -a, -a, a, a, a, -a]
+        ]
+
         # TODO: set up mstis
         self.mstis = paths.MSTISNetwork([
             (self.state_A, interfaces_AB),
@@ -311,19 +360,13 @@ class TestMinusMoveFlux(TISAnalysisTester):
     def setup(self):
         super(TestMinusMoveFlux, self).setup()
 
-        a = 0.1  # just a number to simplify the trajectory-making
-        minus_move_descriptions = [
-            [-a, a, a, -a, -a, -a, -a, -a, a, a, a, a, a, -a],
-            [-a, a, a, a, -a, -a, -a, a, a, a, -a]
-        ]
-
         engine = RandomMDEngine()  # to get snapshot_timestep
 
         self.mistis_scheme = paths.DefaultScheme(self.mistis, engine)
         self.mistis_scheme.build_move_decision_tree()
         self.mistis_minus_steps = self._make_fake_minus_steps(
             scheme=self.mistis_scheme,
-            descriptions=minus_move_descriptions
+            descriptions=self.minus_move_descriptions
         )
         self.mistis_minus_flux = MinusMoveFlux(self.mistis_scheme)
 
@@ -331,51 +374,10 @@ class TestMinusMoveFlux(TISAnalysisTester):
         self.mstis_scheme.build_move_decision_tree()
         self.mstis_minus_steps = self._make_fake_minus_steps(
             scheme=self.mstis_scheme,
-            descriptions=minus_move_descriptions
+            descriptions=self.minus_move_descriptions
         )
         self.mstis_minus_flux = MinusMoveFlux(self.mstis_scheme)
 
-    def _make_fake_minus_steps(self, scheme, descriptions):
-        network = scheme.network
-        state_adjustment = {
-            self.state_A: lambda x: x,
-            self.state_B: lambda x: 1.0 - x
-        }
-
-        minus_ensemble_to_mover = {m.minus_ensemble: m
-                                   for m in scheme.movers['minus']}
-
-        assert_equal(set(minus_ensemble_to_mover.keys()),
-                     set(network.minus_ensembles))
-        steps = []
-        mccycle = 0
-        for minus_traj in descriptions:
-            for i, minus_ensemble in enumerate(network.minus_ensembles):
-                replica = -1 - i
-                adjustment = state_adjustment[minus_ensemble.state_vol]
-                traj = make_1d_traj([adjustment(s) for s in minus_traj])
-                assert_equal(minus_ensemble(traj), True)
-                samp = paths.Sample(trajectory=traj,
-                                    ensemble=minus_ensemble,
-                                    replica=replica)
-                sample_set = paths.SampleSet([samp])
-                change = paths.AcceptedSampleMoveChange(
-                    samples=[samp],
-                    mover=minus_ensemble_to_mover[samp.ensemble],
-                    details=paths.Details()
-                )
-                # NOTE: this makes it so that only one ensemble is
-                # represented in the same set at any time, which isn't quite
-                # how it actually works. However, this is doesn't matter for
-                # the current implementation
-                steps.append(paths.MCStep(mccycle=mccycle,
-                                          active=sample_set,
-                                          change=change))
-
-                mccycle += 1
-        assert_equal(len(steps), 4)
-        return steps
-
     def test_get_minus_steps(self):
         all_mistis_steps = self.mistis_steps + self.mistis_minus_steps
         mistis_minus_steps = \
@@ -399,6 +401,17 @@ class TestMinusMoveFlux(TISAnalysisTester):
         for flux in mstis_flux.values():  # all values are the same
             assert_almost_equal(flux, expected_flux)
 
+    def test_combine_intermediates(self):
+        steps = self.mistis_minus_steps
+        flux = self.mistis_minus_flux
+        combined = flux.combine_intermediates(flux.intermediates(steps[:1]),
+                                              flux.intermediates(steps[1:]))
+        combined_flux = flux.calculate_from_intermediates(*combined)
+        expected = flux.calculate(steps)
+        assert_equal(set(combined_flux.keys()), set(expected.keys()))
+        for key in expected:
+            assert_almost_equal(combined_flux[key], expected[key])
+
     @raises(ValueError)
     def test_bad_network(self):
         # raises error if more than one transition shares a minus ensemble
@@ -503,6 +516,49 @@ class TestFullHistogramMaxLambda(TISAnalysisTester):
         mstis_BA_hists = mstis_BA_histogrammer.calculate(self.mstis_steps)
         self._check_transition_results(mstis_BA, mstis_BA_hists)
 
+    def test_evaluate_in_bulk(self):
+        mistis_AB = self.mistis.transitions[(self.state_A, self.state_B)]
+        histogrammer = FullHistogramMaxLambdas(
+            transition=mistis_AB,
+            hist_parameters={'bin_width': 0.1, 'bin_range': (-0.1, 1.1)}
+        )
+        assert histogrammer.cv is mistis_AB.interfaces.cv
+        trajs = self.trajs_AB + [self.trajs_AB[0].reversed]
+        values = histogrammer.evaluate(trajs)
+        assert_equal(len(values), len(trajs))
+        for traj in trajs:
+            assert_almost_equal(values[traj], mistis_AB.interfaces.cv_max(traj))
+
+    def test_evaluate_custom_function(self):
+        mistis_AB = self.mistis.transitions[(self.state_A, self.state_B)]
+        calls = []
+
+        def max_lambda(traj):
+            calls.append(traj)
+            return max(self.cv_x(traj))
+
+        histogrammer = FullHistogramMaxLambdas(
+            transition=mistis_AB,
+            hist_parameters={'bin_width': 0.1, 'bin_range': (-0.1, 1.1)},
+            max_lambda_func=max_lambda
+        )
+        assert histogrammer.cv is None
+        hists = histogrammer.from_weighted_trajectories(
+            self.mistis_weighted_trajectories
+        )
+        self._check_transition_results(mistis_AB, hists)
+        # each trajectory evaluated only once, even if in several ensembles
+        assert_equal(len(calls), len(set(calls)))
+
+    def test_trajectory_maxima(self):
+        maxima = trajectory_maxima(self.trajs_AB, self.cv_x)
+        for traj, value in zip(self.trajs_AB, maxima):
+            assert_almost_equal(value, max(self.cv_x(traj)))
+        assert_equal(len(trajectory_maxima([], self.cv_x)), 0)
+        with pytest.raises(ValueError):
+            trajectory_maxima([self.trajs_AB[0], paths.Trajectory([])],
+                              self.cv_x)
+
     @raises(RuntimeError)
     def test_calculate_no_max_lambda(self):
         mistis_AB = self.mistis.transitions[(self.state_A, self.state_B)]
@@ -1124,5 +1180,146 @@ class TestStandardTISAnalysis(TestTISAnalysis):
             assert prog.keywords['leave'] is expected_max_lambda
 
 
+class TestIncrementalTISAnalysis(TISAnalysisTester):
+    def _make_tis_analysis(self, network, steps=None, flux_method=None):
+        if flux_method is None:
+            flux_method = DictFlux({(t.stateA, t.interfaces[0]): 0.1
+                                    for t in network.sampling_transitions})
+        return StandardTISAnalysis(
+            network=network,
+            flux_method=flux_method,
+            max_lambda_calcs={t: {'bin_width': 0.1,
+                                  'bin_range': (-0.1, 1.1)}
+                              for t in network.sampling_transitions},
+            steps=steps
+        )
+
+    def setup(self):
+        super(TestIncrementalTISAnalysis, self).setup()
+        full_analysis = self._make_tis_analysis(self.mistis,
+                                                steps=self.mistis_steps)
+        self.expected_rates = full_analysis.rate_matrix()
+        self.pairs = [(self.state_A, self.state_B),
+                      (self.state_B, self.state_A)]
+        self.n_first = len(self.mistis_steps) // 2
+
+        # steps where the minus move was done; the active sample sets also
+        # have the samples of the sampling ensembles
+        scheme = paths.DefaultScheme(self.mistis, RandomMDEngine())
+        scheme.build_move_decision_tree()
+        self.minus_flux = MinusMoveFlux(scheme)
+        minus_steps = self._make_fake_minus_steps(
+            scheme=scheme,
+            descriptions=self.minus_move_descriptions
+        )
+        self.minus_steps = [
+            paths.MCStep(mccycle=step.mccycle,
+                         active=paths.SampleSet(step.active.samples
+                                                + minus.active.samples),
+                         change=minus.change)
+            for (step, minus) in zip(self.mistis_steps, minus_steps)
+        ]
+        full_analysis = self._make_tis_analysis(
+            self.mistis,
+            steps=self.minus_steps,
+            flux_method=MinusMoveFlux(scheme)
+        )
+        self.expected_minus_rates = full_analysis.rate_matrix()
+
+    def _check_rates(self, rates, expected=None):
+        if expected is None:
+            expected = self.expected_rates
+        for pair in self.pairs:
+            assert_almost_equal(rates[pair], expected[pair])
+
+    def test_update(self):
+        incremental = IncrementalTISAnalysis(
+            self._make_tis_analysis(self.mistis)
+        )
+        incremental.update(self.mistis_steps[:self.n_first])
+        rates = incremental.update(self.mistis_steps[self.n_first:])
+        self._check_rates(rates)
+        assert_equal(incremental.state.n_steps, len(self.mistis_steps))
+        for ens in self.mistis.sampling_ensembles:
+            assert_equal(incremental.state.weighted_trajectories[ens],
+                         self.mistis_weighted_trajectories[ens])
+
+    def test_restart_from_state(self):
+        incremental = IncrementalTISAnalysis(
+            self._make_tis_analysis(self.mistis)
+        )
+        incremental.update(self.mistis_steps[:self.n_first])
+        state = IncrementalTISState.from_dict(incremental.state.to_dict())
+        restarted = IncrementalTISAnalysis(
+            self._make_tis_analysis(self.mistis),
+            state=state
+        )
+        rates = restarted.update(self.mistis_steps[self.n_first:])
+        self._check_rates(rates)
+
+    def test_update_minus_flux(self):
+        incremental = IncrementalTISAnalysis(
+            self._make_tis_analysis(self.mistis,
+                                    flux_method=self.minus_flux)
+        )
+        incremental.update(self.minus_steps[:self.n_first])
+        rates = incremental.update(self.minus_steps[self.n_first:])
+        self._check_rates(rates, self.expected_minus_rates)
+        assert_equal(incremental.state.n_steps, len(self.minus_steps))
+
+    def test_storage(self):
+        import os
+        import tempfile
+        incremental = IncrementalTISAnalysis(
+            self._make_tis_analysis(self.mistis,
+                                    flux_method=self.minus_flux)
+        )
+        incremental.update(self.minus_steps[:self.n_first])
+        state = incremental.state
+
+        tmp = tempfile.mkdtemp()
+        fname = os.path.join(tmp, "incremental_tis.nc")
+        storage = paths.Storage(fname, "w")
+        storage.save(self.trajs_AB[0])  # template for the CVs
+        storage.tags['incremental'] = state
+        storage.close()
 
+        storage = paths.Storage(fname, "r")
+        try:
+            loaded = storage.tags['incremental']
+            assert_equal(loaded.n_steps, state.n_steps)
+            assert_equal(loaded.weighted_trajectories,
+                         state.weighted_trajectories)
+            assert_equal(loaded.final_state_weights,
+                         state.final_state_weights)
+            assert_equal(loaded.n_tries, state.n_tries)
+            for ens in state.histograms:
+                assert_equal(loaded.histograms[ens]._histogram,
+                             state.histograms[ens]._histogram)
+            for pair in state.flux_intermediates[0]:
+                for direction in ['in', 'out']:
+                    segments = loaded.flux_intermediates[0][pair][direction]
+                    assert isinstance(segments,
+                                      paths.TrajectorySegmentContainer)
+                    assert_equal(list(segments),
+                                 list(state.flux_intermediates[0][pair]
+                                      [direction]))
+
+            restarted = IncrementalTISAnalysis(
+                self._make_tis_analysis(self.mistis,
+                                        flux_method=self.minus_flux),
+                state=loaded
+            )
+            rates = restarted.update(self.minus_steps[self.n_first:])
+            self._check_rates(rates, self.expected_minus_rates)
+        finally:
+            storage.close()
+            os.remove(fname)
+            os.rmdir(tmp)
 
+    @raises(RuntimeError)
+    def test_recalculate_without_steps(self):
+        incremental = IncrementalTISAnalysis(
+            self._make_tis_analysis(self.mistis)
+        )
+        incremental.recalculate()
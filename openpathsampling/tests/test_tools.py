@@ -101,3 +101,15 @@ def test_ensure_file_no_file_no_contents():
     # if the file doesn't exist and the content doesn't exist, raise error
     with pytest.raises(RuntimeError):
         ensure_file("foo_bad_file.badfile", None, None)
+
+
+def test_replace_file():
+    tmp_dir = tempfile.mkdtemp()
+    filename = os.path.join(tmp_dir, "foo.data")
+    replace_file(filename, "foo")
+    replace_file(filename, "bar")
+    with open(filename, mode='r') as f:
+        assert f.read() == "bar"
+    assert os.listdir(tmp_dir) == ["foo.data"]
+    os.remove(filename)
+    os.rmdir(tmp_dir)
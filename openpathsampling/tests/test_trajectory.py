@@ -138,3 +138,144 @@ class TestSubtrajectoryIndices(object):
         assert_equal(indicesA, [[0, 1], [3], [11, 12]])
         assert_equal(indicesB, [[5, 6], [8]])
         assert_equal(indicesABA, [[3, 4, 5, 6, 7, 8, 9, 10, 11]])
+
+
+class TestTrajectoryIndex(object):
+    def setup(self):
+        self.traj = make_1d_traj([0.0, 1.0, 2.0, 1.0, 3.0])
+        # a frame that appears twice
+        self.traj.append(self.traj[1])
+
+    def test_index(self):
+        traj = self.traj
+        assert_equal(traj.index(traj[1]), 1)
+        assert_equal(traj.index(traj[4]), 4)
+        assert traj[2] in traj
+        assert traj[2].reversed not in traj
+        # changes reset the index
+        new_snap = make_1d_traj([5.0])[0]
+        assert new_snap not in traj
+        traj[0] = new_snap
+        assert new_snap in traj
+        assert_equal(traj.index(new_snap), 0)
+
+    @raises(ValueError)
+    def test_index_missing(self):
+        self.traj.index(self.traj[0].reversed)
+
+    def test_index_symmetric(self):
+        traj = self.traj
+        assert_equal(traj.index_symmetric(traj[3].reversed), 3)
+        assert traj.contains_symmetric(traj[2].reversed)
+        assert not traj.contains_symmetric(make_1d_traj([5.0])[0])
+
+    def test_reversed(self):
+        traj = self.traj
+        rev = traj.reversed
+        # a new trajectory each time, with the same reversed snapshots
+        other = traj.reversed
+        assert other is not rev
+        assert_equal(other, rev)
+        other.append(make_1d_traj([5.0])[0])
+        assert_equal(traj.reversed, rev)
+        assert_equal(rev.reversed, traj)
+        # iterating a trajectory backwards gives the reversed snapshots
+        assert_equal(list(rev), list(reversed(traj)))
+        traj.append(make_1d_traj([5.0])[0])
+        assert_equal(len(traj.reversed), len(rev) + 1)
+        assert_equal(rev.reversed, traj[:-1])
+
+    def test_correlation(self):
+        traj = self.traj
+        other = make_1d_traj([0.5, 1.5]) + traj[2:3].reversed
+        assert not traj.is_correlated(other)
+        assert traj.is_correlated(other, time_reversal=True)
+        assert_equal(traj.shared_configurations(other, time_reversal=True),
+                     {traj[2]})
+        assert traj.is_correlated(traj[4:])
+
+    def test_add(self):
+        traj = self.traj
+        joined = traj[:2] + traj[4:]
+        assert_equal(list(joined), [traj[0], traj[1], traj[4], traj[5]])
+        assert_equal(joined.index(traj[4]), 2)
+        joined += [traj[2]]
+        assert_equal(joined.index(traj[2]), 4)
+
+
+class TestFrameFeatureTable(object):
+    def setup(self):
+        self.n_evals = 0
+
+        def counting_id(snap):
+            self.n_evals += 1
+            return snap.coordinates[0][0]
+
+        self.cv = paths.FunctionCV("Id", counting_id)
+        # count every evaluation of the volume
+        self.cv._cache_dict.cache = paths.netcdfplus.NoCache()
+        self.volume = paths.CVDefinedVolume(self.cv, 0.0, 1.0)
+        self.traj = make_1d_traj([-0.5, 0.1, 0.5, 0.9, 1.5, 0.2])
+
+    def _evaluate(self, frames):
+        return [self.volume(f) for f in frames]
+
+    def test_values_evaluated_once(self):
+        features = self.traj.features
+        frames = self.traj.as_proxies()
+        assert_equal(features.values(self.volume, frames, self._evaluate),
+                     [False, True, True, True, False, True])
+        assert_equal(self.n_evals, 6)
+        features.values(self.volume, frames[2:], self._evaluate)
+        assert_equal(features.value(self.volume, frames[0], self.volume),
+                     False)
+        assert_equal(self.n_evals, 6)
+
+    def test_table_travels(self):
+        features = self.traj.features
+        assert self.traj[1:3].features is features
+        assert self.traj[[0, 2]].features is features
+        assert self.traj.reversed.features is features
+        assert paths.Trajectory(self.traj).features is features
+        other = make_1d_traj([0.3])
+        assert (self.traj + make_1d_traj([0.3])).features is features
+        other_features = other.features
+        joined = (self.traj + other).features
+        # different tables are joined in a new one
+        assert joined is not features
+        assert joined is not other_features
+        assert self.traj.features is features
+        assert other.features is other_features
+        assert make_1d_traj([0.3]).features is not features
+
+    def test_join_values(self):
+        other = make_1d_traj([0.3, 2.0])
+        other.features.values(self.volume, other.as_proxies(),
+                              self._evaluate)
+        joined = self.traj + other
+        assert_equal(self.n_evals, 2)
+        assert_equal(
+            joined.features.values(self.volume, joined.as_proxies(),
+                                   self._evaluate),
+            [False, True, True, True, False, True, True, False]
+        )
+        assert_equal(self.n_evals, 8)
+
+    def test_ensemble_reuses_values(self):
+        ensemble = paths.AllInXEnsemble(self.volume)
+        inner = self.traj[1:4]
+        assert ensemble(inner)
+        n_evals = self.n_evals
+        assert not ensemble(self.traj)
+        assert not paths.AllOutXEnsemble(self.volume)(inner)
+        assert paths.PartOutXEnsemble(self.volume)(self.traj)
+        # only frame 0 was not known to the table before
+        assert_equal(self.n_evals, n_evals + 1)
+
+    def test_prefix_suffix_ensembles_share_table(self):
+        ensemble = paths.AllInXEnsemble(self.volume)
+        _ = self.traj.features
+        prefix = paths.PrefixTrajectoryEnsemble(ensemble, self.traj[0:2])
+        suffix = paths.SuffixTrajectoryEnsemble(ensemble, self.traj[3:])
+        assert prefix._cached_trajectory.features is self.traj.features
+        assert suffix._cached_trajectory.features is self.traj.features
@@ -362,6 +362,70 @@ class TestCVRangeVolumePeriodic(object):
                      volume.PeriodicCVDefinedVolume(op_id, -100, 75))
 
 
+class CountingIdentity(CallIdentity):
+    def __init__(self):
+        super(CountingIdentity, self).__init__()
+        self.n_calls = 0
+
+    def __call__(self, value):
+        self.n_calls += 1
+        return value
+
+
+class TestCompiledVolume(object):
+    def setup(self):
+        self.values = [-1.0, -0.6, -0.5, -0.3, 0.0, 0.25, 0.4, 0.5, 0.7,
+                       0.75, 1.0, float('nan')]
+
+    def _assert_same(self, vol):
+        expected = [vol(value) for value in self.values]
+        assert_equal(list(vol.compiled(self.values)), expected)
+
+    def test_compiled_combinations(self):
+        vols = [volA, volA & volB, volA | volC, volA ^ volB, volA - volB,
+                ~volA, volA & volA2, volA | ~volA2, (volA | volA2) - volB,
+                volume.UnionVolume(volA, volume.UnionVolume(volC, volB)),
+                volume.IntersectionVolume(volD, volume.NegatedVolume(volB)),
+                volume.EmptyVolume(), volume.FullVolume()]
+        for vol in vols:
+            self._assert_same(vol)
+
+    def test_compiled_periodic(self):
+        self.values = [-270.0, -180.0, -150.0, -120.0, 0.0, 70.0, 90.0,
+                       179.0, 200.0, 400.0]
+        vols = [volume.PeriodicCVDefinedVolume(op_id, -150, 70, -180, 180),
+                volume.PeriodicCVDefinedVolume(op_id, 70, -150, -180, 180),
+                volume.PeriodicCVDefinedVolume(op_id, -180, 180, -180, 180),
+                volume.PeriodicCVDefinedVolume(op_id, -100, 75)]
+        for vol in vols:
+            self._assert_same(vol)
+
+    def test_single_cv_evaluation(self):
+        cv = CountingIdentity()
+        vol_a = volume.CVDefinedVolume(cv, -0.5, 0.5)
+        vol_b = volume.CVDefinedVolume(cv, 0.25, 0.75)
+        vol = volume.IntersectionVolume(vol_a, volume.NegatedVolume(vol_b))
+        assert_equal(list(vol.compiled([[0.0], [0.3], [0.6]])),
+                     [True, False, False])
+        # the CV is called once with all values
+        assert_equal(cv.n_calls, 1)
+        assert_equal(vol.compiled.cvs, [cv])
+
+    def test_merge_ranges(self):
+        # nested intersections of the same CV are merged into one range
+        vol = volume.IntersectionVolume(
+            volume.IntersectionVolume(volA, volA2), volB)
+        self._assert_same(vol)
+        merged = vol.compiled._merge(
+            vol.compiled._flatten(vol), lambda a, b: a & b)
+        assert_equal(merged, [volume.CVDefinedVolume(op_id, 0.25, 0.5),
+                              volA2])
+
+    def test_compiled_is_cached(self):
+        vol = volA | volA2
+        assert_is(vol.compiled, vol.compiled)
+
+
 class TestAbstract(object):
     @raises_with_message_like(TypeError, "Can't instantiate abstract class")
     def test_abstract_volume(self):
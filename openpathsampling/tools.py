@@ -272,3 +272,23 @@ def ensure_file(filename, old_contents=None, old_hash=None):
                            + " match stored file.")
 
     return contents, hashed
+
+
+def replace_file(filename, contents):
+    """Write a file by replacing it at once.
+
+    The contents are written to a temporary file, which then replaces the
+    file. So a reader never sees a partly written file.
+
+    Parameters
+    ----------
+    filename : str
+        filename
+    contents : str
+        new file contents
+    """
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        f.write(contents)
+    # os.replace also overwrites on Windows (not in Python 2)
+    getattr(os, 'replace', os.rename)(tmp_filename, filename)
@@ -6,6 +6,7 @@ Created on 03.09.2014
 
 from . import range_logic
 import abc
+import numpy as np
 from openpathsampling.netcdfplus import StorableNamedObject
 
 # TODO: Make Full and Empty be Singletons to avoid storing them several times!
@@ -109,6 +110,20 @@ class Volume(StorableNamedObject):
     def __invert__(self):
         return NegatedVolume(self)
 
+    @property
+    def compiled(self):
+        """
+        :class:`.CompiledVolume` : evaluator for many snapshots at once
+
+        The compiled volume is created on first access and reused.
+        """
+        compiled = self.__dict__.get('_compiled')
+        if compiled is None:
+            compiled = CompiledVolume(self)
+            self._compiled = compiled
+
+        return compiled
+
     def __eq__(self, other):
         return str(self) == str(other)
 
@@ -535,6 +550,242 @@ class PeriodicCVDefinedVolume(CVDefinedVolume):
                         self.collectivevariable.name)
 
 
+def _cv_values(cv, snapshots):
+    values = cv(snapshots)
+    try:
+        return np.asarray(values, dtype=float).reshape(len(snapshots))
+    except (TypeError, ValueError):
+        # e.g. values with units, which only support `__float__`
+        return np.array([v.__float__() for v in values])
+
+
+class CompiledVolume(object):
+    """
+    A volume flattened into CV lookups and a vectorized boolean expression
+
+    Each CV used by a :class:`.CVDefinedVolume` in the volume tree is
+    evaluated only once for all snapshots (and only if it is needed) and the
+    logical combinations are evaluated on numpy boolean arrays. Nested
+    unions and intersections are flattened and ranges of the same CV are
+    merged using the range logic of the volume before compiling. Volumes that
+    cannot be compiled are evaluated snapshot by snapshot.
+
+    Parameters
+    ----------
+    volume : :class:`.Volume`
+        the volume to be compiled
+
+    Attributes
+    ----------
+    volume : :class:`.Volume`
+        the compiled volume
+    cvs : list of :class:`.CollectiveVariable`
+        the CVs needed to evaluate the volume
+    """
+
+    _combinations = {
+        UnionVolume: np.logical_or,
+        IntersectionVolume: np.logical_and,
+        SymmetricDifferenceVolume: np.logical_xor,
+        RelativeComplementVolume:
+            lambda a, b: np.logical_and(a, np.logical_not(b))
+    }
+
+    def __init__(self, volume):
+        self.volume = volume
+        self.cvs = []
+        self._expr = self._compile(volume, merge=True)
+
+    def __call__(self, snapshots):
+        """
+        Return for each snapshot if it is inside the volume
+
+        Parameters
+        ----------
+        snapshots : list of :class:`openpathsampling.engines.BaseSnapshot`
+            the snapshots (or a trajectory) to be tested
+
+        Returns
+        -------
+        numpy.ndarray of bool
+        """
+        snapshots = list(snapshots)
+        return self._expr(snapshots, {})
+
+    def _cv_index(self, cv):
+        for idx, known in enumerate(self.cvs):
+            if known is cv:
+                return idx
+
+        self.cvs.append(cv)
+        return len(self.cvs) - 1
+
+    def _lookup(self, cv):
+        cv_idx = self._cv_index(cv)
+
+        def lookup(snapshots, values):
+            try:
+                return values[cv_idx]
+            except KeyError:
+                values[cv_idx] = _cv_values(cv, snapshots)
+                return values[cv_idx]
+
+        return lookup
+
+    @staticmethod
+    def _flatten(volume):
+        vol_type = type(volume)
+        if type(volume.volume1) is vol_type:
+            left = CompiledVolume._flatten(volume.volume1)
+        else:
+            left = [volume.volume1]
+
+        if type(volume.volume2) is vol_type:
+            right = CompiledVolume._flatten(volume.volume2)
+        else:
+            right = [volume.volume2]
+
+        return left + right
+
+    @staticmethod
+    def _merge(operands, combine):
+        # combine volumes of the same type based on the same CV; this uses
+        # the range logic implemented in the operators of CVDefinedVolume
+        merged = []
+        groups = {}
+        for vol in operands:
+            if type(vol) in (CVDefinedVolume, PeriodicCVDefinedVolume):
+                key = (type(vol), vol.collectivevariable)
+                if key in groups:
+                    pos = groups[key]
+                    merged[pos] = combine(merged[pos], vol)
+                    continue
+
+                groups[key] = len(merged)
+
+            merged.append(vol)
+
+        return merged
+
+    def _compile(self, volume, merge):
+        vol_type = type(volume)
+        if vol_type in (UnionVolume, IntersectionVolume) and merge:
+            if vol_type is UnionVolume:
+                operands = self._merge(self._flatten(volume),
+                                       lambda a, b: a | b)
+            else:
+                operands = self._merge(self._flatten(volume),
+                                       lambda a, b: a & b)
+
+            # merged volumes are compiled without merging again; otherwise
+            # ranges that cannot be combined would be merged forever
+            exprs = [self._compile(vol, merge=False) for vol in operands]
+            return self._reduce(exprs, vol_type is IntersectionVolume)
+
+        elif vol_type in (UnionVolume, IntersectionVolume,
+                          SymmetricDifferenceVolume,
+                          RelativeComplementVolume):
+            fnc = self._combinations[vol_type]
+            expr1 = self._compile(volume.volume1, merge=True)
+            expr2 = self._compile(volume.volume2, merge=True)
+
+            def combination(snapshots, values):
+                return fnc(expr1(snapshots, values),
+                           expr2(snapshots, values))
+
+            return combination
+
+        elif vol_type is NegatedVolume:
+            expr = self._compile(volume.volume, merge=True)
+
+            def negation(snapshots, values):
+                return np.logical_not(expr(snapshots, values))
+
+            return negation
+
+        elif vol_type is EmptyVolume:
+            return lambda snapshots, values: np.zeros(len(snapshots), bool)
+
+        elif vol_type is FullVolume:
+            return lambda snapshots, values: np.ones(len(snapshots), bool)
+
+        elif vol_type is CVDefinedVolume:
+            lookup = self._lookup(volume.collectivevariable)
+            lambda_min = volume.lambda_min
+            lambda_max = volume.lambda_max
+
+            def cv_range(snapshots, values):
+                l = lookup(snapshots, values)
+                # same comparisons as CVDefinedVolume.__call__, so also NaN
+                # values give identical results
+                return np.logical_not(
+                    np.logical_or(lambda_min > l, lambda_max <= l))
+
+            return cv_range
+
+        elif vol_type is PeriodicCVDefinedVolume:
+            lookup = self._lookup(volume.collectivevariable)
+            wrap = volume.wrap
+            lambda_min = volume.lambda_min
+            lambda_max = volume.lambda_max
+            if wrap:
+                shift = volume._period_shift
+                period = volume._period_len
+
+            def periodic_cv_range(snapshots, values):
+                l = lookup(snapshots, values)
+                if wrap:
+                    # vectorized version of PeriodicCVDefinedVolume.do_wrap
+                    val = l - shift
+                    positive = val > val * 0
+                    l = np.where(
+                        positive,
+                        l - np.trunc(val / period) * period,
+                        l + np.trunc((period - val) / period) * period
+                    )
+                    l = np.where(
+                        np.logical_and(~positive, l >= period),
+                        l - period, l
+                    )
+
+                if lambda_min > lambda_max:
+                    return np.logical_or(l >= lambda_min, l < lambda_max)
+                else:
+                    return np.logical_and(lambda_min <= l, l < lambda_max)
+
+            return periodic_cv_range
+
+        else:
+            def single(snapshots, values):
+                return np.array([bool(volume(snap)) for snap in snapshots],
+                                dtype=bool)
+
+            return single
+
+    @staticmethod
+    def _reduce(exprs, is_and):
+        if len(exprs) == 1:
+            return exprs[0]
+
+        def reduction(snapshots, values):
+            result = exprs[0](snapshots, values)
+            for expr in exprs[1:]:
+                # skip CVs that can no longer change the result
+                if is_and and not result.any():
+                    break
+                elif not is_and and result.all():
+                    break
+
+                if is_and:
+                    result = np.logical_and(result, expr(snapshots, values))
+                else:
+                    result = np.logical_or(result, expr(snapshots, values))
+
+            return result
+
+        return reduction
+
+
 class VoronoiVolume(Volume):
     '''
     Volume given by a Voronoi cell specified by a set of centers